@@ -2,9 +2,12 @@
 DraftCraft Agent - Production-ready Flask application
 """
 import os
+import json
+import time
 import logging
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, g
+from functools import partial
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, abort, g, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_migrate import Migrate
 from flask_mail import Mail
@@ -15,11 +18,30 @@ from flask_dance.contrib.google import make_google_blueprint, google
 
 # Import our modules
 from config import get_config, get_openai_api_key
-from models import db, User, Proposal
-from security import init_security, sanitize_input, validate_email, validate_password, limiter, get_remote_address
+from models import db, User, Proposal, GenerationJob, ProposalSkill
+from security import init_security, sanitize_input, validate_email, validate_password, check_suspicious_activity, limiter, get_remote_address
 from email_utils import mail, send_verification_email, send_welcome_email, send_password_reset_email
-from gpt_utils import generate_proposal
+from gpt_utils import generate_proposal, generate_proposals, stream_proposal, GenerationResult, elapsed_ms
 from email_sender import EmailSender
+from jobs import init_celery, enqueue_generation
+from openai_client import client_manager
+from proposal_cache import proposal_cache, cache_key
+from singleflight import generation_flights
+from resilience import openai_resilience
+from model_router import model_router
+from token_budget import token_budget
+from quota import usage_quota, QuotaExceededError
+from pagination import keyset_page, InvalidCursorError
+from compression import text_codec
+from search import search_proposal_ids
+from similar import similar_proposals
+from skills import skills_cli, normalize_skill
+from user_cache import user_cache
+from replicas import replica_router, read_replica
+from passwords import password_hasher, PasswordHasherBusyError
+from rate_limits import tier_limiter, RateLimitExceededError
+from request_logging import request_logger
+from timing import stage_timer, span
 
 # Initialize Sentry for error tracking
 sentry_dsn = os.environ.get('SENTRY_DSN')
@@ -31,6 +53,11 @@ if sentry_dsn and '@' in sentry_dsn:
         environment=os.environ.get('FLASK_ENV', 'development')
     )
 
+def format_sse(data, event=None):
+    """Format a payload as a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(data)}\n\n"
+
 def create_app(config_object=None):
     """Application factory pattern"""
     app = Flask(__name__)
@@ -39,13 +66,30 @@ def create_app(config_object=None):
     if config_object is not None:
         app.config.from_object(config_object)
     else:
-        config_name = os.environ.get('FLASK_ENV', 'default')
-    app.config.from_object(get_config())
+        app.config.from_object(get_config())
     
-    # Initialize extensions
+    # Initialize extensions (request_logger first, so its timing covers the other hooks)
+    request_logger.init_app(app)
+    stage_timer.init_app(app)
     db.init_app(app)
+    replica_router.init_app(app)
     mail.init_app(app)
     migrate = Migrate(app, db)
+    init_celery(app)
+    client_manager.init_app(app)
+    proposal_cache.init_app(app)
+    generation_flights.init_app(app)
+    openai_resilience.init_app(app)
+    model_router.init_app(app)
+    token_budget.init_app(app)
+    usage_quota.init_app(app)
+    text_codec.init_app(app)
+    similar_proposals.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    tier_limiter.init_app(app)
+    
+    app.cli.add_command(skills_cli)
     
     # Initialize security
     init_security(app)
@@ -58,7 +102,8 @@ def create_app(config_object=None):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return db.session.get(User, int(user_id))
+        # A cached snapshot, not a User row: see user_cache.py
+        return user_cache.load(int(user_id))
     
     # Flask-Dance Google OAuth blueprint
     google_bp = make_google_blueprint(
@@ -95,69 +140,206 @@ def register_routes(app):
         """Proposal generation form"""
         return render_template('form.html')
     
-    @app.route('/generate', methods=['POST'])
-    @login_required
-    def generate():
-        """Generate proposal with enhanced security"""
-        try:
-            # Sanitize and validate input
+    def read_generation_form():
+        """Sanitize the proposal form and check the user may generate.
+
+        Returns:
+            tuple: (fields, error) where fields holds the sanitized inputs and
+            error is a user-facing message, or None when the form is valid.
+        """
+        with span('sanitize'):
             client_name = sanitize_input(request.form.get('client_name', '').strip())
             job_description = sanitize_input(request.form.get('job_description', '').strip())
             skills = sanitize_input(request.form.get('skills', '').strip())
-            tier = request.form.get('tier', 'starter')
-            
-            # Validate required fields
-            if not all([client_name, job_description, skills]):
-                flash('All fields are required.', 'error')
-                return redirect(url_for('form'))
-            
-            # Check for suspicious activity
-            from security import check_suspicious_activity
+        tier = request.form.get('tier', 'starter')
+        bypass_cache = request.form.get('bypass_cache') in ('1', 'true', 'on')
+        variants = request.form.get('variants', 1, type=int) or 1
+        variants = max(1, min(variants, app.config['MAX_PROPOSAL_VARIANTS']))
+        
+        # Validate required fields
+        if not all([client_name, job_description, skills]):
+            return None, 'All fields are required.'
+        
+        # Check for suspicious activity
+        with span('sanitize'):
             is_suspicious, reason = check_suspicious_activity(request.form)
-            if is_suspicious:
-                log_security_event('suspicious_activity', current_user.id, reason)
-                flash('Invalid input detected.', 'error')
-                return redirect(url_for('form'))
-            
-            # Check user permissions and limits
-            can_generate, message = current_user.can_generate_proposal(tier)
-            if not can_generate:
-                flash(message, 'error')
+        if is_suspicious:
+            app.logger.warning(f"Suspicious activity from user {current_user.id}: {reason}")
+            return None, 'Invalid input detected.'
+        
+        # Monthly limits are enforced when usage is reserved; only check the plan here
+        if tier == 'premium' and not current_user.is_premium:
+            return None, 'Premium tier requires premium subscription'
+        
+        return {
+            'client_name': client_name,
+            'job_description': job_description,
+            'skills': skills,
+            'tier': tier,
+            'bypass_cache': bypass_cache,
+            'variants': variants
+        }, None
+    
+    @app.route('/generate', methods=['POST'])
+    @login_required
+    @tier_limiter.limit('generate')
+    def generate():
+        """Queue proposal generation and return the job"""
+        try:
+            fields, error = read_generation_form()
+            if error:
+                flash(error, 'error')
                 return redirect(url_for('form'))
             
-            # Generate proposal
-            model = 'gpt-4' if tier == 'premium' else 'gpt-3.5-turbo'
-            proposal_text = generate_proposal(client_name, job_description, skills, model)
-            
-            # Save proposal to database
-            proposal = Proposal(
-                user_id=current_user.id,
-                content=proposal_text,
-                client_name=client_name,
-                job_description=job_description,
-                skills=skills,
-                model_used=model,
-                tier=tier
-            )
-            
-            db.session.add(proposal)
-            
-            # Update user usage
-            if tier == 'starter':
-                current_user.proposals_this_month += 1
-            
-            db.session.commit()
+            # Hand generation to the worker pool so the web worker is freed at once
+            model = model_router.primary_model(fields['tier'])
+            job = enqueue_generation(current_user.id, fields['client_name'], fields['job_description'],
+                                     fields['skills'], fields['tier'], model,
+                                     use_cache=not fields['bypass_cache'], variants=fields['variants'])
+            app.logger.info(f"Generation job {job.id} queued for user {current_user.id} using {model}")
             
-            # Log successful generation
-            app.logger.info(f"Proposal generated for user {current_user.id} using {model}")
+            if request.accept_mimetypes.best == 'application/json':
+                response = job.to_dict()
+                response['status_url'] = url_for('job_status', job_id=job.id)
+                return jsonify(response), 202
             
-            return render_template('result.html', proposal=proposal_text, proposal_id=proposal.id)
+            if job.status == 'failed':
+                flash('An error occurred while generating your proposal. Please try again.', 'error')
+                return redirect(url_for('form'))
+            if job.status == 'succeeded':
+                if job.variants > 1:
+                    return redirect(url_for('proposal_variants', proposal_id=job.proposal_id))
+                return render_template('result.html', proposal=job.proposal.content, proposal_id=job.proposal_id)
+            return render_template('result.html', job=job)
             
+        except QuotaExceededError as e:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'error': str(e)}), 403
+            flash(str(e), 'error')
+            return redirect(url_for('form'))
         except Exception as e:
             app.logger.error(f"Error generating proposal: {e}")
             flash('An error occurred while generating your proposal. Please try again.', 'error')
             return redirect(url_for('form'))
     
+    @app.route('/proposals/<int:proposal_id>')
+    @login_required
+    def proposal_detail(proposal_id):
+        """Show one proposal in full"""
+        proposal = Proposal.query.filter_by(id=proposal_id, user_id=current_user.id).first_or_404()
+        return render_template('result.html', proposal=proposal.content, proposal_id=proposal.id)
+    
+    @app.route('/proposals/<int:proposal_id>/variants')
+    @login_required
+    def proposal_variants(proposal_id):
+        """Show the alternative drafts generated for one job"""
+        proposal = Proposal.query.filter_by(id=proposal_id, user_id=current_user.id).first_or_404()
+        return render_template('result.html', variants=proposal.variant_group())
+    
+    @app.route('/proposals/<int:proposal_id>/select', methods=['POST'])
+    @login_required
+    def select_variant(proposal_id):
+        """Keep one draft from a set of alternatives"""
+        proposal = Proposal.query.filter_by(id=proposal_id, user_id=current_user.id).first_or_404()
+        proposal.select_variant()
+        db.session.commit()
+        flash('Draft selected.', 'success')
+        return redirect(url_for('proposal_variants', proposal_id=proposal.id))
+    
+    @app.route('/jobs/<job_id>')
+    @login_required
+    def job_status(job_id):
+        """Poll the status of a generation job"""
+        job = GenerationJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+        data = job.to_dict()
+        if job.status == 'succeeded' and job.variants > 1:
+            data['variants_url'] = url_for('proposal_variants', proposal_id=job.proposal_id)
+        return jsonify(data)
+    
+    @app.route('/generate/stream', methods=['POST'])
+    @login_required
+    @tier_limiter.limit('generate')
+    def generate_stream():
+        """Stream a proposal to the browser as Server-Sent Events
+
+        Unlike /generate, duplicate submissions are not coalesced through
+        generation_flights. Tokens go to this one connection as they arrive,
+        so a follower could only be handed the finished text, which is no
+        longer a stream. The form disables its button while a stream runs,
+        and a repeat after one finishes is answered from the proposal cache.
+        """
+        fields, error = read_generation_form()
+        if error:
+            return jsonify({'error': error}), 400
+        
+        tier = fields['tier']
+        model = model_router.choose(tier)
+        try:
+            reservation = usage_quota.reserve(current_user.id, tier)
+        except QuotaExceededError as e:
+            return jsonify({'error': str(e)}), 403
+        
+        def event_stream():
+            # Flush headers straight away so the browser sees the response
+            # before the first token arrives.
+            yield format_sse({'model': model}, event='start')
+            started = time.monotonic()
+            delivered = False
+            try:
+                key = cache_key(fields['client_name'], fields['job_description'], fields['skills'], model)
+                # Runs after the Server-Timing header went out; the histograms get it when the stream ends
+                with span('generate'):
+                    cached = None if fields['bypass_cache'] else proposal_cache.get(key)
+                    if cached is not None:
+                        result = GenerationResult(cached, model, latency_ms=elapsed_ms(started), cached=True)
+                        yield format_sse({'delta': cached})
+                    else:
+                        chunks = []
+                        result = None
+                        for item in stream_proposal(fields['client_name'], fields['job_description'],
+                                                    fields['skills'], model, tier=tier):
+                            if isinstance(item, GenerationResult):
+                                result = item
+                                continue
+                            chunks.append(item)
+                            yield format_sse({'delta': item})
+                        if result is None:
+                            result = GenerationResult(''.join(chunks).strip(), model,
+                                                      latency_ms=elapsed_ms(started))
+                        proposal_cache.set(key, result.text)
+                
+                proposal = Proposal(
+                    user_id=current_user.id,
+                    content=result.text,
+                    client_name=fields['client_name'],
+                    job_description=fields['job_description'],
+                    skills=fields['skills'],
+                    model_used=model,
+                    tier=tier,
+                    **result.usage_columns()
+                )
+                db.session.add(proposal)
+                db.session.commit()
+                delivered = True
+                
+                app.logger.info(f"Proposal streamed for user {current_user.id} using {model}")
+                yield format_sse({'proposal_id': proposal.id}, event='done')
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Error streaming proposal: {e}")
+                yield format_sse({'error': 'An error occurred while generating your proposal. Please try again.'},
+                                 event='error')
+            finally:
+                # Also runs when the browser disconnects part-way through
+                if not delivered:
+                    usage_quota.refund(reservation)
+        
+        return Response(
+            stream_with_context(event_stream()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
     @app.route('/register', methods=['GET', 'POST'])
     def register():
         """User registration with enhanced validation"""
@@ -218,6 +400,9 @@ def register_routes(app):
             except ValueError as e:
                 flash(str(e), 'error')
                 return render_template('register.html')
+            except PasswordHasherBusyError:
+                flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'error')
+                return render_template('register.html'), 503, {'Retry-After': '5'}
             except Exception as e:
                 app.logger.error(f"Registration error: {e}")
                 flash('An error occurred during registration. Please try again.', 'error')
@@ -238,13 +423,19 @@ def register_routes(app):
             
             user = User.query.filter_by(email=email).first()
             
-            if user and user.check_password(password):
+            try:
+                password_ok = bool(user) and user.check_password(password)
+            except PasswordHasherBusyError:
+                flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'error')
+                return render_template('login.html'), 503, {'Retry-After': '5'}
+            
+            if password_ok:
                 if not user.is_active:
                     flash('Account is deactivated. Please contact support.', 'error')
                     return render_template('login.html')
                 
                 login_user(user, remember=True)
-                user.last_login = datetime.utcnow()
+                user.last_login = datetime.utcnow()  # also saves a password hash upgraded by check_password
                 db.session.commit()
                 
                 app.logger.info(f"User {user.id} logged in successfully")
@@ -273,7 +464,7 @@ def register_routes(app):
         user = User.query.filter_by(email=email).first()
         if not user:
             user = User(email=email, is_verified=True)
-            user.set_password(os.urandom(16).hex())  # random password
+            user.set_unusable_password()  # signs in through Google; no password to hash
             db.session.add(user)
         user.last_login = datetime.utcnow()
         db.session.commit()
@@ -354,10 +545,15 @@ def register_routes(app):
                 flash('Passwords do not match.', 'error')
                 return render_template('reset_password.html')
             
-            user.set_password(password)
+            try:
+                user.set_password(password)
+            except PasswordHasherBusyError:
+                flash('We are handling a lot of requests right now. Please try again in a moment.', 'error')
+                return render_template('reset_password.html'), 503, {'Retry-After': '5'}
             user.reset_token = None
             user.reset_token_expires = None
             db.session.commit()
+            user_cache.invalidate(user.id)
             
             flash('Password reset successfully!', 'success')
             return redirect(url_for('login'))
@@ -366,18 +562,20 @@ def register_routes(app):
     
     @app.route('/dashboard')
     @login_required
+    @read_replica
     def dashboard():
         """User dashboard"""
-        proposals = Proposal.query.filter_by(user_id=current_user.id).order_by(Proposal.created_at.desc()).limit(10).all()
+        proposals = Proposal.summaries().filter_by(user_id=current_user.id, parent_id=None)\
+            .order_by(Proposal.created_at.desc(), Proposal.id.desc()).limit(10).all()
         
         # Calculate usage statistics
-        current_user.reset_monthly_usage()
-        usage_percentage = (current_user.proposals_this_month / 5) * 100 if not current_user.is_premium else 0
+        usage = current_user.monthly_usage
+        usage_percentage = (usage / 5) * 100 if not current_user.is_premium else 0
         
         return render_template('dashboard.html', 
                              proposals=proposals, 
                              usage_percentage=usage_percentage,
-                             usage=current_user.proposals_this_month,
+                             usage=usage,
                              is_premium=current_user.is_premium)
     
     @app.route('/pricing')
@@ -440,7 +638,7 @@ def register_routes(app):
         if event['type'] == 'checkout.session.completed':
             session = event['data']['object']
             user_id = session['metadata'].get('user_id')
-            user = User.query.get(int(user_id))
+            user = db.session.get(User, int(user_id))
             
             if user:
                 user.is_premium = True
@@ -448,30 +646,294 @@ def register_routes(app):
                 user.subscription_id = session.get('subscription')
                 user.subscription_status = 'active'
                 db.session.commit()
+                user_cache.invalidate(user.id)
                 
                 app.logger.info(f"User {user.id} upgraded to premium")
         
         return '', 200
     
+    def requested_skills():
+        """Normalized, de-duplicated ?skill= values of the request"""
+        requested = [normalize_skill(skill) for skill in request.args.getlist('skill')[:5]]
+        return list(dict.fromkeys(skill for skill in requested if skill))
+    
+    @app.route('/api/skills')
+    @login_required
+    @limiter.limit("30 per minute")
+    @tier_limiter.limit('api')
+    @read_replica
+    def api_skills():
+        """The user's most used skills with proposal counts.
+
+        With ?skill= the counts cover only proposals tagged with those skills,
+        to narrow a filter that is already applied.
+        """
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        facets = ProposalSkill.facets(current_user.id, limit, within=requested_skills())
+        return jsonify({'skills': [{'skill': skill, 'proposals': count} for skill, count in facets]})
+    
     @app.route('/api/proposals')
     @login_required
     @limiter.limit("30 per minute")
+    @tier_limiter.limit('api')
+    @read_replica
     def api_proposals():
-        """API endpoint for user proposals"""
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 50)
+        """API endpoint for user proposals, newest first.
+
+        Items are summaries with a preview; fetch /api/proposals/<id> for the
+        full text. Pages by cursor: next_cursor goes back as ?cursor= for the
+        following page. The total costs a COUNT(*) and is only included with
+        ?include_total=1. Repeat ?skill= to keep proposals tagged with every
+        given skill. ?page= and ?per_page= (OFFSET, with total/pages/
+        current_page) are deprecated and kept for old clients.
+        """
+        limit = max(1, min(request.args.get('limit', request.args.get('per_page', 10, type=int), type=int), 50))
+        skill_filters = [Proposal.id.in_(ProposalSkill.proposal_ids(current_user.id, skill))
+                         for skill in requested_skills()]
+        summaries = Proposal.summaries().filter_by(user_id=current_user.id, parent_id=None).filter(*skill_filters)
+        
+        if 'page' in request.args:
+            page = request.args.get('page', 1, type=int)
+            proposals = summaries.order_by(Proposal.created_at.desc(), Proposal.id.desc())\
+                .paginate(page=page, per_page=limit, error_out=False)
+            response = jsonify({
+                'proposals': [proposal.to_summary_dict() for proposal in proposals.items],
+                'total': proposals.total,
+                'pages': proposals.pages,
+                'current_page': page
+            })
+            response.headers['Deprecation'] = 'true'
+            return response
+        
+        try:
+            proposals, next_cursor = keyset_page(summaries, Proposal, limit, request.args.get('cursor'))
+        except InvalidCursorError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = {
+            'proposals': [proposal.to_summary_dict() for proposal in proposals],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if request.args.get('include_total') in ('1', 'true'):
+            response['total'] = summaries.order_by(None).count()
+        return jsonify(response)
+    
+    @app.route('/api/proposals/search')
+    @login_required
+    @limiter.limit("30 per minute")
+    @tier_limiter.limit('api')
+    @read_replica
+    def api_proposals_search():
+        """Search the user's proposals by client, skills, job description and text.
+
+        Results are ranked best match first and paged with ?page= and ?limit=.
+        """
+        q = (request.args.get('q') or '').strip()
+        if not q:
+            return jsonify({'error': 'Missing search query'}), 400
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        page = max(1, request.args.get('page', 1, type=int))
+
+        # One extra id tells us whether another page exists
+        try:
+            ids = search_proposal_ids(db.session, current_user.id, q[:200], limit + 1, (page - 1) * limit)
+        except NotImplementedError as e:
+            app.logger.warning(str(e))
+            return jsonify({'error': 'Search is not available'}), 501
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        found = {proposal.id: proposal for proposal in
+                 Proposal.summaries().filter(Proposal.id.in_(ids), Proposal.user_id == current_user.id)}
+        return jsonify({
+            'proposals': [found[proposal_id].to_summary_dict() for proposal_id in ids if proposal_id in found],
+            'page': page,
+            'has_more': has_more
+        })
+
+    @app.route('/api/proposals/similar')
+    @login_required
+    @limiter.limit("60 per minute")
+    @tier_limiter.limit('api')
+    def api_proposals_similar():
+        """The user's past proposals for jobs most like ?job_description= and ?skills="""
+        job_description = request.args.get('job_description', '')[:10000]
+        skills = request.args.get('skills', '')[:10000]
+        if not job_description.strip():
+            return jsonify({'error': 'Missing job description'}), 400
+        limit = max(1, min(request.args.get('limit', 5, type=int), 20))
+        
+        matches = similar_proposals.search(current_user.id, job_description, skills, limit)
+        found = {proposal.id: proposal for proposal in
+                 Proposal.summaries().filter(Proposal.id.in_([proposal_id for proposal_id, _ in matches]))}
+        proposals = []
+        for proposal_id, score in matches:
+            if proposal_id in found:
+                item = found[proposal_id].to_summary_dict()
+                item['score'] = round(score, 4)
+                item['url'] = url_for('proposal_detail', proposal_id=proposal_id)
+                proposals.append(item)
+        return jsonify({'proposals': proposals})
+    
+    @app.route('/api/proposals/<int:proposal_id>')
+    @login_required
+    @limiter.limit("60 per minute")
+    @tier_limiter.limit('api')
+    def api_proposal_detail(proposal_id):
+        """Full text and inputs of one of the user's proposals"""
+        proposal = Proposal.query.filter_by(id=proposal_id, user_id=current_user.id).first_or_404()
+        return jsonify(proposal.to_dict())
+    
+    @app.route('/api/proposals/batch', methods=['POST'])
+    @login_required
+    @limiter.limit("5 per minute")
+    def api_proposals_batch():
+        """Generate proposals for a list of jobs, streaming each result as NDJSON"""
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('jobs')
+        tier = payload.get('tier', 'starter')
+        max_items = app.config['BATCH_MAX_ITEMS']
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'jobs must be a non-empty list.'}), 400
+        if len(items) > max_items:
+            return jsonify({'error': f'A batch can contain at most {max_items} jobs.'}), 400
+        if tier == 'premium' and not current_user.is_premium:
+            return jsonify({'error': 'Premium tier requires premium subscription'}), 403
+        
+        jobs = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({'error': 'Each job must be an object.', 'index': index}), 400
+            job = {field: sanitize_input(str(item.get(field) or '').strip())
+                   for field in ('client_name', 'job_description', 'skills')}
+            if not all(job.values()):
+                return jsonify({'error': 'All fields are required.', 'index': index}), 400
+            is_suspicious, reason = check_suspicious_activity(item)
+            if is_suspicious:
+                app.logger.warning(f"Suspicious activity from user {current_user.id}: {reason}")
+                return jsonify({'error': 'Invalid input detected.', 'index': index}), 400
+            jobs.append(job)
+        
+        # Each job counts as one request against the batch bucket, whose burst
+        # fits a whole batch; the per-request 'generate' burst would not
+        tier_limiter.charge('batch', cost=len(jobs))
+        
+        # Charge the whole batch up front so concurrent batches cannot overrun the limit
+        user_id = current_user.id
+        try:
+            reservation = usage_quota.reserve(user_id, tier, len(jobs))
+        except QuotaExceededError as e:
+            return jsonify({'error': str(e)}), 403
+        
+        model = model_router.choose(tier)
         
-        proposals = Proposal.query.filter_by(user_id=current_user.id)\
-            .order_by(Proposal.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        def cached_generate(client_name, job_description, skills, model):
+            return proposal_cache.get_or_generate(partial(generate_proposal, tier=tier),
+                                                  client_name, job_description, skills, model)
         
+        def result_stream():
+            results = {}
+            try:
+                for index, result, error in generate_proposals(jobs, model, app.config['BATCH_CONCURRENCY'],
+                                                               generate=cached_generate):
+                    if error is None:
+                        results[index] = result
+                        yield json.dumps({'index': index, 'status': 'succeeded', 'content': result.text}) + '\n'
+                    else:
+                        app.logger.error(f"Batch item {index} failed for user {user_id}: {error}")
+                        yield json.dumps({'index': index, 'status': 'failed',
+                                          'error': 'Proposal generation failed.'}) + '\n'
+            finally:
+                # Runs even if the client disconnects: keep what was generated
+                # and refund the rest in one transaction.
+                proposals = [Proposal(
+                    user_id=user_id,
+                    content=results[index].text,
+                    client_name=jobs[index]['client_name'],
+                    job_description=jobs[index]['job_description'],
+                    skills=jobs[index]['skills'],
+                    model_used=model,
+                    tier=tier,
+                    **results[index].usage_columns()
+                ) for index in sorted(results)]
+                db.session.add_all(proposals)
+                db.session.commit()
+                usage_quota.refund(reservation, len(jobs) - len(results))
+                app.logger.info(f"Batch of {len(jobs)} for user {user_id}: {len(results)} proposals saved")
+            yield json.dumps({
+                'status': 'complete',
+                'succeeded': len(results),
+                'failed': len(jobs) - len(results),
+                'proposal_ids': {str(index): proposal.id for index, proposal in zip(sorted(results), proposals)}
+            }) + '\n'
+        
+        return Response(stream_with_context(result_stream()), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no'})
+    
+    @app.route('/api/usage')
+    @login_required
+    @limiter.limit("30 per minute")
+    @tier_limiter.limit('api')
+    @read_replica
+    def api_usage():
+        """Daily token, cost and latency rollup of the current user's proposals"""
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
+        since = datetime.utcnow() - timedelta(days=days)
+        return jsonify({'days': days, 'usage': Proposal.usage_rollup(since, user_id=current_user.id)})
+    
+    def require_metrics_token():
+        token = app.config.get('METRICS_TOKEN')
+        if not token or request.headers.get('X-Metrics-Token') != token:
+            abort(404)
+    
+    @app.route('/metrics/usage')
+    @read_replica
+    def metrics_usage():
+        """Daily token, cost and latency rollup across all users and models"""
+        require_metrics_token()
+        days = min(max(request.args.get('days', 7, type=int), 1), 365)
+        since = datetime.utcnow() - timedelta(days=days)
+        return jsonify({'days': days, 'usage': Proposal.usage_rollup(since)})
+    
+    @app.route('/metrics/skills')
+    @read_replica
+    def metrics_skills():
+        """Most used skills across all users, with how many proposals were favorited"""
+        require_metrics_token()
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
+        since = datetime.utcnow() - timedelta(days=days)
+        return jsonify({'days': days, 'skills': ProposalSkill.popular(since)})
+    
+    @app.route('/metrics')
+    def metrics():
+        """Operational counters for this worker process"""
+        require_metrics_token()
         return jsonify({
-            'proposals': [proposal.to_dict() for proposal in proposals.items],
-            'total': proposals.total,
-            'pages': proposals.pages,
-            'current_page': page
+            'openai_pool': client_manager.stats(),
+            'openai_resilience': openai_resilience.stats(),
+            'model_router': model_router.stats(),
+            'token_budget': token_budget.stats(),
+            'text_compression': text_codec.stats(),
+            'similar_proposals': similar_proposals.stats(),
+            'user_cache': user_cache.stats(),
+            'password_hasher': password_hasher.stats(),
+            'tier_rate_limits': tier_limiter.stats(),
+            'request_logging': request_logger.stats(),
+            'stage_timings': stage_timer.stats(),
+            'replicas': replica_router.stats(),
+            'proposal_cache': proposal_cache.stats(),
+            'singleflight': generation_flights.stats()
         })
     
+    @app.errorhandler(RateLimitExceededError)
+    def rate_limited(error):
+        # X-RateLimit-* and Retry-After are added by tier_limiter
+        if request.endpoint == 'generate' and request.accept_mimetypes.best != 'application/json':
+            flash(str(error), 'error')
+            return redirect(url_for('form'))
+        return jsonify({'error': str(error)}), 429
+    
     @app.errorhandler(404)
     def not_found_error(error):
         return render_template('errors/404.html', error=error), 404
@@ -0,0 +1,77 @@
+"""
+Proposal text compression benchmark for DraftCraft Agent
+
+Reports the storage saved and the encode/decode cost of CompressedText on a
+synthetic corpus of job descriptions and proposals built from shared
+boilerplate, with and without a trained shared dictionary.
+
+    python benchmarks/bench_compression.py [--rows 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import text_codec, train_dictionary, dictionary_id
+
+BOILERPLATE = [
+    'We are looking for an experienced freelancer to join our team on a long-term basis.',
+    'The ideal candidate has strong communication skills and can work independently.',
+    'Please include examples of similar work in your proposal.',
+    'You will build and maintain a REST API using Python and Flask.',
+    'Experience with PostgreSQL, Redis and Celery is a plus.',
+    'We expect weekly progress updates and clean, well-tested code.',
+    'The project starts immediately and should take about six weeks.',
+    'Budget is flexible for the right candidate.',
+    'Dear hiring manager, thank you for the opportunity to apply for this project.',
+    'I have over eight years of experience delivering similar solutions for clients.',
+    'I look forward to discussing how I can help you reach your goals.'
+]
+
+def make_corpus(rows, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(rows):
+        sentences = rng.sample(BOILERPLATE, rng.randint(3, 8))
+        sentences.insert(rng.randint(0, len(sentences)), f'Our company, Client {i}, needs this by week {rng.randint(1, 52)}.')
+        corpus.append(' '.join(sentences * rng.randint(1, 4)))
+    return corpus
+
+def measure(corpus, label):
+    started = time.perf_counter()
+    stored = [text_codec.encode(text, force=True) for text in corpus]
+    encode_us = (time.perf_counter() - started) / len(corpus) * 1e6
+    started = time.perf_counter()
+    for value in stored:
+        text_codec.decode(value)
+    decode_us = (time.perf_counter() - started) / len(corpus) * 1e6
+    plain = sum(len(text.encode('utf-8')) for text in corpus)
+    compressed = sum(len(value.encode('utf-8')) for value in stored)
+    print(f'{label:<22} {plain:>10} {compressed:>10} {100 * (1 - compressed / plain):>7.1f}% '
+          f'{encode_us:>9.1f} {decode_us:>9.1f}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.rows)
+    text_codec.min_length = 0
+    print(f"{'codec':<22} {'plain B':>10} {'stored B':>10} {'saved':>8} {'enc us':>9} {'dec us':>9}")
+    for level in (1, 6, 9):
+        text_codec.level = level
+        text_codec.dictionary_id = None
+        measure(corpus, f'zlib-{level}')
+    data = train_dictionary(corpus[:args.rows // 2])
+    text_codec.dictionaries = {dictionary_id(data): data}
+    text_codec.dictionary_id = dictionary_id(data)
+    for level in (1, 6, 9):
+        text_codec.level = level
+        # Measure on rows the dictionary was not trained on
+        measure(corpus[args.rows // 2:], f'zlib-{level} + {len(data)}B dict')
+
+if __name__ == '__main__':
+    main()
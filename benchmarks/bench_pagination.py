@@ -0,0 +1,88 @@
+"""
+Proposal listing benchmark for DraftCraft Agent
+
+Compares OFFSET pagination (with its COUNT(*)) against keyset pagination
+when reading a page deep into one user's history, as that history grows.
+
+    python benchmarks/bench_pagination.py [--sizes 1000 10000 100000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TestingConfig
+from app import create_app
+from models import db, User, Proposal
+from pagination import keyset_page, encode_cursor
+
+PAGE_SIZE = 10
+
+def seed(user_id, count):
+    start = datetime(2024, 1, 1)
+    rows = [{
+        'user_id': user_id,
+        'content': f'Proposal body {i} ' * 20,
+        'client_name': f'Client {i}',
+        'job_description': 'Build a Flask API',
+        'skills': 'Python',
+        'model_used': 'gpt-3.5-turbo',
+        'tier': 'starter',
+        'created_at': start + timedelta(minutes=i)
+    } for i in range(count)]
+    db.session.execute(db.insert(Proposal), rows)
+    db.session.commit()
+
+def best_of(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def run(size):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        seed(user.id, size)
+
+        query = Proposal.query.filter_by(user_id=user.id, parent_id=None)
+        # A page 90% of the way through the history
+        page = max(1, int(size * 0.9) // PAGE_SIZE)
+        anchor = query.order_by(Proposal.created_at.desc(), Proposal.id.desc())\
+            .offset((page - 1) * PAGE_SIZE - 1).first()
+        cursor = encode_cursor(anchor.created_at, anchor.id)
+
+        offset_ms = best_of(lambda: query.order_by(Proposal.created_at.desc(), Proposal.id.desc())
+                            .paginate(page=page, per_page=PAGE_SIZE, error_out=False).items)
+        keyset_ms = best_of(lambda: keyset_page(query, Proposal, PAGE_SIZE, cursor))
+        first_ms = best_of(lambda: keyset_page(query, Proposal, PAGE_SIZE))
+        db.session.remove()
+    os.remove(path)
+    return offset_ms, keyset_ms, first_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'offset+count ms':>16} {'keyset deep ms':>15} {'keyset first ms':>16}")
+    for size in args.sizes:
+        offset_ms, keyset_ms, first_ms = run(size)
+        print(f'{size:>8} {offset_ms:>16.2f} {keyset_ms:>15.2f} {first_ms:>16.2f}')
+
+if __name__ == '__main__':
+    main()
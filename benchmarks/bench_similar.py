@@ -0,0 +1,113 @@
+"""
+Similar proposal lookup benchmark for DraftCraft Agent
+
+Times vectorizing a job, loading one user's matrix from the database,
+warm lookups (incremental refresh + NumPy top-k) and picking up a newly
+saved proposal, against scoring every stored vector in a Python loop.
+
+    python benchmarks/bench_similar.py [--sizes 1000 10000 100000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from config import TestingConfig
+from app import create_app
+from models import db, User, Proposal
+from similar import vectorize, encode_vector, proposal_text, similar_proposals, DTYPE
+
+WORDS = ('python flask django react api rest postgresql redis docker aws scraper dashboard stripe '
+         'payments mobile ios android shopify wordpress seo logo design data pipeline etl airflow '
+         'machine learning chatbot openai automation testing migration invoices crm analytics').split()
+
+def job(rng):
+    return f"Need a developer to build a {' '.join(rng.sample(WORDS, 8))} project. {' '.join(rng.sample(WORDS, 6))}"
+
+def seed(user_id, count, rng):
+    # An hour apart, ending now, like a long history
+    first = datetime.utcnow() - timedelta(hours=count)
+    for start in range(0, count, 5000):
+        rows = []
+        for i in range(start, min(start + 5000, count)):
+            description, skills = job(rng), ', '.join(rng.sample(WORDS, 3))
+            rows.append({
+                'user_id': user_id, 'content': 'Proposal body', 'client_name': 'Client',
+                'job_description': description, 'skills': skills, 'model_used': 'gpt-3.5-turbo',
+                'tier': 'starter', 'preview': 'Proposal body', 'created_at': first + timedelta(hours=i),
+                'embedding': encode_vector(vectorize(proposal_text(description, skills)))
+            })
+        db.session.execute(db.insert(Proposal), rows)
+    db.session.commit()
+
+def best_of(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def python_loop(blobs, query):
+    query = query.tolist()
+    scores = []
+    for row_id, blob in blobs:
+        vector = np.frombuffer(blob, dtype=DTYPE).tolist()
+        scores.append((sum(a * b for a, b in zip(vector, query)), row_id))
+    return sorted(scores, reverse=True)[:5]
+
+def run(size):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(BenchConfig)
+    rng = random.Random(size)
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        seed(user.id, size, rng)
+        description = job(rng)
+
+        vectorize_ms = best_of(lambda: vectorize(description), 200)
+        similar_proposals.clear()
+        started = time.perf_counter()
+        similar_proposals.search(user.id, description, k=5)
+        cold_ms = (time.perf_counter() - started) * 1000
+        warm_ms = best_of(lambda: similar_proposals.search(user.id, description, k=5))
+
+        db.session.add(Proposal(user_id=user.id, content='New', client_name='Client', job_description=description,
+                                skills='python', model_used='gpt-3.5-turbo', tier='starter'))
+        db.session.commit()
+        started = time.perf_counter()
+        similar_proposals.search(user.id, description, k=5)
+        new_row_ms = (time.perf_counter() - started) * 1000
+
+        blobs = db.session.query(Proposal.id, Proposal.embedding).filter_by(user_id=user.id).all()
+        query = vectorize(description)
+        loop_ms = best_of(lambda: python_loop(blobs, query), 1)
+        db.session.remove()
+    os.remove(path)
+    return vectorize_ms, cold_ms, warm_ms, new_row_ms, loop_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'vectorize ms':>13} {'cold ms':>9} {'warm ms':>9} {'new row ms':>11} {'python loop ms':>15}")
+    for size in args.sizes:
+        print(f'{size:>8}' + ''.join(f' {value:>{width}.2f}' for value, width in
+                                     zip(run(size), (13, 9, 9, 11, 15))))
+
+if __name__ == '__main__':
+    main()
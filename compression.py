@@ -0,0 +1,250 @@
+"""
+Transparent compression of large text columns for DraftCraft Agent
+
+CompressedText is a Text column type. With COMPRESS_PROPOSAL_TEXT enabled,
+values of at least TEXT_COMPRESSION_MIN_LENGTH characters are stored as
+zlib data (base64 in the same Text column, behind a control-character
+marker). Rows written while compression was off, and values too short to be
+worth it, stay plain text, so compression can be switched on and off and
+backfilled gradually. Values are decoded only when the column is loaded;
+listing queries that use Proposal.summaries() never load these columns.
+
+An optional shared dictionary, trained on existing rows with
+`flask compression train-dict`, lets short but repetitive job descriptions
+compress well. Every value records the id of the dictionary it was written
+with, so retired dictionaries must stay in TEXT_COMPRESSION_DICT_DIR.
+Compressed values are opaque to SQL: LIKE filters see only plain rows.
+"""
+import os
+import re
+import zlib
+import base64
+import hashlib
+import logging
+import threading
+from collections import Counter
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, bindparam, type_coerce
+from sqlalchemy.types import TypeDecorator, Text
+
+logger = logging.getLogger(__name__)
+
+# Never produced by sanitized form input or model output
+MARKER = '\x1fz'
+NO_DICTIONARY = '-'
+
+class TextCodec:
+    """Encodes and decodes CompressedText values"""
+
+    def __init__(self):
+        self.enabled = False
+        self.min_length = 512
+        self.level = 6
+        self.dictionaries = {}
+        self.dictionary_id = None
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Configure compression and load dictionaries from the Flask config"""
+        self.enabled = app.config['COMPRESS_PROPOSAL_TEXT']
+        self.min_length = app.config['TEXT_COMPRESSION_MIN_LENGTH']
+        self.level = app.config['TEXT_COMPRESSION_LEVEL']
+        self.dictionaries = load_dictionaries(app.config['TEXT_COMPRESSION_DICT_DIR'])
+        self.dictionary_id = app.config['TEXT_COMPRESSION_DICT']
+        if self.dictionary_id and self.dictionary_id not in self.dictionaries:
+            raise ValueError(f"Compression dictionary {self.dictionary_id} not found in "
+                             f"{app.config['TEXT_COMPRESSION_DICT_DIR']}")
+        self._reset_stats()
+        app.extensions['text_codec'] = self
+        app.cli.add_command(compression_cli)
+
+    def _reset_stats(self):
+        self._stats = {'encoded': 0, 'decoded': 0, 'plain_bytes': 0, 'stored_bytes': 0}
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def is_encoded(self, stored):
+        return stored is not None and stored.startswith(MARKER)
+
+    def encode(self, text, force=False):
+        """Return the stored form of plain text: compressed when enabled and worthwhile"""
+        if text is None:
+            return text
+        # Plain text that happens to start with the marker must be encoded to stay unambiguous
+        if not (force or self.enabled or text.startswith(MARKER)):
+            return text
+        if len(text) < self.min_length and not text.startswith(MARKER):
+            return text
+        dictionary_id = self.dictionary_id or NO_DICTIONARY
+        if dictionary_id == NO_DICTIONARY:
+            compressor = zlib.compressobj(self.level)
+        else:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionaries[dictionary_id])
+        raw = text.encode('utf-8')
+        data = compressor.compress(raw) + compressor.flush()
+        stored = f"{MARKER}{dictionary_id}:{base64.b64encode(data).decode('ascii')}"
+        if len(stored) >= len(text) and not text.startswith(MARKER):
+            return text
+        self._count(encoded=1, plain_bytes=len(raw), stored_bytes=len(stored))
+        return stored
+
+    def decode(self, stored):
+        """Return the text a stored value holds"""
+        if not self.is_encoded(stored):
+            return stored
+        dictionary_id, _, payload = stored[len(MARKER):].partition(':')
+        if dictionary_id == NO_DICTIONARY:
+            decompressor = zlib.decompressobj()
+        else:
+            if dictionary_id not in self.dictionaries:
+                raise LookupError(f"Compression dictionary {dictionary_id} is not loaded")
+            decompressor = zlib.decompressobj(zdict=self.dictionaries[dictionary_id])
+        data = base64.b64decode(payload)
+        text = (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+        self._count(decoded=1)
+        return text
+
+    def stats(self):
+        """Return encode/decode counters and the space saved by this process's writes"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['dictionary'] = self.dictionary_id
+        stats['saved_bytes'] = stats['plain_bytes'] - stats['stored_bytes']
+        return stats
+
+text_codec = TextCodec()
+
+class CompressedText(TypeDecorator):
+    """Text column whose values may be stored compressed by text_codec"""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return text_codec.encode(value)
+
+    def process_result_value(self, value, dialect):
+        return text_codec.decode(value)
+
+def dictionary_id(data):
+    """Stable id recorded in values compressed with a dictionary"""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def load_dictionaries(directory):
+    """Load every *.zdict file in directory, keyed by dictionary id"""
+    dictionaries = {}
+    if not directory or not os.path.isdir(directory):
+        return dictionaries
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.zdict'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                data = f.read()
+            dictionaries[dictionary_id(data)] = data
+    return dictionaries
+
+def train_dictionary(samples, size=32 * 1024):
+    """Build a zlib preset dictionary from phrases shared across samples.
+
+    zlib can only refer back 32 KB, so the dictionary holds the sentences
+    and phrases that recur most across samples, most valuable last (zlib
+    reaches the end of the dictionary most cheaply).
+    """
+    phrases = Counter()
+    for sample in samples:
+        # Count each phrase once per sample: recurring across rows is what pays
+        phrases.update(set(phrase.strip() for phrase in re.split(r'(?<=[.!?\n])\s+', sample)
+                           if len(phrase.strip()) >= 16))
+    shared = [(count * len(phrase), phrase) for phrase, count in phrases.items() if count > 1]
+    chosen = []
+    used = 0
+    for _, phrase in sorted(shared, reverse=True):
+        encoded = phrase.encode('utf-8') + b' '
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    return b''.join(reversed(chosen))
+
+def backfill(connection, table, columns, batch_size=500, decompress=False):
+    """Rewrite a table's CompressedText columns in their current stored form.
+
+    Runs in id order, batch_size rows per round trip, touching only rows
+    whose form changes. With decompress=True every value is written back as
+    plain text (used to switch compression off for good).
+
+    Returns:
+        dict: Rows rewritten and total bytes stored before and after.
+    """
+    report = {'rows': 0, 'bytes_before': 0, 'bytes_after': 0}
+    last_id = 0
+    while True:
+        # Read the stored form, not the decoded value CompressedText would return
+        rows = connection.execute(
+            select(table.c.id, *[type_coerce(table.c[column], Text).label(column) for column in columns])
+            .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            values = {}
+            for column in columns:
+                stored = row._mapping[column]
+                plain = text_codec.decode(stored)
+                rewritten = plain if decompress else text_codec.encode(plain, force=True)
+                if rewritten != stored:
+                    values[f'new_{column}'] = rewritten
+                report['bytes_before'] += len((stored or '').encode('utf-8'))
+                report['bytes_after'] += len((rewritten or '').encode('utf-8'))
+            if values:
+                updates.append(dict({f'new_{column}': row._mapping[column] for column in columns},
+                                    row_id=row.id, **values))
+        if updates:
+            # Raw strings: the values are already in their stored form
+            connection.execute(
+                table.update().where(table.c.id == bindparam('row_id'))
+                .values({column: bindparam(f'new_{column}', type_=Text) for column in columns}),
+                updates
+            )
+        report['rows'] += len(updates)
+        last_id = rows[-1].id
+    return report
+
+compression_cli = AppGroup('compression', help='Manage compressed proposal text.')
+
+@compression_cli.command('train-dict')
+@click.option('--samples', default=2000, help='Number of recent proposals to learn from.')
+def train_dict_command(samples):
+    """Train a shared dictionary on recent job descriptions and proposals"""
+    from flask import current_app
+    from models import Proposal
+    rows = Proposal.query.order_by(Proposal.id.desc()).limit(samples).all()
+    data = train_dictionary([row.job_description for row in rows] + [row.content for row in rows])
+    if not data:
+        click.echo('Not enough repeated text to train a dictionary.')
+        return
+    directory = current_app.config['TEXT_COMPRESSION_DICT_DIR']
+    os.makedirs(directory, exist_ok=True)
+    new_id = dictionary_id(data)
+    with open(os.path.join(directory, f'{new_id}.zdict'), 'wb') as f:
+        f.write(data)
+    click.echo(f'Wrote {len(data)}-byte dictionary {new_id}; set TEXT_COMPRESSION_DICT={new_id} to use it.')
+
+@compression_cli.command('backfill')
+@click.option('--batch-size', default=500)
+@click.option('--decompress', is_flag=True, help='Write every value back as plain text.')
+def backfill_command(batch_size, decompress):
+    """Compress (or decompress) existing proposal text in place"""
+    from models import db, Proposal
+    table = Proposal.__table__
+    with db.engine.begin() as connection:
+        report = backfill(connection, table, ['content', 'job_description'], batch_size, decompress)
+    saved = report['bytes_before'] - report['bytes_after']
+    click.echo(f"Rewrote {report['rows']} proposals: {report['bytes_before']} -> "
+               f"{report['bytes_after']} bytes ({saved} saved)")
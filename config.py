@@ -10,14 +10,38 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///proposifyai.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Comma-separated read replicas for read-only views (see replicas.py)
+    SQLALCHEMY_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # Reads stay on the primary this long after a browser session writes
+    REPLICA_READ_YOUR_WRITES_SECONDS = int(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', 10))
     
     # Security settings
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = 3600  # 1 hour
     
-    # Rate limiting
+    # Rate limiting per client IP (Flask-Limiter reads RATELIMIT_STORAGE_URI)
     RATELIMIT_DEFAULT = "200 per day;50 per hour;10 per minute"
-    RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or "memory://"
+    RATELIMIT_STORAGE_URI = os.environ.get('REDIS_URL') or "memory://"
+    # Per-user limits by scope and tier (see rate_limits.py): `rate` requests per
+    # `period` seconds, in bursts of up to `burst`
+    TIER_RATE_LIMITS = {
+        'generate': {
+            'starter': {'rate': 10, 'period': 60, 'burst': 3},
+            'premium': {'rate': 60, 'period': 60, 'burst': 10}
+        },
+        'api': {
+            'starter': {'rate': 60, 'period': 60, 'burst': 20},
+            'premium': {'rate': 300, 'period': 60, 'burst': 60}
+        },
+        # Jobs submitted through /api/proposals/batch; a burst below
+        # BATCH_MAX_ITEMS would turn away the largest batches for good
+        'batch': {
+            'starter': {'rate': 50, 'period': 600, 'burst': 50},
+            'premium': {'rate': 300, 'period': 600, 'burst': 100}
+        }
+    }
+    # 'redis' (uses REDIS_URL, shared by every worker), 'memory' (per process) or 'none'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'redis')
     
     # Email settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -35,6 +59,53 @@ class Config:
     
     # OpenAI settings
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_POOL_MAX_CONNECTIONS = int(os.environ.get('OPENAI_POOL_MAX_CONNECTIONS', 20))
+    OPENAI_POOL_MAX_KEEPALIVE = int(os.environ.get('OPENAI_POOL_MAX_KEEPALIVE', 10))
+    OPENAI_POOL_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_POOL_KEEPALIVE_EXPIRY', 60))
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+    OPENAI_READ_TIMEOUT = float(os.environ.get('OPENAI_READ_TIMEOUT', 60))
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # e.g. a local fake server in tests
+    # Retries are handled by resilience.OpenAIResilience, so the SDK's own are off by default
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 0))
+    OPENAI_RETRY_MAX_ATTEMPTS = int(os.environ.get('OPENAI_RETRY_MAX_ATTEMPTS', 3))
+    OPENAI_RETRY_BASE_DELAY = float(os.environ.get('OPENAI_RETRY_BASE_DELAY', 0.5))
+    OPENAI_RETRY_MAX_DELAY = float(os.environ.get('OPENAI_RETRY_MAX_DELAY', 8))
+    OPENAI_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('OPENAI_BREAKER_FAILURE_THRESHOLD', 5))
+    OPENAI_BREAKER_RECOVERY_TIMEOUT = float(os.environ.get('OPENAI_BREAKER_RECOVERY_TIMEOUT', 30))
+    OPENAI_LATENCY_WINDOW = int(os.environ.get('OPENAI_LATENCY_WINDOW', 200))
+    
+    # Model routing per tier. When the primary runs past latency_budget seconds
+    # (or its p95, if lower) a hedged request goes to the fallback.
+    MODEL_ROUTES = {
+        'starter': {'primary': 'gpt-3.5-turbo'},
+        'premium': {'primary': 'gpt-4', 'fallback': 'gpt-3.5-turbo', 'latency_budget': 15.0}
+    }
+    ROUTER_MAX_ERROR_RATE = float(os.environ.get('ROUTER_MAX_ERROR_RATE', 0.5))
+    ROUTER_MIN_SAMPLES = int(os.environ.get('ROUTER_MIN_SAMPLES', 20))
+    ROUTER_MAX_WORKERS = int(os.environ.get('ROUTER_MAX_WORKERS', 16))
+    
+    # Organisation-wide OpenAI limits per model, shared by every worker through
+    # TOKEN_BUDGET_BACKEND: 'redis' (uses REDIS_URL), 'memory' (per process) or 'none'
+    OPENAI_RATE_LIMITS = {
+        'gpt-3.5-turbo': {
+            'tpm': int(os.environ.get('OPENAI_GPT35_TPM', 160000)),
+            'rpm': int(os.environ.get('OPENAI_GPT35_RPM', 3500))
+        },
+        'gpt-4': {
+            'tpm': int(os.environ.get('OPENAI_GPT4_TPM', 40000)),
+            'rpm': int(os.environ.get('OPENAI_GPT4_RPM', 500))
+        }
+    }
+    TOKEN_BUDGET_BACKEND = os.environ.get('TOKEN_BUDGET_BACKEND', 'memory')
+    # Share of each budget that only premium requests may use
+    TOKEN_BUDGET_PREMIUM_RESERVE = float(os.environ.get('TOKEN_BUDGET_PREMIUM_RESERVE', 0.2))
+    # Seconds a request may queue for budget before it is rejected
+    TOKEN_BUDGET_MAX_WAIT = float(os.environ.get('TOKEN_BUDGET_MAX_WAIT', 5))
+    # Per-model overrides passed to OpenAI.with_options (timeout, max_retries)
+    OPENAI_MODEL_SETTINGS = {
+        'gpt-3.5-turbo': {'timeout': 30.0},
+        'gpt-4': {'timeout': 90.0}
+    }
     
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -56,8 +127,66 @@ class Config:
     STARTER_MONTHLY_LIMIT = 5
     PREMIUM_MONTHLY_LIMIT = 1000
     
-    # Logging
+    # Alternative drafts generated per job in one API call (the `n` parameter)
+    MAX_PROPOSAL_VARIANTS = int(os.environ.get('MAX_PROPOSAL_VARIANTS', 3))
+    
+    # Batch generation API
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 50))
+    BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 5))
+    
+    # Proposal response cache: 'memory', 'redis' (uses REDIS_URL) or 'none'
+    PROPOSAL_CACHE_BACKEND = os.environ.get('PROPOSAL_CACHE_BACKEND', 'memory')
+    PROPOSAL_CACHE_TTL = int(os.environ.get('PROPOSAL_CACHE_TTL', 3600))
+    PROPOSAL_CACHE_MAX_ENTRIES = int(os.environ.get('PROPOSAL_CACHE_MAX_ENTRIES', 1024))
+    
+    # Snapshots of the logged-in user: 'memory', 'redis' (uses REDIS_URL) or 'none'
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'memory')
+    # Bounds how long another worker may show a changed plan or usage count
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+    
+    # Compression of Proposal.content and job_description (see compression.py)
+    COMPRESS_PROPOSAL_TEXT = os.environ.get('COMPRESS_PROPOSAL_TEXT', 'false').lower() in ['true', 'on', '1']
+    TEXT_COMPRESSION_MIN_LENGTH = int(os.environ.get('TEXT_COMPRESSION_MIN_LENGTH', 512))
+    TEXT_COMPRESSION_LEVEL = int(os.environ.get('TEXT_COMPRESSION_LEVEL', 6))
+    TEXT_COMPRESSION_DICT_DIR = os.environ.get('TEXT_COMPRESSION_DICT_DIR', 'compression_dicts')
+    # Id of the shared dictionary used for new writes; unset compresses without one
+    TEXT_COMPRESSION_DICT = os.environ.get('TEXT_COMPRESSION_DICT')
+    
+    # Similar past proposal lookup (see similar.py): users whose matrices stay cached per worker
+    SIMILAR_CACHE_MAX_USERS = int(os.environ.get('SIMILAR_CACHE_MAX_USERS', 256))
+    # Cosine similarity below which a past proposal is not suggested
+    SIMILAR_MIN_SCORE = float(os.environ.get('SIMILAR_MIN_SCORE', 0.2))
+    
+    # Werkzeug method for new password hashes; older hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    # Hashes computed at once per worker, and how many more may wait before logins get a 503
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Coalescing of duplicate in-flight submissions: 'local' or 'redis' (uses REDIS_URL)
+    SINGLEFLIGHT_BACKEND = os.environ.get('SINGLEFLIGHT_BACKEND', 'local')
+    SINGLEFLIGHT_LOCK_TTL = int(os.environ.get('SINGLEFLIGHT_LOCK_TTL', 120))
+    
+    # Operational metrics at /metrics; the endpoint is disabled unless set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Logging: JSON lines written off the request thread (see request_logging.py)
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE')
+    LOG_FILE_MAX_BYTES = int(os.environ.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_FILE_BACKUP_COUNT = int(os.environ.get('LOG_FILE_BACKUP_COUNT', 10))
+    # Records waiting for the writer thread; beyond this they are dropped
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Share of successful requests logged per endpoint (1.0 when not listed)
+    LOG_SAMPLE_RATES = {
+        'job_status': float(os.environ.get('LOG_SAMPLE_RATE_JOB_STATUS', 0.1)),
+        'static': float(os.environ.get('LOG_SAMPLE_RATE_STATIC', 0.1))
+    }
+    
+    # Send each request's stage timings to clients in a Server-Timing header (see timing.py)
+    SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() in ['true', 'on', '1']
     
     # Sentry
     SENTRY_DSN = os.environ.get('SENTRY_DSN')
@@ -65,6 +194,10 @@ class Config:
     # Redis for caching and sessions
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Background generation jobs (Celery)
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or REDIS_URL
+    CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'false').lower() in ['true', 'on', '1']
+    
     # Domain settings
     DOMAIN = os.environ.get('DOMAIN', 'draftcraftagent.com')
 
@@ -77,26 +210,18 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SESSION_COOKIE_SECURE = False
     SECURITY_HEADERS = {}
+    CELERY_TASK_ALWAYS_EAGER = True
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    LOG_FILE = os.environ.get('LOG_FILE', 'logs/proposifyai.log')
     
     @classmethod
     def init_app(cls, app):
-        # Ensure HTTPS in production
+        # The log file itself is set up by request_logging from LOG_FILE
         if not app.debug and not app.testing:
-            import logging
-            from logging.handlers import RotatingFileHandler
-            if not os.path.exists('logs'):
-                os.mkdir('logs')
-            file_handler = RotatingFileHandler('logs/proposifyai.log', maxBytes=10240, backupCount=10)
-            file_handler.setFormatter(logging.Formatter(
-                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-            ))
-            file_handler.setLevel(logging.INFO)
-            app.logger.addHandler(file_handler)
-            app.logger.setLevel(logging.INFO)
             app.logger.info('DraftCraft Agent startup')
 
 class TestingConfig(Config):
@@ -104,6 +229,13 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    # Stripe calls are patched in tests; these only need to be set
+    STRIPE_PUBLIC_KEY = 'pk_test_dummy'
+    STRIPE_SECRET_KEY = 'sk_test_dummy'
+    STRIPE_WEBHOOK_SECRET = 'whsec_test_dummy'
+    STRIPE_PREMIUM_PRICE_ID = 'price_test_dummy'
+    CELERY_TASK_ALWAYS_EAGER = True
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
 
 config = {
     'development': DevelopmentConfig,
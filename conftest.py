@@ -0,0 +1,42 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from models import db, User, Proposal
+
+@pytest.fixture
+def app_config():
+    """Config class the client fixture builds its app from; override it in a module to change settings"""
+    return TestingConfig
+
+@pytest.fixture
+def client(app_config):
+    app = create_app(app_config)
+    with app.app_context():
+        db.create_all()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def login(client):
+    """login(email, is_premium=False) saves a user and signs the test client in as them"""
+    def login(email='owner@example.com', is_premium=False):
+        user = User(email=email, password_hash='x', is_premium=is_premium)
+        db.session.add(user)
+        db.session.commit()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+        return user
+    return login
+
+@pytest.fixture
+def add_proposal(client):
+    """add_proposal(user, **fields) saves a proposal for user; fields override the placeholders"""
+    def add_proposal(user, **fields):
+        fields = {'content': 'Proposal', 'client_name': 'Client', 'job_description': 'Job', 'skills': 'Python',
+                  'model_used': 'gpt-3.5-turbo', 'tier': 'starter', **fields}
+        proposal = Proposal(user_id=user.id, **fields)
+        db.session.add(proposal)
+        db.session.commit()
+        return proposal
+    return add_proposal
@@ -1,11 +1,108 @@
-import openai
+import time
 import logging
-from config import get_openai_api_key
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai_client import get_client
+from resilience import openai_resilience
+from token_budget import token_budget, estimate_tokens
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def generate_proposal(client_name, job_description, skills, model="gpt-3.5-turbo"):
+SYSTEM_PROMPT = "You are a helpful freelance proposal writer."
+# Bump whenever the prompt changes so cached proposals are not reused
+PROMPT_VERSION = 1
+MAX_TOKENS = 500
+
+# USD per 1K (prompt, completion) tokens; keep in step with OpenAI's price list
+MODEL_PRICING = {
+    'gpt-3.5-turbo': (Decimal('0.0005'), Decimal('0.0015')),
+    'gpt-4': (Decimal('0.03'), Decimal('0.06'))
+}
+
+def compute_cost(model, prompt_tokens, completion_tokens):
+    """Return the USD cost of a call, or None for a model without pricing"""
+    if model not in MODEL_PRICING:
+        return None
+    prompt_price, completion_price = MODEL_PRICING[model]
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+    return cost.quantize(Decimal('0.000001'))
+
+class GenerationResult:
+    """A generated proposal with the token usage, cost and latency it took"""
+
+    def __init__(self, text, model, prompt_tokens=0, completion_tokens=0, latency_ms=0, cached=False):
+        self.text = text
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.latency_ms = latency_ms
+        self.cached = cached
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def cost(self):
+        return compute_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+    def usage_columns(self):
+        """Proposal column values recording this result's usage"""
+        return {
+            'tokens_used': self.total_tokens,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost': self.cost,
+            'latency_ms': self.latency_ms
+        }
+
+    @classmethod
+    def from_response(cls, text, model, response, started):
+        usage = response.usage
+        return cls(
+            text, model,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            latency_ms=elapsed_ms(started)
+        )
+
+def elapsed_ms(started):
+    """Milliseconds since a time.monotonic() reading"""
+    return int((time.monotonic() - started) * 1000)
+
+def build_messages(client_name, job_description, skills):
+    """Build the chat messages sent to OpenAI for a proposal."""
+    prompt = (
+        f"Write a professional freelance proposal for the following client and job:\n\n"
+        f"Client Name: {client_name}\n"
+        f"Job Description: {job_description}\n"
+        f"Skills to Highlight: {skills}\n\n"
+        "The proposal should be concise, persuasive, and tailored to the client's needs."
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+def budgeted(model, tokens, tier, request):
+    """Wrap an OpenAI request so that each attempt reserves its own budget.
+
+    The reservation is settled against the reported usage, or given back in
+    full when the attempt fails.
+    """
+    def attempt():
+        reserved = token_budget.acquire(model, tokens, tier)
+        used = 0
+        try:
+            response = request()
+            used = response.usage.total_tokens if response.usage else None
+            return response
+        finally:
+            token_budget.settle(model, reserved, used)
+    return attempt
+
+def generate_proposal(client_name, job_description, skills, model="gpt-3.5-turbo", tier="starter"):
     """
     Generates a freelance proposal using OpenAI's API.
     Args:
@@ -13,37 +110,168 @@ def generate_proposal(client_name, job_description, skills, model="gpt-3.5-turbo
         job_description (str): The job description.
         skills (str): Skills to highlight.
         model (str): OpenAI model to use (default: gpt-3.5-turbo).
+        tier (str): Plan of the requesting user; premium may use the reserved budget.
     Returns:
-        str: The generated proposal text.
+        GenerationResult: The proposal text with its usage, cost and latency.
     Raises:
         RuntimeError: If the OpenAI API call fails.
     """
     try:
-        api_key = get_openai_api_key()
-        client = openai.OpenAI(api_key=api_key)
-        logger.debug("OpenAI client initialized successfully")
-
-        prompt = (
-            f"Write a professional freelance proposal for the following client and job:\n\n"
-            f"Client Name: {client_name}\n"
-            f"Job Description: {job_description}\n"
-            f"Skills to Highlight: {skills}\n\n"
-            "The proposal should be concise, persuasive, and tailored to the client's needs."
-        )
-
-        response = client.chat.completions.create(
+        started = time.monotonic()
+        client = get_client(model)
+        messages = build_messages(client_name, job_description, skills)
+        tokens = estimate_tokens(messages, MAX_TOKENS)
+        response = openai_resilience.call(model, budgeted(model, tokens, tier, lambda: client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful freelance proposal writer."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
+            messages=messages,
+            max_tokens=MAX_TOKENS,
             temperature=0.7
-        )
+        )))
         logger.info("Proposal generated successfully via OpenAI API.")
-        return response.choices[0].message.content.strip()
+        return GenerationResult.from_response(response.choices[0].message.content.strip(), model, response, started)
     except Exception as e:
         logger.error(f"OpenAI API error: {e}")
         logger.error(f"Error type: {type(e)}")
         logger.error(f"Error args: {e.args}")
         raise RuntimeError(f"OpenAI API error: {e}")
+
+def generate_proposal_variants(client_name, job_description, skills, model="gpt-3.5-turbo", n=3,
+                               tier="starter"):
+    """
+    Generates several alternative proposals in a single OpenAI API call.
+    The prompt is sent once and the API returns n choices, so prompt tokens
+    are paid for once rather than n times.
+    Args:
+        client_name (str): The name of the client.
+        job_description (str): The job description.
+        skills (str): Skills to highlight.
+        model (str): OpenAI model to use (default: gpt-3.5-turbo).
+        n (int): Number of drafts to generate (default: 3).
+        tier (str): Plan of the requesting user; premium may use the reserved budget.
+    Returns:
+        list: A GenerationResult per draft, in choice order. The first carries
+        the usage and cost of the whole call; the others record none.
+    Raises:
+        RuntimeError: If the OpenAI API call fails.
+    """
+    try:
+        started = time.monotonic()
+        client = get_client(model)
+        messages = build_messages(client_name, job_description, skills)
+        tokens = estimate_tokens(messages, MAX_TOKENS, n)
+        response = openai_resilience.call(model, budgeted(model, tokens, tier, lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=MAX_TOKENS,
+            temperature=0.7,
+            n=n
+        )))
+        logger.info(f"{len(response.choices)} proposal variants generated via OpenAI API.")
+        choices = sorted(response.choices, key=lambda choice: choice.index)
+        results = [GenerationResult.from_response(choice.message.content.strip(), model, response, started)
+                   for choice in choices]
+        for result in results[1:]:
+            result.prompt_tokens = result.completion_tokens = 0
+        return results
+    except Exception as e:
+        logger.error(f"OpenAI API error: {e}")
+        raise RuntimeError(f"OpenAI API error: {e}")
+
+def stream_proposal(client_name, job_description, skills, model="gpt-3.5-turbo", tier="starter"):
+    """
+    Streams a freelance proposal from OpenAI's API as it is generated.
+    Args:
+        client_name (str): The name of the client.
+        job_description (str): The job description.
+        skills (str): Skills to highlight.
+        model (str): OpenAI model to use (default: gpt-3.5-turbo).
+        tier (str): Plan of the requesting user; premium may use the reserved budget.
+    Yields:
+        str: Text fragments of the proposal in the order they arrive, then a
+        GenerationResult for the whole proposal once the stream ends.
+    Raises:
+        RuntimeError: If the OpenAI API call fails.
+    """
+    try:
+        started = time.monotonic()
+        client = get_client(model)
+        messages = build_messages(client_name, job_description, skills)
+        tokens = estimate_tokens(messages, MAX_TOKENS)
+        reserved = 0
+
+        def open_stream():
+            # Each attempt to open the stream reserves budget; failed ones give it back
+            nonlocal reserved
+            reserved = token_budget.acquire(model, tokens, tier)
+            try:
+                return client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=MAX_TOKENS,
+                    temperature=0.7,
+                    stream=True,
+                    # The final chunk then reports usage for the whole stream
+                    stream_options={'include_usage': True}
+                )
+            except Exception:
+                token_budget.settle(model, reserved, 0)
+                raise
+
+        # Only opening the stream is retried; tokens already sent cannot be taken back
+        stream = openai_resilience.call(model, open_stream, record_latency=False)
+        chunks = []
+        usage = None
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+        finally:
+            # Without usage the stream was cut short (e.g. the client went
+            # away), but OpenAI still bills what it generated: keep the estimate
+            token_budget.settle(model, reserved, usage.total_tokens if usage else reserved)
+        logger.info("Proposal streamed successfully via OpenAI API.")
+        yield GenerationResult(
+            ''.join(chunks).strip(), model,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            latency_ms=elapsed_ms(started)
+        )
+    except Exception as e:
+        logger.error(f"OpenAI API streaming error: {e}")
+        raise RuntimeError(f"OpenAI API error: {e}")
+
+def generate_proposals(jobs, model="gpt-3.5-turbo", max_workers=4, generate=None):
+    """
+    Generates proposals for several jobs concurrently.
+    Args:
+        jobs (list): Dicts with client_name, job_description and skills.
+        model (str): OpenAI model to use for every job.
+        max_workers (int): Maximum number of OpenAI calls in flight at once.
+        generate (callable): Generation function with the signature of
+            generate_proposal (default: generate_proposal).
+    Yields:
+        tuple: (index, result, error) for each job as it finishes; result is
+        the GenerationResult, or None when the job failed and error holds the exception.
+    """
+    generate = generate or generate_proposal
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs) or 1)))
+    try:
+        futures = {
+            executor.submit(generate, job['client_name'], job['job_description'], job['skills'], model): index
+            for index, job in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), None
+            except Exception as e:
+                yield index, None, e
+    finally:
+        # Stop queued jobs if the caller goes away part-way through
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+"""
+Background proposal generation jobs for DraftCraft Agent
+
+Run a worker pool with:
+    celery -A worker.celery worker --loglevel=info --concurrency=4
+
+With CELERY_TASK_ALWAYS_EAGER enabled, jobs run in-process when they are
+enqueued, so development and tests do not need a broker.
+"""
+import uuid
+from functools import partial
+import logging
+from datetime import datetime, timedelta, timezone
+from celery import Celery, Task
+from models import db, Proposal, GenerationJob
+from gpt_utils import generate_proposal, generate_proposal_variants
+from proposal_cache import proposal_cache, cache_key
+from singleflight import generation_flights
+from model_router import model_router
+from quota import usage_quota, Reservation, month_start
+from timing import span, task_stages
+
+logger = logging.getLogger(__name__)
+
+class FlaskTask(Task):
+    """Celery task that runs inside the Flask application context, with its stages timed"""
+    def __call__(self, *args, **kwargs):
+        with self.app.flask_app.app_context(), task_stages(self.name):
+            return self.run(*args, **kwargs)
+
+celery = Celery('draftcraft', task_cls=FlaskTask)
+
+def init_celery(app):
+    """Configure the Celery app from the Flask config"""
+    celery.conf.update(
+        broker_url=app.config['CELERY_BROKER_URL'],
+        task_always_eager=app.config['CELERY_TASK_ALWAYS_EAGER'],
+        task_ignore_result=True,
+        task_acks_late=True,
+        worker_prefetch_multiplier=1
+    )
+    celery.flask_app = app
+    app.extensions['celery'] = celery
+    return celery
+
+@celery.task(name='jobs.run_generation_job')
+def run_generation_job(job_id):
+    """Generate the proposal for a queued job and store the result"""
+    job = db.session.get(GenerationJob, job_id)
+    if job is None or job.is_finished:
+        logger.warning(f"Skipping generation job {job_id}: already finished")
+        return
+    if job.status == 'running':
+        # Tasks are acked late, so a running job is only delivered again when
+        # the worker running it died; its quota is still reserved, so run it
+        logger.warning(f"Restarting generation job {job_id} after its worker was lost")
+    
+    job.status = 'running'
+    job.started_at = datetime.now(timezone.utc)
+    db.session.commit()
+    
+    # Copy the inputs out of the session: hedged calls run on router threads
+    inputs = (job.client_name, job.job_description, job.skills)
+    variants, use_cache, tier = job.variants, job.use_cache, job.tier
+    
+    try:
+        def generate_with(model):
+            if variants > 1:
+                # One API call returns every draft; variants are not cached
+                return generate_proposal_variants(*inputs, model, n=variants, tier=tier)
+            return [proposal_cache.get_or_generate(partial(generate_proposal, tier=tier), *inputs, model,
+                                                   bypass=not use_cache)]
+        
+        # The router may answer from the fallback model; record whichever did
+        with span('generate'):
+            results, job.model_used = model_router.generate(tier, generate_with)
+        
+        proposals = [Proposal(
+            user_id=job.user_id,
+            content=result.text,
+            client_name=job.client_name,
+            job_description=job.job_description,
+            skills=job.skills,
+            model_used=job.model_used,
+            tier=job.tier,
+            variant_index=index if len(results) > 1 else None,
+            **result.usage_columns()
+        ) for index, result in enumerate(results)]
+        db.session.add_all(proposals)
+        
+        db.session.flush()
+        # The first draft starts out selected; the others hang off it
+        for variant in proposals[1:]:
+            variant.parent_id = proposals[0].id
+        job.proposal_id = proposals[0].id
+        job.status = 'succeeded'
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+        logger.info(f"Generation job {job_id} succeeded for user {job.user_id} using {job.model_used}")
+    except Exception as e:
+        db.session.rollback()
+        _fail_job(db.session.get(GenerationJob, job_id), e)
+
+def _fail_job(job, error):
+    """Mark a job failed and refund the usage reserved for it"""
+    job.status = 'failed'
+    job.error = str(error)[:255]
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+    logger.error(f"Generation job {job.id} failed: {error}")
+    # Usage was reserved when the job was queued; nothing was delivered
+    if job.quota_reserved:
+        usage_quota.refund(Reservation(job.user_id, job.quota_reserved, month_start(job.created_at)))
+
+def _start_generation_job(user_id, fingerprint, client_name, job_description, skills, tier, model,
+                          use_cache, variants):
+    """Return the id of the user's in-flight job for these inputs, or start a new one"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=generation_flights.lock_ttl)
+    job = GenerationJob.query.filter(
+        GenerationJob.user_id == user_id,
+        GenerationJob.fingerprint == fingerprint,
+        GenerationJob.status.in_(('queued', 'running')),
+        GenerationJob.created_at >= cutoff
+    ).first()
+    if job is not None:
+        logger.info(f"Joining in-flight generation job {job.id} for user {user_id}")
+        return job.id
+    
+    # Committed before generation starts; raises QuotaExceededError at the limit.
+    # A set of drafts for one job counts once.
+    reservation = usage_quota.reserve(user_id, tier)
+    job = GenerationJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        fingerprint=fingerprint,
+        client_name=client_name,
+        job_description=job_description,
+        skills=skills,
+        tier=tier,
+        model_used=model,
+        use_cache=use_cache,
+        variants=variants,
+        quota_reserved=reservation.count
+    )
+    db.session.add(job)
+    # The worker reads the job from its own session, so it must be committed first
+    db.session.commit()
+    
+    try:
+        run_generation_job.apply_async(args=[job.id])
+    except Exception as e:
+        # Broker unreachable: no worker will ever pick the job up
+        _fail_job(job, f'Could not queue generation job: {e}')
+    return job.id
+
+def enqueue_generation(user_id, client_name, job_description, skills, tier, model, use_cache=True, variants=1):
+    """Record a generation job and hand it to the worker pool.
+
+    Duplicate submissions (same user and normalized inputs) made while a job
+    is still running share that job, so they produce one Proposal row and
+    one usage increment. Usage is reserved when a new job is created and
+    refunded if the job fails.
+
+    Args:
+        use_cache (bool): Allow the job to be answered from the proposal cache.
+        variants (int): Number of alternative drafts to generate in one API call.
+    Returns:
+        GenerationJob: The job row. In eager mode it has already finished.
+    Raises:
+        QuotaExceededError: If the user has no monthly usage left.
+    """
+    fingerprint = cache_key(client_name, job_description, skills, model)
+    if variants > 1:
+        fingerprint = f'{fingerprint}:n{variants}'
+    job_id, shared = generation_flights.do(
+        f'{user_id}:{fingerprint}',
+        lambda: _start_generation_job(user_id, fingerprint, client_name, job_description,
+                                      skills, tier, model, use_cache, variants)
+    )
+    if shared:
+        logger.info(f"Duplicate submission from user {user_id} coalesced onto job {job_id}")
+    job = db.session.get(GenerationJob, job_id)
+    db.session.refresh(job)
+    return job
@@ -0,0 +1,46 @@
+"""Add the generation_job table for background generation
+
+Revision ID: 1b7e3d9a5c20
+Revises: a0c4e1f7b2d9
+Create Date: 2026-10-16 09:08:31.902614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b7e3d9a5c20'
+down_revision = 'a0c4e1f7b2d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created from the models already have the table
+    if sa.inspect(op.get_bind()).has_table('generation_job'):
+        return
+    op.create_table(
+        'generation_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('client_name', sa.String(length=200), nullable=False),
+        sa.Column('job_description', sa.Text(), nullable=False),
+        sa.Column('skills', sa.Text(), nullable=False),
+        sa.Column('model_used', sa.String(length=50), nullable=False),
+        sa.Column('tier', sa.String(length=20), nullable=False),
+        sa.Column('proposal_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['proposal_id'], ['proposal.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_job_user_id', 'generation_job', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_table('generation_job')
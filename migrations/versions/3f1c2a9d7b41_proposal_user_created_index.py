@@ -0,0 +1,28 @@
+"""Composite (user_id, created_at, id) index for proposal listings
+
+Revision ID: 3f1c2a9d7b41
+Revises: f0b5d8e3a274
+Create Date: 2026-10-16 09:12:44.318205
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b41'
+down_revision = 'f0b5d8e3a274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created from the models already have the index
+    op.create_index('ix_proposal_user_created', 'proposal', ['user_id', 'created_at', 'id'],
+                    unique=False, if_not_exists=True)
+    # Superseded by the composite index's leading column
+    op.drop_index('ix_proposal_user_id', table_name='proposal', if_exists=True)
+
+
+def downgrade():
+    op.create_index('ix_proposal_user_id', 'proposal', ['user_id'], unique=False, if_not_exists=True)
+    op.drop_index('ix_proposal_user_created', table_name='proposal', if_exists=True)
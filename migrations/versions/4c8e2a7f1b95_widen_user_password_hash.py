@@ -0,0 +1,29 @@
+"""Widen user.password_hash to fit scrypt and pbkdf2:sha512 hashes
+
+Revision ID: 4c8e2a7f1b95
+Revises: b94f1a6e2d37
+Create Date: 2026-10-17 18:20:37.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2a7f1b95'
+down_revision = 'b94f1a6e2d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Werkzeug's scrypt hashes are about 160 characters long
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128),
+                              type_=sa.String(length=256), existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=256),
+                              type_=sa.String(length=128), existing_nullable=False)
@@ -0,0 +1,29 @@
+"""Add GenerationJob.use_cache
+
+Revision ID: 5e2a8c4f1d63
+Revises: 1b7e3d9a5c20
+Create Date: 2026-10-16 09:21:05.114382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2a8c4f1d63'
+down_revision = '1b7e3d9a5c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'use_cache' in columns:
+        return
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.add_column(sa.Column('use_cache', sa.Boolean(), nullable=True, server_default=sa.true()))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.drop_column('use_cache')
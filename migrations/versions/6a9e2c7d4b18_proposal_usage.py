@@ -0,0 +1,36 @@
+"""Add per-call token usage and latency to Proposal, widen cost to Numeric(12, 6)
+
+Revision ID: 6a9e2c7d4b18
+Revises: d3f8b0a6c915
+Create Date: 2026-10-16 10:41:56.208733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a9e2c7d4b18'
+down_revision = 'd3f8b0a6c915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('proposal')}
+    with op.batch_alter_table('proposal') as batch_op:
+        for name in ('prompt_tokens', 'completion_tokens', 'latency_ms'):
+            if name not in columns:
+                batch_op.add_column(sa.Column(name, sa.Integer(), nullable=True))
+        # Per-call costs of cheap models are well below 0.0001 USD
+        batch_op.alter_column('cost', existing_type=sa.Numeric(precision=10, scale=4),
+                              type_=sa.Numeric(precision=12, scale=6), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('proposal') as batch_op:
+        batch_op.alter_column('cost', existing_type=sa.Numeric(precision=12, scale=6),
+                              type_=sa.Numeric(precision=10, scale=4), existing_nullable=True)
+        batch_op.drop_column('latency_ms')
+        batch_op.drop_column('completion_tokens')
+        batch_op.drop_column('prompt_tokens')
@@ -0,0 +1,42 @@
+"""Add Proposal.embedding for similar proposal lookup and backfill it
+
+Revision ID: 7d3e5f0b8c12
+Revises: e2b7c4a91d06
+Create Date: 2026-10-17 14:22:17.604913
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+from compression import CompressedText
+from similar import backfill_vectors
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e5f0b8c12'
+down_revision = 'e2b7c4a91d06'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    with op.batch_alter_table('proposal') as batch_op:
+        batch_op.add_column(sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+    # CompressedText so vectors are built from the text compressed rows hold
+    proposal = sa.table('proposal', sa.column('id', sa.Integer), sa.column('variant_index', sa.Integer),
+                        sa.column('job_description', CompressedText), sa.column('skills', sa.Text),
+                        sa.column('embedding', sa.LargeBinary))
+    updated = backfill_vectors(op.get_bind(), proposal)
+    logger.info(f"Stored vectors for {updated} proposals")
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    with op.batch_alter_table('proposal') as batch_op:
+        batch_op.drop_column('embedding')
@@ -0,0 +1,62 @@
+"""Add Proposal.preview and backfill it from content
+
+Revision ID: 8a4e6d2c1f90
+Revises: 3f1c2a9d7b41
+Create Date: 2026-10-17 10:03:27.552910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6d2c1f90'
+down_revision = '3f1c2a9d7b41'
+branch_labels = None
+depends_on = None
+
+PREVIEW_LENGTH = 280
+BATCH_SIZE = 500
+
+
+def make_preview(text):
+    # Frozen copy of models.make_preview as of this revision
+    text = ' '.join((text or '').split())
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    cut = text[:PREVIEW_LENGTH].rsplit(' ', 1)[0] or text[:PREVIEW_LENGTH]
+    return cut + '…'
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('proposal'):
+        return
+    if 'preview' not in {column['name'] for column in inspector.get_columns('proposal')}:
+        with op.batch_alter_table('proposal') as batch_op:
+            batch_op.add_column(sa.Column('preview', sa.String(length=PREVIEW_LENGTH + 1), nullable=True))
+
+    # Backfill in id order, BATCH_SIZE rows per round trip
+    proposal = sa.table('proposal', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                        sa.column('preview', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(proposal.c.id, proposal.c.content)
+            .where(proposal.c.id > last_id, proposal.c.preview.is_(None))
+            .order_by(proposal.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            proposal.update().where(proposal.c.id == sa.bindparam('row_id')).values(preview=sa.bindparam('text')),
+            [{'row_id': row.id, 'text': make_preview(row.content)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('proposal') as batch_op:
+        batch_op.drop_column('preview')
@@ -0,0 +1,31 @@
+"""Add GenerationJob.fingerprint and its (user_id, fingerprint) index
+
+Revision ID: 9c1d6f2b8e47
+Revises: 5e2a8c4f1d63
+Create Date: 2026-10-16 09:34:48.660217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d6f2b8e47'
+down_revision = '5e2a8c4f1d63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'fingerprint' not in columns:
+        with op.batch_alter_table('generation_job') as batch_op:
+            batch_op.add_column(sa.Column('fingerprint', sa.String(length=80), nullable=True))
+    op.create_index('ix_generation_job_user_fingerprint', 'generation_job', ['user_id', 'fingerprint'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_generation_job_user_fingerprint', table_name='generation_job', if_exists=True)
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,89 @@
+"""Initial schema: user, proposal and login_history
+
+Revision ID: a0c4e1f7b2d9
+Revises:
+Create Date: 2026-10-16 09:05:12.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0c4e1f7b2d9'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() before migrations existed already
+    # have these tables; only the missing ones are created.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('user'):
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=False),
+            sa.Column('is_premium', sa.Boolean(), nullable=True),
+            sa.Column('is_verified', sa.Boolean(), nullable=True),
+            sa.Column('verification_token', sa.String(length=100), nullable=True),
+            sa.Column('reset_token', sa.String(length=100), nullable=True),
+            sa.Column('reset_token_expires', sa.DateTime(), nullable=True),
+            sa.Column('proposals_this_month', sa.Integer(), nullable=True),
+            sa.Column('last_reset', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('stripe_customer_id', sa.String(length=100), nullable=True),
+            sa.Column('subscription_id', sa.String(length=100), nullable=True),
+            sa.Column('subscription_status', sa.String(length=20), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('verification_token'),
+            sa.UniqueConstraint('reset_token'),
+            sa.UniqueConstraint('stripe_customer_id'),
+            sa.UniqueConstraint('subscription_id')
+        )
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+
+    if not inspector.has_table('proposal'):
+        op.create_table(
+            'proposal',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('client_name', sa.String(length=200), nullable=False),
+            sa.Column('job_description', sa.Text(), nullable=False),
+            sa.Column('skills', sa.Text(), nullable=False),
+            sa.Column('model_used', sa.String(length=50), nullable=False),
+            sa.Column('tokens_used', sa.Integer(), nullable=True),
+            sa.Column('cost', sa.Numeric(precision=10, scale=4), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('tier', sa.String(length=20), nullable=False),
+            sa.Column('is_favorite', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_proposal_user_id', 'proposal', ['user_id'], unique=False)
+        op.create_index('ix_proposal_created_at', 'proposal', ['created_at'], unique=False)
+
+    if not inspector.has_table('login_history'):
+        op.create_table(
+            'login_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('ip_address', sa.String(length=45), nullable=True),
+            sa.Column('user_agent', sa.String(length=256), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_login_history_user_id', 'login_history', ['user_id'], unique=False)
+        op.create_index('ix_login_history_timestamp', 'login_history', ['timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_table('login_history')
+    op.drop_table('proposal')
+    op.drop_table('user')
@@ -0,0 +1,45 @@
+"""Add proposal_skill tag table and tag existing proposals
+
+Revision ID: b94f1a6e2d37
+Revises: 7d3e5f0b8c12
+Create Date: 2026-10-17 15:48:03.271540
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+from skills import backfill_tags
+
+
+# revision identifiers, used by Alembic.
+revision = 'b94f1a6e2d37'
+down_revision = '7d3e5f0b8c12'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    tags = op.create_table(
+        'proposal_skill',
+        sa.Column('proposal_id', sa.Integer(), sa.ForeignKey('proposal.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('skill', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('proposal_id', 'skill'),
+        if_not_exists=True
+    )
+    op.create_index('ix_proposal_skill_user_skill', 'proposal_skill', ['user_id', 'skill', 'proposal_id'],
+                    if_not_exists=True)
+
+    proposal = sa.table('proposal', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                        sa.column('skills', sa.Text))
+    tagged = backfill_tags(op.get_bind(), proposal, tags)
+    logger.info(f"Tagged {tagged} proposals with normalized skills")
+
+
+def downgrade():
+    op.drop_index('ix_proposal_skill_user_skill', table_name='proposal_skill', if_exists=True)
+    op.drop_table('proposal_skill', if_exists=True)
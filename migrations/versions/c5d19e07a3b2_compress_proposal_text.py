@@ -0,0 +1,46 @@
+"""Compress existing Proposal content and job descriptions
+
+Revision ID: c5d19e07a3b2
+Revises: 8a4e6d2c1f90
+Create Date: 2026-10-17 11:41:09.027364
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+from compression import backfill
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d19e07a3b2'
+down_revision = '8a4e6d2c1f90'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['content', 'job_description']
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def proposal_table():
+    return sa.table('proposal', sa.column('id', sa.Integer),
+                    *[sa.column(column, sa.Text) for column in COLUMNS])
+
+
+def upgrade():
+    # Compression is opt-in: with it off this revision changes nothing, and
+    # `flask compression backfill` can be run after switching it on.
+    if not current_app.config.get('COMPRESS_PROPOSAL_TEXT'):
+        return
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    report = backfill(op.get_bind(), proposal_table(), COLUMNS)
+    logger.info(f"Compressed {report['rows']} proposals: "
+                f"{report['bytes_before']} -> {report['bytes_after']} bytes")
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    backfill(op.get_bind(), proposal_table(), COLUMNS, decompress=True)
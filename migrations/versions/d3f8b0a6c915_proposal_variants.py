@@ -0,0 +1,42 @@
+"""Add Proposal.parent_id/variant_index and GenerationJob.variants
+
+Revision ID: d3f8b0a6c915
+Revises: 9c1d6f2b8e47
+Create Date: 2026-10-16 10:02:19.387541
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b0a6c915'
+down_revision = '9c1d6f2b8e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    proposal_columns = {column['name'] for column in inspector.get_columns('proposal')}
+    if 'parent_id' not in proposal_columns:
+        with op.batch_alter_table('proposal') as batch_op:
+            batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('variant_index', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_proposal_parent_id', 'proposal', ['parent_id'], ['id'])
+            batch_op.create_index('ix_proposal_parent_id', ['parent_id'], unique=False)
+
+    job_columns = {column['name'] for column in inspector.get_columns('generation_job')}
+    if 'variants' not in job_columns:
+        with op.batch_alter_table('generation_job') as batch_op:
+            batch_op.add_column(sa.Column('variants', sa.Integer(), nullable=True, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.drop_column('variants')
+    with op.batch_alter_table('proposal') as batch_op:
+        batch_op.drop_index('ix_proposal_parent_id')
+        batch_op.drop_constraint('fk_proposal_parent_id', type_='foreignkey')
+        batch_op.drop_column('variant_index')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,39 @@
+"""Full-text search index over proposals
+
+Revision ID: e2b7c4a91d06
+Revises: c5d19e07a3b2
+Create Date: 2026-10-17 13:05:42.518830
+
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+from compression import CompressedText
+from search import create_search_index, drop_search_index, rebuild_search_index, INDEXED_FIELDS
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4a91d06'
+down_revision = 'c5d19e07a3b2'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def proposal_table():
+    # CompressedText so compressed rows are indexed as the text they hold
+    return sa.table('proposal', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                    *[sa.column(field, CompressedText) for field in INDEXED_FIELDS])
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('proposal'):
+        return
+    create_search_index(op.get_bind())
+    indexed = rebuild_search_index(op.get_bind(), proposal_table())
+    logger.info(f"Indexed {indexed} proposals for search")
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
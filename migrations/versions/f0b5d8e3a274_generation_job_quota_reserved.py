@@ -0,0 +1,29 @@
+"""Add GenerationJob.quota_reserved
+
+Revision ID: f0b5d8e3a274
+Revises: 6a9e2c7d4b18
+Create Date: 2026-10-16 11:15:37.571092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f0b5d8e3a274'
+down_revision = '6a9e2c7d4b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'quota_reserved' in columns:
+        return
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.add_column(sa.Column('quota_reserved', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_job') as batch_op:
+        batch_op.drop_column('quota_reserved')
@@ -0,0 +1,150 @@
+"""
+Latency-aware model routing for DraftCraft Agent
+
+Each tier has a primary model and an optional fallback (see MODEL_ROUTES).
+When the primary is unhealthy (open circuit or high error rate) requests go
+straight to the fallback. Otherwise, if the primary has not answered within
+its latency budget, a hedged request is sent to the fallback and whichever
+answer arrives first wins. The model that produced the answer is returned so
+it can be recorded in Proposal.model_used. The losing call is still paid
+for, so its token usage and cost are added to the discarded_* counters once
+it completes.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
+from resilience import openai_resilience, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+class ModelRouter:
+    """Chooses models per tier and hedges slow primary calls"""
+
+    def __init__(self):
+        self.routes = {}
+        self.max_error_rate = 0.5
+        self.min_samples = 20
+        self.max_workers = 16
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {'hedged': 0, 'hedge_wins': 0, 'fallbacks': 0, 'rerouted': 0,
+                       'discarded_results': 0, 'discarded_tokens': 0, 'discarded_cost': 0.0}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def init_app(self, app):
+        """Configure routes and thresholds from the Flask config"""
+        self.routes = app.config['MODEL_ROUTES']
+        self.max_error_rate = app.config['ROUTER_MAX_ERROR_RATE']
+        self.min_samples = app.config['ROUTER_MIN_SAMPLES']
+        self.max_workers = app.config['ROUTER_MAX_WORKERS']
+        app.extensions['model_router'] = self
+
+    def _after_fork(self):
+        # Executor threads do not survive a fork
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _submit(self, fn, model):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='model-router')
+            return self._executor.submit(fn, model)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _record_discarded(self, future, model):
+        """Count the usage of a hedged call whose answer was not used"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        results = future.result()
+        if not isinstance(results, (list, tuple)):
+            results = [results]
+        tokens = sum(getattr(result, 'total_tokens', 0) for result in results)
+        # cost is a Decimal, or None for a model without pricing
+        cost = float(sum(getattr(result, 'cost', None) or 0 for result in results))
+        logger.info(f"Discarded {model} answer from a hedged call used {tokens} tokens (${cost:.6f})")
+        self._count('discarded_results', len(results))
+        self._count('discarded_tokens', tokens)
+        self._count('discarded_cost', cost)
+
+    def primary_model(self, tier):
+        """Return the model a tier is meant to use"""
+        return self.routes[tier]['primary']
+
+    def is_healthy(self, model):
+        """Whether a model's circuit is closed and its recent error rate is acceptable"""
+        health = openai_resilience.health(model)
+        if health['state'] == CircuitBreaker.OPEN:
+            return False
+        return health['samples'] < self.min_samples or health['error_rate'] <= self.max_error_rate
+
+    def choose(self, tier):
+        """Return the model to use for a tier right now, skipping an unhealthy primary"""
+        route = self.routes[tier]
+        fallback = route.get('fallback')
+        if fallback and not self.is_healthy(route['primary']) and self.is_healthy(fallback):
+            self._count('rerouted')
+            return fallback
+        return route['primary']
+
+    def hedge_delay(self, model, budget):
+        """Seconds to wait for a model before hedging: its p95, capped at the budget"""
+        health = openai_resilience.health(model)
+        if health['samples'] >= self.min_samples and health['p95'] is not None:
+            return min(budget, health['p95'])
+        return budget
+
+    def generate(self, tier, fn):
+        """Run fn(model) for the tier's route, hedging to the fallback when it is slow.
+
+        Args:
+            tier (str): 'starter' or 'premium'.
+            fn (callable): Called with a model name; performs the generation.
+        Returns:
+            tuple: (result, model) where model is the one that produced result.
+        """
+        route = self.routes[tier]
+        fallback = route.get('fallback')
+        model = self.choose(tier)
+        if not fallback or model == fallback:
+            return fn(model), model
+
+        primary = self._submit(fn, model)
+        try:
+            return primary.result(timeout=self.hedge_delay(model, route['latency_budget'])), model
+        except FuturesTimeout:
+            logger.info(f"{model} exceeded its latency budget; hedging with {fallback}")
+            self._count('hedged')
+        except Exception as e:
+            logger.warning(f"{model} failed ({e}); falling back to {fallback}")
+            self._count('fallbacks')
+            return fn(fallback), fallback
+
+        hedge = self._submit(fn, fallback)
+        models = {primary: model, hedge: fallback}
+        pending = set(models)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    # The other call keeps running; count what it used when it finishes
+                    loser = primary if future is hedge else hedge
+                    loser.add_done_callback(lambda loser: self._record_discarded(loser, models[loser]))
+                    return future.result(), models[future]
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        """Return hedging and fallback counters for this process"""
+        with self._lock:
+            return dict(self._stats, discarded_cost=round(self._stats['discarded_cost'], 6))
+
+model_router = ModelRouter()
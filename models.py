@@ -1,19 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta, timezone
-from werkzeug.security import generate_password_hash, check_password_hash
 import re
 from sqlalchemy import event
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import validates, load_only
+from compression import CompressedText
+from replicas import RoutingSession
+from passwords import password_hasher, UNUSABLE_PASSWORD
+import search
+import similar
+import skills
+import timing
 
 # Initialize SQLAlchemy in app.py
 # db = SQLAlchemy(app)
 
-db = SQLAlchemy()
+# Reads in @read_replica views may go to a replica (see replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     is_premium = db.Column(db.Boolean, default=False)
     is_verified = db.Column(db.Boolean, default=False)
     verification_token = db.Column(db.String(100), unique=True)
@@ -63,10 +70,20 @@ class User(db.Model):
             raise ValueError('Password must contain at least one number')
         if not re.search(r'[^a-zA-Z0-9]', password):
             raise ValueError('Password must contain at least one special character')
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
+
+    def set_unusable_password(self):
+        """For accounts that sign in through OAuth: no password logs in until one is reset"""
+        self.password_hash = UNUSABLE_PASSWORD
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Check a password, upgrading a hash made with old parameters (the caller commits)"""
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        upgraded = password_hasher.upgrade(self.password_hash, password)
+        if upgraded:
+            self.password_hash = upgraded
+        return True
     
     def reset_monthly_usage(self):
         """Reset monthly usage counter"""
@@ -77,6 +94,14 @@ class User(db.Model):
             return True
         return False
     
+    @property
+    def monthly_usage(self):
+        """Proposals counted this month; a counter from an earlier month reads as 0"""
+        now = datetime.utcnow()
+        if self.last_reset is None or (self.last_reset.year, self.last_reset.month) != (now.year, now.month):
+            return 0
+        return self.proposals_this_month or 0
+    
     def can_generate_proposal(self, tier='starter'):
         """Check if user can generate a proposal"""
         self.reset_monthly_usage()
@@ -91,6 +116,44 @@ class User(db.Model):
         
         return True, "OK"
     
+    @classmethod
+    def charge_usage(cls, user_id, count, limit, period_start):
+        """Atomically add count proposals to monthly usage if it stays within limit.
+
+        A counter last reset before period_start is restarted from zero by
+        the same statement, so no separate reset has to run first.
+
+        Returns:
+            bool: True if the usage was charged.
+        """
+        if count > limit:
+            return False
+        stale = db.or_(cls.last_reset.is_(None), cls.last_reset < period_start)
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.id == user_id, db.or_(stale, cls.proposals_this_month + count <= limit))
+            .values(
+                proposals_this_month=db.case((stale, count), else_=cls.proposals_this_month + count),
+                last_reset=db.case((stale, datetime.utcnow()), else_=cls.last_reset)
+            )
+        )
+        return result.rowcount == 1
+    
+    @classmethod
+    def refund_usage(cls, user_id, count, period_start):
+        """Give back usage charged for proposals that were not delivered.
+
+        Nothing is refunded once the counter has moved on to a later period.
+        """
+        db.session.execute(
+            db.update(cls)
+            .where(cls.id == user_id, cls.last_reset >= period_start)
+            .values(proposals_this_month=db.case(
+                (cls.proposals_this_month > count, cls.proposals_this_month - count),
+                else_=0
+            ))
+        )
+    
     def generate_verification_token(self):
         """Generate email verification token"""
         import secrets
@@ -110,19 +173,50 @@ class User(db.Model):
             return False
         return datetime.now(timezone.utc) < self.reset_token_expires
 
+PREVIEW_LENGTH = 280
+
+def make_preview(text):
+    """Return the first PREVIEW_LENGTH characters of text, cut at a word boundary"""
+    text = ' '.join((text or '').split())
+    if len(text) <= PREVIEW_LENGTH:
+        return text
+    cut = text[:PREVIEW_LENGTH].rsplit(' ', 1)[0] or text[:PREVIEW_LENGTH]
+    return cut + '…'
+
 class Proposal(db.Model):
+    __table_args__ = (
+        # Serves the per-user, newest-first listings and their keyset cursors;
+        # its leading column also covers plain user_id lookups
+        db.Index('ix_proposal_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
-    content = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content = db.Column(CompressedText, nullable=False)
     client_name = db.Column(db.String(200), nullable=False)
-    job_description = db.Column(db.Text, nullable=False)
+    job_description = db.Column(CompressedText, nullable=False)
     skills = db.Column(db.Text, nullable=False)
     model_used = db.Column(db.String(50), nullable=False)  # 'gpt-3.5-turbo' or 'gpt-4'
     tokens_used = db.Column(db.Integer)
-    cost = db.Column(db.Numeric(10, 4))  # Cost in USD
+    prompt_tokens = db.Column(db.Integer)
+    completion_tokens = db.Column(db.Integer)
+    cost = db.Column(db.Numeric(12, 6))  # Cost in USD
+    latency_ms = db.Column(db.Integer)  # Wall-clock generation time
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     tier = db.Column(db.String(20), nullable=False)  # 'starter' or 'premium'
     is_favorite = db.Column(db.Boolean, default=False)
+    # Alternative drafts point at the selected draft of their group
+    parent_id = db.Column(db.Integer, db.ForeignKey('proposal.id'), index=True)
+    variant_index = db.Column(db.Integer)
+    # Excerpt of content shown in listings, so they can skip the Text columns
+    preview = db.Column(db.String(PREVIEW_LENGTH + 1))
+    # float32 feature-hashed vector of the job, for similar proposal lookup
+    embedding = db.deferred(db.Column(db.LargeBinary))
+    
+    @validates('content')
+    def set_preview(self, key, value):
+        self.preview = make_preview(value)
+        return value
     
     @validates('client_name', 'job_description', 'skills')
     def validate_inputs(self, key, value):
@@ -132,17 +226,187 @@ class Proposal(db.Model):
             raise ValueError(f'{key.replace("_", " ").title()} is too long')
         return value.strip()
     
+    def variant_group(self):
+        """Return every draft generated alongside this one, in generation order"""
+        root_id = self.parent_id or self.id
+        group = Proposal.query.filter(
+            db.or_(Proposal.id == root_id, Proposal.parent_id == root_id)
+        ).all()
+        return sorted(group, key=lambda proposal: proposal.variant_index or 0)
+    
+    def select_variant(self):
+        """Make this draft the selected one of its group"""
+        for proposal in self.variant_group():
+            proposal.parent_id = None if proposal.id == self.id else self.id
+    
+    @classmethod
+    def summaries(cls):
+        """Query loading only the columns listings need, not the Text bodies"""
+        return cls.query.options(load_only(
+            cls.id, cls.user_id, cls.client_name, cls.preview, cls.model_used, cls.tokens_used,
+            cls.cost, cls.created_at, cls.tier, cls.is_favorite, cls.parent_id
+        ))
+    
+    def to_summary_dict(self):
+        """Convert to a listing entry; use to_dict for the full proposal"""
+        return {
+            'id': self.id,
+            'client_name': self.client_name,
+            'preview': self.preview,
+            'model_used': self.model_used,
+            'tokens_used': self.tokens_used,
+            'cost': float(self.cost) if self.cost is not None else None,
+            'created_at': self.created_at.isoformat(),
+            'tier': self.tier,
+            'is_favorite': self.is_favorite
+        }
+    
     def to_dict(self):
         """Convert to dictionary for API responses"""
         return {
             'id': self.id,
             'client_name': self.client_name,
             'content': self.content,
+            'job_description': self.job_description,
+            'skills': self.skills,
             'model_used': self.model_used,
+            'tokens_used': self.tokens_used,
+            'cost': float(self.cost) if self.cost is not None else None,
             'created_at': self.created_at.isoformat(),
             'tier': self.tier,
             'is_favorite': self.is_favorite
         }
+    
+    @classmethod
+    def usage_rollup(cls, since, user_id=None):
+        """Aggregate tokens, cost and latency per day, user and model.
+
+        Args:
+            since (datetime): Only count proposals created at or after this time.
+            user_id (int): Restrict the rollup to one user.
+        Returns:
+            list: One dict per (day, user_id, model), newest day first.
+        """
+        day = db.func.date(cls.created_at)
+        query = db.session.query(
+            day.label('day'),
+            cls.user_id,
+            cls.model_used,
+            db.func.count(cls.id),
+            db.func.coalesce(db.func.sum(cls.prompt_tokens), 0),
+            db.func.coalesce(db.func.sum(cls.completion_tokens), 0),
+            db.func.coalesce(db.func.sum(cls.cost), 0),
+            db.func.avg(cls.latency_ms),
+            db.func.max(cls.latency_ms)
+        ).filter(cls.created_at >= since)
+        if user_id is not None:
+            query = query.filter(cls.user_id == user_id)
+        rows = query.group_by(day, cls.user_id, cls.model_used)\
+            .order_by(day.desc(), cls.user_id, cls.model_used).all()
+        return [{
+            'day': str(row[0]),
+            'user_id': row[1],
+            'model': row[2],
+            'proposals': row[3],
+            'prompt_tokens': int(row[4]),
+            'completion_tokens': int(row[5]),
+            'cost': round(float(row[6]), 6),
+            'avg_latency_ms': round(float(row[7])) if row[7] is not None else None,
+            'max_latency_ms': row[8]
+        } for row in rows]
+
+class ProposalSkill(db.Model):
+    """One normalized skill tag of a proposal (see skills.py)"""
+    __tablename__ = 'proposal_skill'
+    __table_args__ = (
+        # Inverted index: a user's proposals by skill, and their facet counts
+        db.Index('ix_proposal_skill_user_skill', 'user_id', 'skill', 'proposal_id'),
+    )
+    
+    proposal_id = db.Column(db.Integer, db.ForeignKey('proposal.id', ondelete='CASCADE'), primary_key=True)
+    skill = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # Copied from the proposal for the index
+    
+    @classmethod
+    def proposal_ids(cls, user_id, skill):
+        """Subquery of the ids of the user's proposals tagged with skill"""
+        return db.select(cls.proposal_id).where(cls.user_id == user_id, cls.skill == skill)
+    
+    @classmethod
+    def facets(cls, user_id, limit=20, within=()):
+        """Most used skills across the user's proposals, with proposal counts.
+
+        Args:
+            within (iterable): Only count proposals also tagged with all of these skills.
+        Returns:
+            list: (skill, count) pairs, most used first.
+        """
+        query = db.session.query(cls.skill, db.func.count(cls.proposal_id))\
+            .join(Proposal, Proposal.id == cls.proposal_id)\
+            .filter(cls.user_id == user_id, Proposal.parent_id.is_(None))
+        for skill in within:
+            query = query.filter(cls.proposal_id.in_(cls.proposal_ids(user_id, skill)), cls.skill != skill)
+        rows = query.group_by(cls.skill).order_by(db.func.count(cls.proposal_id).desc(), cls.skill).limit(limit)
+        return [(row[0], row[1]) for row in rows]
+    
+    @classmethod
+    def popular(cls, since, limit=50):
+        """Skills across all users since a time, with proposal and favorite counts"""
+        rows = db.session.query(
+            cls.skill,
+            db.func.count(cls.proposal_id),
+            db.func.sum(db.case((Proposal.is_favorite.is_(True), 1), else_=0))
+        ).join(Proposal, Proposal.id == cls.proposal_id)\
+            .filter(Proposal.created_at >= since, Proposal.parent_id.is_(None))\
+            .group_by(cls.skill).order_by(db.func.count(cls.proposal_id).desc(), cls.skill).limit(limit).all()
+        return [{'skill': row[0], 'proposals': row[1], 'favorites': int(row[2] or 0)} for row in rows]
+
+class GenerationJob(db.Model):
+    __table_args__ = (
+        db.Index('ix_generation_job_user_fingerprint', 'user_id', 'fingerprint'),
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    fingerprint = db.Column(db.String(80))  # proposal_cache.cache_key of the inputs
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    client_name = db.Column(db.String(200), nullable=False)
+    job_description = db.Column(db.Text, nullable=False)
+    skills = db.Column(db.Text, nullable=False)
+    model_used = db.Column(db.String(50), nullable=False)
+    tier = db.Column(db.String(20), nullable=False)
+    use_cache = db.Column(db.Boolean, default=True)
+    variants = db.Column(db.Integer, default=1)
+    quota_reserved = db.Column(db.Integer, default=0)  # Monthly usage units to refund on failure
+    proposal_id = db.Column(db.Integer, db.ForeignKey('proposal.id'))
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    proposal = db.relationship('Proposal')
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'proposal_id': self.proposal_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if self.status == 'succeeded' and self.proposal:
+            data['content'] = self.proposal.content
+            if self.variants and self.variants > 1:
+                data['variants'] = [{'id': proposal.id, 'content': proposal.content}
+                                    for proposal in self.proposal.variant_group()]
+        if self.status == 'failed':
+            data['error'] = 'Proposal generation failed. Please try again.'
+        return data
 
 class LoginHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -162,4 +426,10 @@ def set_user_defaults(mapper, connection, target):
 def set_proposal_defaults(mapper, connection, target):
     """Set default values for new proposals"""
     if not target.created_at:
-        target.created_at = datetime.now(timezone.utc) 
\ No newline at end of file
+        target.created_at = datetime.now(timezone.utc) 
+
+# Search index, similarity vectors and skill tags, kept in step with proposal writes
+search.register(db, Proposal)
+similar.register(Proposal)
+skills.register(Proposal, ProposalSkill)
+timing.instrument_commits(RoutingSession)
@@ -0,0 +1,158 @@
+"""
+Process-wide pooled OpenAI client for DraftCraft Agent
+
+One httpx connection pool is shared by every OpenAI call in the process, so
+proposals reuse warm keep-alive connections instead of paying for a new TLS
+handshake each time. The pool is dropped in forked children (gunicorn
+workers, Celery prefork) so sockets are never shared across processes.
+"""
+import os
+import threading
+import logging
+import httpx
+import openai
+from config import get_openai_api_key
+
+logger = logging.getLogger(__name__)
+
+class OpenAIClientManager:
+    """Lazily builds and caches OpenAI clients backed by one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configure()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def configure(self, max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0,
+                  connect_timeout=5.0, read_timeout=60.0, max_retries=0, model_settings=None, base_url=None):
+        """Set pool and timeout options; takes effect for clients built afterwards"""
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.model_settings = dict(model_settings or {})
+
+    def init_app(self, app):
+        """Configure the manager from the Flask config"""
+        self.configure(
+            max_connections=app.config['OPENAI_POOL_MAX_CONNECTIONS'],
+            max_keepalive_connections=app.config['OPENAI_POOL_MAX_KEEPALIVE'],
+            keepalive_expiry=app.config['OPENAI_POOL_KEEPALIVE_EXPIRY'],
+            connect_timeout=app.config['OPENAI_CONNECT_TIMEOUT'],
+            read_timeout=app.config['OPENAI_READ_TIMEOUT'],
+            max_retries=app.config['OPENAI_MAX_RETRIES'],
+            model_settings=app.config['OPENAI_MODEL_SETTINGS'],
+            base_url=app.config['OPENAI_BASE_URL']
+        )
+        self.close()
+        app.extensions['openai_client'] = self
+
+    def _reset(self):
+        """Forget every client; used at start-up and in forked children"""
+        self._pid = os.getpid()
+        self._http_client = None
+        self._client = None
+        self._api_key = None
+        self._model_clients = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0}
+
+    def _after_fork(self):
+        # The parent may have held the lock mid-fork; the child gets fresh state
+        self._lock = threading.Lock()
+        self._reset()
+
+    def close(self):
+        """Close the connection pool owned by this process"""
+        with self._lock:
+            if self._http_client is not None and self._pid == os.getpid():
+                self._http_client.close()
+            self._reset()
+
+    def _trace(self, counter):
+        """Build an httpcore trace callback that records how the request was served"""
+        def trace(event_name, info):
+            if event_name == 'connection.connect_tcp.complete':
+                counter['opened'] = True
+        return trace
+
+    def _on_request(self, request):
+        counter = {'opened': False}
+        request.extensions['trace'] = self._trace(counter)
+        request.extensions['draftcraft.pool_counter'] = counter
+
+    def _on_response(self, response):
+        counter = response.request.extensions.get('draftcraft.pool_counter')
+        if counter is None:
+            return
+        with self._stats_lock:
+            self._stats['requests'] += 1
+            if counter['opened']:
+                self._stats['connections_opened'] += 1
+            else:
+                self._stats['connections_reused'] += 1
+
+    def _build_http_client(self):
+        return openai.DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            event_hooks={'request': [self._on_request], 'response': [self._on_response]}
+        )
+
+    def get_http_client(self):
+        """Return the shared httpx client, building it on first use"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked without the at-fork hook running (e.g. os.fork in C code)
+                self._reset()
+            if self._http_client is None:
+                self._http_client = self._build_http_client()
+                logger.info(f"OpenAI connection pool created in process {self._pid}")
+            return self._http_client
+
+    def get_client(self, model=None):
+        """Return an OpenAI client for the model, sharing one connection pool.
+
+        Args:
+            model (str): Model name used to apply per-model timeout and retry settings.
+        Returns:
+            openai.OpenAI: A client whose requests go through the shared pool.
+        """
+        http_client = self.get_http_client()
+        api_key = get_openai_api_key()
+        with self._lock:
+            if self._client is None or api_key != self._api_key:
+                self._client = openai.OpenAI(api_key=api_key, http_client=http_client,
+                                             base_url=self.base_url, max_retries=self.max_retries)
+                self._api_key = api_key
+                self._model_clients = {}
+            settings = self.model_settings.get(model)
+            if not settings:
+                return self._client
+            if model not in self._model_clients:
+                # with_options shares the underlying httpx client
+                self._model_clients[model] = self._client.with_options(**settings)
+            return self._model_clients[model]
+
+    def stats(self):
+        """Return connection pool counters for this process"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pid'] = self._pid
+        stats['pool_open'] = self._http_client is not None
+        return stats
+
+client_manager = OpenAIClientManager()
+
+def get_client(model=None):
+    """Return the process-wide OpenAI client for the model"""
+    return client_manager.get_client(model)
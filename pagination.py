@@ -0,0 +1,52 @@
+"""
+Keyset (cursor) pagination for DraftCraft Agent
+
+Pages are read newest first by (created_at, id), continuing strictly after
+the last row of the previous page. Unlike OFFSET, the database seeks
+straight to the cursor through the (user_id, created_at, id) index, so deep
+pages cost the same as the first and no COUNT(*) is needed.
+"""
+import base64
+import binascii
+from datetime import datetime
+from models import db
+
+class InvalidCursorError(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor"""
+
+def encode_cursor(created_at, row_id):
+    """Return an opaque cursor pointing just past a row"""
+    raw = f'{created_at.isoformat()}|{row_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) a cursor points past"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, row_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError('Invalid cursor') from e
+
+def keyset_page(query, model, limit, cursor=None):
+    """Return one page of query, newest first, and the cursor for the next page.
+
+    Args:
+        query: Query over model, already filtered (e.g. by user).
+        model: Mapped class with created_at and id columns.
+        limit (int): Page size.
+        cursor (str): Cursor from the previous page, or None for the first page.
+    Returns:
+        tuple: (items, next_cursor) where next_cursor is None on the last page.
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(db.tuple_(model.created_at, model.id) < (created_at, row_id))
+    # One extra row tells us whether another page exists
+    items = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1].created_at, items[-1].id)
@@ -0,0 +1,146 @@
+"""
+Password hashing for DraftCraft Agent
+
+Hashing and verification run on a small thread pool (hashlib releases the
+GIL while deriving PBKDF2 and scrypt keys), so at most PASSWORD_HASH_WORKERS
+hashes use CPU at once no matter how many logins arrive. Up to
+PASSWORD_HASH_MAX_QUEUE more may wait for a thread; past that,
+PasswordHasherBusyError is raised straight away rather than holding another
+request worker. Hashes made with an older PASSWORD_HASH_METHOD are replaced
+on the next successful login. Accounts created through OAuth store
+UNUSABLE_PASSWORD, which never verifies and costs nothing to set.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+logger = logging.getLogger(__name__)
+
+# Not a valid Werkzeug hash, so no password matches it
+UNUSABLE_PASSWORD = '!'
+
+class PasswordHasherBusyError(RuntimeError):
+    """Raised when the hashing queue is full or a hash is not ready in time"""
+
+def canonical_method(method):
+    """Spell out a Werkzeug hash method with its defaults, as stored in hashes.
+
+    'pbkdf2' becomes 'pbkdf2:sha256:600000' and 'scrypt' 'scrypt:32768:8:1',
+    so stored hashes can be compared against the configured method.
+    """
+    name, *args = method.split(':')
+    if name == 'pbkdf2' and len(args) <= 2:
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt' and len(args) in (0, 3):
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f"Unsupported password hash method: {method}")
+
+def is_usable(pwhash):
+    """Whether a stored hash can match any password"""
+    return bool(pwhash) and pwhash.count('$') >= 2
+
+class PasswordHasher:
+    """Bounded pool for password hashing and verification"""
+
+    def __init__(self):
+        self.method = canonical_method('pbkdf2')
+        self.workers = 4
+        self.max_queue = 32
+        self.timeout = 10.0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def init_app(self, app):
+        """Configure the hash method and pool bounds from the Flask config"""
+        self.method = canonical_method(app.config['PASSWORD_HASH_METHOD'])
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.max_queue = app.config['PASSWORD_HASH_MAX_QUEUE']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        app.extensions['password_hasher'] = self
+
+    def _after_fork(self):
+        # Executor threads do not survive a fork
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusyError('Too many password checks in progress; try again shortly')
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hasher')
+                future = self._executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            # The hash still finishes in the background and frees its slot then
+            future.cancel()
+            self._count('rejected')
+            raise PasswordHasherBusyError('Password hashing timed out; try again shortly') from None
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        pwhash = self._run(generate_password_hash, password, self.method)
+        self._count('hashed')
+        return pwhash
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash"""
+        if not is_usable(pwhash):
+            return False
+        self._count('verified')
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether a usable hash was made with other than the configured method"""
+        return is_usable(pwhash) and pwhash.split('$', 1)[0] != self.method
+
+    def upgrade(self, pwhash, password):
+        """Return a hash with the configured method for a password just verified, or None.
+
+        Failing to upgrade is not an error: the old hash still works and is
+        upgraded on a later login.
+        """
+        if not self.needs_rehash(pwhash):
+            return None
+        try:
+            pwhash = self.hash(password)
+        except PasswordHasherBusyError:
+            return None
+        self._count('rehashed')
+        return pwhash
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(method=self.method, workers=self.workers, max_queue=self.max_queue)
+        return stats
+
+password_hasher = PasswordHasher()
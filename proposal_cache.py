@@ -0,0 +1,185 @@
+"""
+Response cache for proposal generation in DraftCraft Agent
+
+Identical resubmissions (after a timeout, a double-click, a browser retry)
+are answered from the cache instead of paying for another OpenAI call. Keys
+hash the normalized inputs together with the model and PROMPT_VERSION, so
+changing the prompt invalidates every cached proposal.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import redis
+from gpt_utils import PROMPT_VERSION, GenerationResult, elapsed_ms
+
+logger = logging.getLogger(__name__)
+
+def _collapse(value):
+    return ' '.join(value.split())
+
+def normalize_inputs(client_name, job_description, skills):
+    """Normalize proposal inputs so cosmetic differences share a cache entry"""
+    skill_list = sorted({_collapse(skill).casefold() for skill in skills.split(',') if skill.strip()})
+    return {
+        'client_name': _collapse(client_name),
+        'job_description': _collapse(job_description),
+        'skills': skill_list
+    }
+
+def cache_key(client_name, job_description, skills, model):
+    """Build the cache key for a proposal request"""
+    payload = json.dumps({
+        'prompt_version': PROMPT_VERSION,
+        'model': model,
+        'inputs': normalize_inputs(client_name, job_description, skills)
+    }, sort_keys=True)
+    return 'proposal:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class MemoryBackend:
+    """Process-local LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisBackend:
+    """Redis-backed cache shared by every worker.
+
+    Entries expire through Redis TTLs; configure the server with
+    maxmemory-policy allkeys-lru (or volatile-lru) for LRU eviction.
+    """
+
+    def __init__(self, url, prefix='draftcraft:'):
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value.encode('utf-8'), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+class ProposalCache:
+    """Cache in front of generate_proposal with hit/miss counters"""
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 3600
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Configure the backend from the Flask config"""
+        backend = app.config['PROPOSAL_CACHE_BACKEND']
+        self.ttl = app.config['PROPOSAL_CACHE_TTL']
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBackend(app.config['PROPOSAL_CACHE_MAX_ENTRIES'])
+        else:
+            self.backend = None
+        self._reset_stats()
+        app.extensions['proposal_cache'] = self
+
+    def _reset_stats(self):
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        """Return the cached proposal text, or None on a miss or backend error"""
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Proposal cache read failed: {e}")
+            self._count('errors')
+            value = None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, key, value):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Proposal cache write failed: {e}")
+            self._count('errors')
+
+    def get_or_generate(self, generate, client_name, job_description, skills, model, bypass=False):
+        """Return a cached proposal or generate and cache a new one.
+
+        Args:
+            generate (callable): Called with (client_name, job_description, skills, model) on a miss.
+            bypass (bool): Skip the cache lookup and always generate; the result is still stored.
+        Returns:
+            GenerationResult: The proposal; a cache hit records no tokens or cost.
+        """
+        if self.backend is None:
+            return generate(client_name, job_description, skills, model)
+
+        started = time.monotonic()
+        key = cache_key(client_name, job_description, skills, model)
+        if bypass:
+            self._count('bypassed')
+        else:
+            cached = self.get(key)
+            if cached is not None:
+                logger.info(f"Proposal cache hit for {model}")
+                return GenerationResult(cached, model, latency_ms=elapsed_ms(started), cached=True)
+
+        result = generate(client_name, job_description, skills, model)
+        self.set(key, result.text)
+        return result
+
+    def stats(self):
+        """Return cache counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__ if self.backend else None
+        stats['ttl'] = self.ttl
+        if isinstance(self.backend, MemoryBackend):
+            stats['entries'] = len(self.backend)
+        return stats
+
+proposal_cache = ProposalCache()
@@ -0,0 +1,77 @@
+"""
+Monthly proposal quota for DraftCraft Agent
+
+Starter usage is reserved with one conditional UPDATE before generation
+starts and committed straight away, so concurrent requests cannot both pass
+the limit and no row lock is held while OpenAI is working. The same
+statement starts the count again in a new month. Generation that fails
+gives its units back with refund().
+"""
+import logging
+from datetime import datetime
+from models import db, User
+from user_cache import user_cache
+from timing import timed
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceededError(Exception):
+    """Raised when a reservation would take a user past their monthly limit"""
+
+def month_start(now=None):
+    """Start of the current usage period (naive UTC, like the stored timestamps)"""
+    now = now or datetime.utcnow()
+    return datetime(now.year, now.month, 1)
+
+class Reservation:
+    """Units of monthly usage taken for one generation request"""
+
+    def __init__(self, user_id, count, period_start):
+        self.user_id = user_id
+        self.count = count
+        self.period_start = period_start
+
+class UsageQuota:
+    """Reserves and refunds monthly proposal usage per tier"""
+
+    def __init__(self):
+        self.limits = {'starter': 5}
+
+    def init_app(self, app):
+        """Configure tier limits from the Flask config"""
+        # Tiers without a limit are not metered
+        self.limits = {'starter': app.config['STARTER_MONTHLY_LIMIT']}
+        app.extensions['usage_quota'] = self
+
+    @timed('quota')
+    def reserve(self, user_id, tier, count=1):
+        """Take count units of the user's monthly quota and commit at once.
+
+        Returns:
+            Reservation: Pass to refund() if generation fails; its count is 0
+            for unmetered tiers.
+        Raises:
+            QuotaExceededError: If the units would exceed the tier's limit.
+        """
+        period_start = month_start()
+        limit = self.limits.get(tier)
+        if limit is None:
+            return Reservation(user_id, 0, period_start)
+        if not User.charge_usage(user_id, count, limit, period_start):
+            db.session.rollback()
+            raise QuotaExceededError(f"Monthly limit of {limit} proposals reached")
+        db.session.commit()
+        user_cache.invalidate(user_id)
+        return Reservation(user_id, count, period_start)
+
+    def refund(self, reservation, count=None):
+        """Give back all (or count) units of a reservation and commit"""
+        count = reservation.count if count is None else min(count, reservation.count)
+        if not count:
+            return
+        User.refund_usage(reservation.user_id, count, reservation.period_start)
+        db.session.commit()
+        user_cache.invalidate(reservation.user_id)
+        logger.info(f"Refunded {count} proposal(s) of monthly usage to user {reservation.user_id}")
+
+usage_quota = UsageQuota()
@@ -0,0 +1,204 @@
+"""
+Per-user, per-tier request limits for DraftCraft Agent
+
+The Limiter in security.py keys on the client IP. On top of it, generation
+endpoints and the JSON API are limited per user with a token bucket per
+scope and tier (TIER_RATE_LIMITS): `rate` requests per `period` seconds on
+average, in bursts of up to `burst`. With the Redis backend one Lua script
+refills and takes from the bucket atomically, so every gunicorn worker
+enforces the same limit; if Redis is unreachable a worker falls back to its
+own buckets. Limited responses carry X-RateLimit-Limit (the burst size),
+X-RateLimit-Remaining and X-RateLimit-Reset (seconds until the bucket is
+full again); rejected ones also carry Retry-After.
+"""
+import math
+import time
+import logging
+import threading
+from collections import namedtuple
+from functools import wraps
+from flask import g, request
+from flask_login import current_user
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket and take cost from it if it holds enough.
+# KEYS[1]: bucket key. ARGV: now (ms), cost, capacity, refill rate (per ms).
+# Returns {taken (0/1), whole tokens left, ms until cost fits (-1 if never), ms until full}.
+HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+level = math.min(capacity, level + math.max(0, now - ts) * rate)
+local taken = 0
+local retry = 0
+if level >= cost then
+    level = level - cost
+    taken = 1
+    redis.call('HSET', KEYS[1], 'level', tostring(level), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - level) / rate) + 1000)
+elseif cost > capacity then
+    retry = -1
+else
+    retry = math.ceil((cost - level) / rate)
+end
+return {taken, math.floor(level), retry, math.ceil((capacity - level) / rate)}
+"""
+
+Decision = namedtuple('Decision', 'allowed limit remaining retry_after reset')
+
+class RateLimitExceededError(Exception):
+    """Raised by a limited view when the user's bucket for its scope is empty"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class MemoryBuckets:
+    """Request buckets for this process only"""
+
+    def __init__(self):
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, cost, capacity, rate, now):
+        """Take cost from a bucket if it holds enough; return a Decision"""
+        with self._lock:
+            level, ts = self._levels.get(key, (capacity, now))
+            level = min(capacity, level + max(0.0, now - ts) * rate)
+            allowed = level >= cost
+            retry_after = 0.0
+            if allowed:
+                level -= cost
+                self._levels[key] = (level, now)
+            elif cost > capacity:
+                retry_after = math.inf
+            else:
+                retry_after = (cost - level) / rate
+        return Decision(allowed, capacity, math.floor(level), retry_after, (capacity - level) / rate)
+
+class RedisBuckets:
+    """Request buckets in Redis, shared by every worker"""
+
+    def __init__(self, url, prefix='draftcraft:ratelimit:'):
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._hit = self.client.register_script(HIT_SCRIPT)
+
+    def hit(self, key, cost, capacity, rate, now):
+        taken, remaining, retry_ms, reset_ms = self._hit(keys=[self.prefix + key],
+                                                         args=[int(now * 1000), cost, capacity, rate / 1000])
+        retry_after = math.inf if retry_ms < 0 else retry_ms / 1000
+        return Decision(bool(taken), capacity, remaining, retry_after, reset_ms / 1000)
+
+class TierRateLimiter:
+    """Limits requests per user and tier for scoped views"""
+
+    def __init__(self):
+        self.backend = None
+        self.fallback = MemoryBuckets()
+        self.limits = {}
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Configure limits and the backend from the Flask config"""
+        backend = app.config['RATE_LIMIT_BACKEND']
+        if backend == 'redis':
+            self.backend = RedisBuckets(app.config['REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBuckets()
+        else:
+            self.backend = None
+        self.fallback = MemoryBuckets()
+        self.limits = app.config['TIER_RATE_LIMITS']
+        self._reset_stats()
+        app.after_request(self._add_headers)
+        app.extensions['tier_rate_limiter'] = self
+
+    def _reset_stats(self):
+        self._stats = {'allowed': 0, 'rejected': 0, 'backend_errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def hit(self, scope, tier, identity, cost=1):
+        """Charge cost requests by identity against its tier's bucket for scope.
+
+        Returns:
+            Decision | None: The outcome, or None when the scope is not limited.
+        """
+        limit = self.limits.get(scope, {}).get(tier)
+        if self.backend is None or limit is None:
+            return None
+        key = f'{scope}:{tier}:{identity}'
+        capacity, rate = limit['burst'], limit['rate'] / limit['period']
+        if isinstance(self.backend, RedisBuckets):
+            try:
+                decision = self.backend.hit(key, cost, capacity, rate, time.time())
+            except redis.RedisError as e:
+                logger.warning(f"Rate limit store unavailable, using per-process buckets: {e}")
+                self._count('backend_errors')
+                decision = self.fallback.hit(key, cost, capacity, rate, time.monotonic())
+        else:
+            decision = self.backend.hit(key, cost, capacity, rate, time.monotonic())
+        self._count('allowed' if decision.allowed else 'rejected')
+        return decision
+
+    def charge(self, scope, cost=1):
+        """Charge cost requests by the current user (by IP when anonymous) within scope.
+
+        Raises:
+            RateLimitExceededError: If the user's bucket does not hold cost requests.
+        """
+        if current_user.is_authenticated:
+            tier = 'premium' if current_user.is_premium else 'starter'
+            identity = f'user:{current_user.id}'
+        else:
+            tier, identity = 'starter', f'ip:{request.remote_addr}'
+        decision = self.hit(scope, tier, identity, cost)
+        if decision is None:
+            return
+        g.rate_limit = decision
+        if not decision.allowed:
+            logger.info(f"Rate limited {identity} on {scope} ({tier}) for {cost} request(s)")
+            if decision.retry_after == math.inf:
+                message = f'This request counts as {cost}; your plan allows at most {decision.limit} at once.'
+            else:
+                message = 'Too many requests. Please slow down and try again shortly.'
+            raise RateLimitExceededError(message, decision.retry_after)
+
+    def limit(self, scope):
+        """Limit a view per user (per IP when anonymous) and tier within scope"""
+        def decorator(view):
+            @wraps(view)
+            def limited(*args, **kwargs):
+                self.charge(scope)
+                return view(*args, **kwargs)
+            return limited
+        return decorator
+
+    def _add_headers(self, response):
+        decision = g.get('rate_limit')
+        if decision is not None:
+            response.headers['X-RateLimit-Limit'] = str(decision.limit)
+            response.headers['X-RateLimit-Remaining'] = str(decision.remaining)
+            response.headers['X-RateLimit-Reset'] = str(math.ceil(decision.reset))
+            if not decision.allowed and decision.retry_after != math.inf:
+                response.headers['Retry-After'] = str(max(1, math.ceil(decision.retry_after)))
+        return response
+
+    def stats(self):
+        """Return rate limit counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['backend'] = type(self.backend).__name__ if self.backend else None
+        return stats
+
+tier_limiter = TierRateLimiter()
@@ -0,0 +1,112 @@
+"""
+Read-replica routing for DraftCraft Agent
+
+SQLALCHEMY_REPLICA_URLS lists read-only replicas, each given its own engine
+(kept out of SQLALCHEMY_BINDS so create_all never touches them). Views
+decorated with @read_replica send their plain SELECTs to one replica per
+request. Everything else stays on the primary: other views, flushes, DML,
+SELECT ... FOR UPDATE, and every read made within
+REPLICA_READ_YOUR_WRITES_SECONDS of a request by the same browser session
+that wrote. That window covers replication lag for the user's own changes.
+Without replica URLs the decorator changes nothing.
+"""
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from flask import g, session, current_app, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, create_engine
+
+logger = logging.getLogger(__name__)
+
+WROTE_AT_KEY = '_db_wrote_at'
+
+class ReplicaRouter:
+    """Chooses the engine for reads in replica-routed views"""
+
+    def __init__(self):
+        self.sticky_seconds = 10
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Create an engine per replica URL in the Flask config"""
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        app.extensions['replica_engines'] = {
+            f'replica_{index}': create_engine(url, **options)
+            for index, url in enumerate(app.config['SQLALCHEMY_REPLICA_URLS'])
+        }
+        self.sticky_seconds = app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+        self._reset_stats()
+        app.after_request(self._remember_write)
+        app.extensions['replica_router'] = self
+        if app.extensions['replica_engines']:
+            logger.info(f"Routing read-only views across {len(app.extensions['replica_engines'])} replica(s)")
+
+    def _reset_stats(self):
+        self._stats = {'replica_requests': 0, 'sticky_requests': 0, 'replica_queries': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember_write(self, response):
+        if g.get('db_wrote'):
+            session[WROTE_AT_KEY] = int(time.time())
+        return response
+
+    def start_request(self):
+        """Pick this request's replica, unless it must read its own writes"""
+        keys = list(current_app.extensions['replica_engines'])
+        if not keys:
+            return
+        wrote_at = session.get(WROTE_AT_KEY)
+        if wrote_at is not None and time.time() - wrote_at < self.sticky_seconds:
+            self._count('sticky_requests')
+            return
+        g.db_replica = random.choice(keys)
+        self._count('replica_requests')
+
+    def engine_for(self, session, clause):
+        """Replica engine for a read in a routed request, or None for the primary"""
+        key = g.get('db_replica') if has_request_context() else None
+        if key is None or session._flushing or g.get('db_wrote'):
+            return None
+        if not getattr(clause, 'is_select', False) or getattr(clause, '_for_update_arg', None) is not None:
+            return None
+        self._count('replica_queries')
+        return current_app.extensions['replica_engines'][key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['replicas'] = len(current_app.extensions['replica_engines'])
+        return stats
+
+replica_router = ReplicaRouter()
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that lets replica_router pick the engine for reads"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = replica_router.engine_for(self, clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_request_wrote(session, flush_context):
+    # Later reads in this request, and for a while in this browser session, use the primary
+    if has_request_context():
+        g.db_wrote = True
+
+def read_replica(view):
+    """Serve a view's reads from a replica when one is configured"""
+    @wraps(view)
+    def routed(*args, **kwargs):
+        replica_router.start_request()
+        return view(*args, **kwargs)
+    return routed
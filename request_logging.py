@@ -0,0 +1,201 @@
+"""
+Structured, non-blocking logging for DraftCraft Agent
+
+Every log record, from the app logger and module loggers alike, goes through
+a QueueHandler on the root logger. Request threads only put records on a
+bounded queue. A QueueListener thread formats them as JSON lines and writes
+them to stderr and, if LOG_FILE is set, to a rotating file. When the queue is
+full, records are dropped and counted rather than blocking a request.
+
+Each finished request is logged once, with its request id, user id, status
+and latency. LOG_SAMPLE_RATES keeps only a fraction of successful requests
+for chatty endpoints (each kept record carries its sample_rate, so counts
+can be scaled back up). Responses with a status of 400 or more are always
+logged.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, request, has_request_context
+from flask.logging import default_handler
+from timing import request_stages
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed in `extra`"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class StderrHandler(logging.StreamHandler):
+    """Writes to sys.stderr as it is when each record is written, like logging.lastResort"""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class RequestContextQueueHandler(QueueHandler):
+    """Queue handler that tags records with the current request and never blocks"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Runs on the request thread, the only place g is available
+        if has_request_context():
+            if not hasattr(record, 'request_id'):
+                record.request_id = g.get('request_id')
+            if not hasattr(record, 'user_id'):
+                # Only a user already loaded for this request; never load one to log
+                record.user_id = getattr(g.get('_login_user'), 'id', None)
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class RequestLogger:
+    """Installs queued JSON logging and logs one record per request"""
+
+    def __init__(self):
+        self.sample_rates = {}
+        self.handler = None
+        self.listener = None
+        self.logger = logging.getLogger('draftcraft.requests')
+        self.random = random.random
+        self._lock = threading.Lock()
+        self._reset_stats()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def init_app(self, app):
+        """Route logging through the queue and add the request hooks"""
+        self.sample_rates = app.config['LOG_SAMPLE_RATES']
+        self._install(app.config)
+        app.logger.removeHandler(default_handler)
+        app.logger.setLevel(app.config['LOG_LEVEL'])
+        self._reset_stats()
+        app.before_request(self._start_request)
+        app.after_request(self._log_request)
+        app.extensions['request_logger'] = self
+
+    def _install(self, config):
+        handlers = [StderrHandler()]
+        if config.get('LOG_FILE'):
+            os.makedirs(os.path.dirname(config['LOG_FILE']) or '.', exist_ok=True)
+            handlers.append(RotatingFileHandler(config['LOG_FILE'], maxBytes=config['LOG_FILE_MAX_BYTES'],
+                                                backupCount=config['LOG_FILE_BACKUP_COUNT']))
+        for handler in handlers:
+            handler.setFormatter(JsonFormatter())
+        root = logging.getLogger()
+        with self._lock:
+            # A second app in the same process (tests, CLI) replaces the first's setup
+            self._stop()
+            self.handler = RequestContextQueueHandler(queue.Queue(config['LOG_QUEUE_SIZE']))
+            self.listener = QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+        root.addHandler(self.handler)
+        root.setLevel(config['LOG_LEVEL'])
+
+    def _stop(self):
+        if self.handler is not None:
+            logging.getLogger().removeHandler(self.handler)
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.handler = self.listener = None
+
+    def _after_fork(self):
+        # The listener thread does not survive a fork
+        self._lock = threading.Lock()
+        if self.listener is not None:
+            self.listener._thread = None
+            self.listener.start()
+
+    def _reset_stats(self):
+        self._stats = {'logged': 0, 'sampled_out': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _start_request(self):
+        # Only needs to be unique, not unguessable: skips an os.urandom call per request
+        g.request_id = f'{random.getrandbits(64):016x}'
+        g.request_started = time.perf_counter()
+
+    def _log_request(self, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        rate = self.sample_rates.get(request.endpoint, 1.0)
+        if response.status_code < 400 and rate < 1.0 and self.random() >= rate:
+            self._count('sampled_out')
+            return response
+        self._count('logged')
+        self.logger.info('request', extra={
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'remote_addr': request.remote_addr,
+            'sample_rate': rate,
+            'stages_ms': {name: round(ms, 2) for name, ms in request_stages().items()}
+        })
+        return response
+
+    def flush(self):
+        """Write out every record queued so far"""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener.start()
+
+    def close(self):
+        """Write out queued records and stop the listener thread"""
+        with self._lock:
+            self._stop()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            if self.handler is not None:
+                stats.update(queued=self.handler.queue.qsize(), dropped=self.handler.dropped)
+        return stats
+
+request_logger = RequestLogger()
+atexit.register(request_logger.close)
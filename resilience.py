@@ -0,0 +1,264 @@
+"""
+Retry, backoff and circuit breaking for OpenAI calls in DraftCraft Agent
+
+Retryable failures (429, 408/409, 5xx, timeouts, dropped connections) are
+retried with exponential backoff and full jitter, waiting at least as long as
+the server's Retry-After; a Retry-After longer than the max delay fails the
+call at once rather than parking the worker. A circuit breaker per model fails fast while the
+upstream is unhealthy instead of parking workers on hung sockets.
+"""
+import time
+import random
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import openai
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling OpenAI while a model's circuit is open"""
+
+def retry_after_seconds(error):
+    """Return the delay the server asked for on an OpenAI error, if any"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def is_retryable(error):
+    """Whether an OpenAI error is worth retrying"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by Retry-After and a max delay"""
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based), or None if
+        the server asked for a longer wait than max_delay"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            return max(backoff, retry_after)
+        return backoff
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial call"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: let a single trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about upstream health, keeping the state"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class LatencyWindow:
+    """Rolling window of recent call latencies and outcomes for one model"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def snapshot(self):
+        """Return sample count, error rate and p50/p95 latency of successful calls"""
+        with self._lock:
+            samples = list(self._samples)
+        latencies = sorted(latency for latency, ok in samples if ok)
+        errors = sum(1 for _, ok in samples if not ok)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        return {
+            'samples': len(samples),
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95)
+        }
+
+class OpenAIResilience:
+    """Wraps OpenAI calls with per-model retries and circuit breakers"""
+
+    def __init__(self):
+        self.policy = RetryPolicy()
+        self.failure_threshold = 5
+        self.recovery_timeout = 30.0
+        self.sleep = time.sleep
+        self.window_size = 200
+        self._breakers = {}
+        self._counters = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure retries and breakers from the Flask config"""
+        self.policy = RetryPolicy(
+            max_attempts=app.config['OPENAI_RETRY_MAX_ATTEMPTS'],
+            base_delay=app.config['OPENAI_RETRY_BASE_DELAY'],
+            max_delay=app.config['OPENAI_RETRY_MAX_DELAY']
+        )
+        self.failure_threshold = app.config['OPENAI_BREAKER_FAILURE_THRESHOLD']
+        self.recovery_timeout = app.config['OPENAI_BREAKER_RECOVERY_TIMEOUT']
+        self.window_size = app.config['OPENAI_LATENCY_WINDOW']
+        with self._lock:
+            self._breakers = {}
+            self._counters = {}
+            self._latency = {}
+        app.extensions['openai_resilience'] = self
+
+    def breaker(self, model):
+        """Return the circuit breaker for a model"""
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self._counters[model] = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+                self._latency[model] = LatencyWindow(self.window_size)
+            return self._breakers[model]
+
+    def health(self, model):
+        """Return breaker state and rolling latency/error figures for a model"""
+        breaker = self.breaker(model)
+        return dict(self._latency[model].snapshot(), state=breaker.state)
+
+    def _count(self, model, name):
+        with self._lock:
+            self._counters[model][name] += 1
+
+    def call(self, model, fn, record_latency=True):
+        """Call fn (an OpenAI request for model) with retries and circuit breaking.
+
+        Args:
+            record_latency (bool): Add the call to the model's latency window;
+                off for streams, which return before the output is complete.
+        Raises:
+            CircuitOpenError: If the model's circuit is open.
+            openai.OpenAIError: The last error once retries are exhausted or
+                the server asks for a longer wait than the max delay, or any
+                non-retryable error straight away.
+        """
+        breaker = self.breaker(model)
+        self._count(model, 'calls')
+        if not breaker.allow_request():
+            self._count(model, 'rejected')
+            raise CircuitOpenError(f"OpenAI circuit for {model} is open; failing fast")
+
+        attempt = 1
+        started = time.monotonic()
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    # Client errors (and bugs in fn) say nothing about upstream health
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                delay = self.policy.delay(attempt, retry_after_seconds(e))
+                if attempt >= self.policy.max_attempts or delay is None or not breaker.allow_request():
+                    self._count(model, 'failures')
+                    if record_latency:
+                        self._latency[model].record(time.monotonic() - started, False)
+                    raise
+                logger.warning(f"OpenAI {model} attempt {attempt} failed ({e}); retrying in {delay:.2f}s")
+                self._count(model, 'retries')
+                self.sleep(delay)
+                attempt += 1
+            else:
+                breaker.record_success()
+                if record_latency:
+                    self._latency[model].record(time.monotonic() - started, True)
+                return result
+
+    def stats(self):
+        """Return breaker state, retry counters and latency figures per model"""
+        with self._lock:
+            return {
+                model: dict(self._counters[model], state=breaker.state,
+                            consecutive_failures=breaker.consecutive_failures,
+                            times_opened=breaker.times_opened,
+                            **self._latency[model].snapshot())
+                for model, breaker in self._breakers.items()
+            }
+
+openai_resilience = OpenAIResilience()
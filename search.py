@@ -0,0 +1,164 @@
+"""
+Full-text search over proposal history for DraftCraft Agent
+
+SQLite (development) keeps an FTS5 table, proposal_fts, keyed by proposal
+id. Postgres (production) keeps proposal_search, a weighted tsvector per
+proposal with a GIN index. Both are filled from Python values, since
+content may be stored compressed, and are maintained by mapper events in
+the same transaction as the proposal insert, update or delete. Matches are
+ranked with bm25 / ts_rank_cd, with client name weighted above skills, the
+job description and the proposal body.
+"""
+import re
+import logging
+from sqlalchemy import event, text, column, Integer, DDL
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS proposal_fts USING fts5("
+    "client_name, skills, job_description, content, user_id UNINDEXED, tokenize='porter unicode61')"
+]
+SQLITE_DROP = ["DROP TABLE IF EXISTS proposal_fts"]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS proposal_search ("
+    "proposal_id INTEGER PRIMARY KEY REFERENCES proposal (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL, "
+    "document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_proposal_search_document ON proposal_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_proposal_search_user ON proposal_search (user_id)"
+]
+POSTGRES_DROP = ["DROP TABLE IF EXISTS proposal_search"]
+
+SQLITE_INSERT = text(
+    "INSERT INTO proposal_fts (rowid, client_name, skills, job_description, content, user_id) "
+    "VALUES (:id, :client_name, :skills, :job_description, :content, :user_id)"
+)
+SQLITE_DELETE = text("DELETE FROM proposal_fts WHERE rowid = :id")
+SQLITE_SEARCH = text(
+    "SELECT rowid FROM proposal_fts WHERE proposal_fts MATCH :query AND user_id = :user_id "
+    "ORDER BY bm25(proposal_fts, 4.0, 2.0, 1.0, 1.0), rowid DESC LIMIT :limit OFFSET :offset"
+).columns(column('rowid', Integer))
+
+POSTGRES_INSERT = text(
+    "INSERT INTO proposal_search (proposal_id, user_id, document) VALUES (:id, :user_id, "
+    "setweight(to_tsvector('english', :client_name), 'A') || "
+    "setweight(to_tsvector('english', :skills), 'B') || "
+    "setweight(to_tsvector('english', :job_description), 'C') || "
+    "setweight(to_tsvector('english', :content), 'D')) "
+    "ON CONFLICT (proposal_id) DO UPDATE SET document = EXCLUDED.document"
+)
+POSTGRES_DELETE = text("DELETE FROM proposal_search WHERE proposal_id = :id")
+POSTGRES_SEARCH = text(
+    "SELECT proposal_id FROM proposal_search, websearch_to_tsquery('english', :query) AS query "
+    "WHERE user_id = :user_id AND document @@ query "
+    "ORDER BY ts_rank_cd(document, query) DESC, proposal_id DESC LIMIT :limit OFFSET :offset"
+).columns(column('proposal_id', Integer))
+
+INDEXED_FIELDS = ('client_name', 'skills', 'job_description', 'content')
+
+def fts5_query(query):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix"""
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def _row(proposal):
+    values = {field: getattr(proposal, field) or '' for field in INDEXED_FIELDS}
+    return dict(values, id=proposal.id, user_id=proposal.user_id)
+
+def index_proposal(connection, proposal):
+    """Add or replace one proposal in the search index"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.execute(SQLITE_DELETE, {'id': proposal.id})
+        connection.execute(SQLITE_INSERT, _row(proposal))
+    elif dialect == 'postgresql':
+        connection.execute(POSTGRES_INSERT, _row(proposal))
+
+def unindex_proposal(connection, proposal_id):
+    """Remove one proposal from the search index"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.execute(SQLITE_DELETE, {'id': proposal_id})
+    elif dialect == 'postgresql':
+        connection.execute(POSTGRES_DELETE, {'id': proposal_id})
+
+def search_proposal_ids(session, user_id, query, limit=10, offset=0):
+    """Return ids of the user's proposals matching query, best match first.
+
+    Raises:
+        NotImplementedError: On databases without a supported full-text index.
+    """
+    dialect = session.get_bind().dialect.name
+    params = {'user_id': user_id, 'limit': limit, 'offset': offset}
+    if dialect == 'sqlite':
+        match = fts5_query(query)
+        if match is None:
+            return []
+        return list(session.execute(SQLITE_SEARCH, dict(params, query=match)).scalars())
+    if dialect == 'postgresql':
+        return list(session.execute(POSTGRES_SEARCH, dict(params, query=query)).scalars())
+    raise NotImplementedError(f"Full-text search is not available on {dialect}")
+
+def create_search_index(connection):
+    """Create the dialect's search structures if they do not exist"""
+    dialect = connection.dialect.name
+    for statement in {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(dialect, []):
+        connection.execute(text(statement))
+
+def drop_search_index(connection):
+    dialect = connection.dialect.name
+    for statement in {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(dialect, []):
+        connection.execute(text(statement))
+
+def rebuild_search_index(connection, proposal_table, batch_size=500):
+    """Index every existing proposal in id order, batch_size rows at a time.
+
+    Returns:
+        int: Number of proposals indexed.
+    """
+    from sqlalchemy import select
+    columns = [proposal_table.c.id, proposal_table.c.user_id] + [proposal_table.c[field] for field in INDEXED_FIELDS]
+    last_id = 0
+    indexed = 0
+    while True:
+        rows = connection.execute(
+            select(*columns).where(proposal_table.c.id > last_id).order_by(proposal_table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return indexed
+        for row in rows:
+            index_proposal(connection, row)
+        indexed += len(rows)
+        last_id = rows[-1].id
+
+def register(db, proposal_model):
+    """Create the index alongside db.create_all() and keep it in step with proposal_model"""
+    for statement in SQLITE_DDL:
+        event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    for statement in SQLITE_DROP:
+        event.listen(db.metadata, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+    for statement in POSTGRES_DDL:
+        event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+    for statement in POSTGRES_DROP:
+        event.listen(db.metadata, 'before_drop', DDL(statement).execute_if(dialect='postgresql'))
+
+    @event.listens_for(proposal_model, 'after_insert')
+    def index_new_proposal(mapper, connection, target):
+        index_proposal(connection, target)
+
+    @event.listens_for(proposal_model, 'after_update')
+    def reindex_proposal(mapper, connection, target):
+        from sqlalchemy import inspect
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+            index_proposal(connection, target)
+
+    @event.listens_for(proposal_model, 'after_delete')
+    def unindex_deleted_proposal(mapper, connection, target):
+        unindex_proposal(connection, target.id)
@@ -0,0 +1,227 @@
+"""
+Similar past proposal lookup for DraftCraft Agent
+
+Each proposal stores a compact float32 vector of its job description and
+skills, built locally by feature hashing (no embedding API, no vocabulary
+to keep in sync between processes). Lookups compare a new job against the
+user's proposals with one matrix-vector product and an argpartition top-k.
+The user's matrix is cached per process and brought up to date on every
+lookup by reading only rows created since it was loaded (with a few minutes
+of overlap for late commits), so proposals saved by other workers appear
+without invalidation. Vectors of rows edited after loading are picked up
+when the user next drops out of the cache.
+"""
+import re
+import math
+import zlib
+import logging
+import threading
+from datetime import timedelta
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Changing the width makes stored vectors unreadable; rebuild with the migration helper
+DIMENSIONS = 256
+DTYPE = np.dtype('<f4')
+
+# Rows committed late (long transactions, clock skew between workers) still
+# land inside this window when a matrix is refreshed
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it its of on or our so that the their '
+    'this to was we will with you your'.split()
+)
+
+def features(text):
+    """Words and adjacent word pairs of text, lowercased, without stop words"""
+    words = [word for word in re.findall(r'\w+', text.lower()) if word not in STOP_WORDS]
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+def vectorize(text):
+    """Hash text into a unit-length float32 vector of DIMENSIONS"""
+    counts = {}
+    for feature in features(text):
+        # crc32 is stable across processes, unlike hash()
+        h = zlib.crc32(feature.encode('utf-8'))
+        slot = (h & (DIMENSIONS - 1), 1.0 if h & 0x80000000 else -1.0)
+        counts[slot] = counts.get(slot, 0) + 1
+    vector = np.zeros(DIMENSIONS, dtype=DTYPE)
+    for (index, sign), count in counts.items():
+        # Sublinear term frequency so repeated boilerplate does not dominate
+        vector[index] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def proposal_text(job_description, skills):
+    return f'{job_description or ""}\n{skills or ""}'
+
+def encode_vector(vector):
+    return np.asarray(vector, dtype=DTYPE).tobytes()
+
+class UserMatrix:
+    """One user's proposal ids and vectors, grown in place as rows arrive"""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, DIMENSIONS), dtype=DTYPE)
+        self.size = 0
+        self.known = set()
+        self.loaded_until = None
+
+    def append(self, ids, blobs):
+        """Add rows not already held, skipping vectors of another width"""
+        width = DIMENSIONS * DTYPE.itemsize
+        rows = [(row_id, blob) for row_id, blob in zip(ids, blobs)
+                if row_id not in self.known and len(blob) == width]
+        self.known.update(ids)
+        if not rows:
+            return
+        needed = self.size + len(rows)
+        if needed > len(self.ids):
+            # Headroom keeps single appends in place; growing by a quarter rather than
+            # doubling bounds the spare memory held for users with long histories
+            capacity = max(needed + needed // 4, 16)
+            ids_buffer = np.empty(capacity, dtype=np.int64)
+            vectors_buffer = np.empty((capacity, DIMENSIONS), dtype=DTYPE)
+            ids_buffer[:self.size] = self.ids[:self.size]
+            vectors_buffer[:self.size] = self.vectors[:self.size]
+            self.ids, self.vectors = ids_buffer, vectors_buffer
+        self.ids[self.size:needed] = [row_id for row_id, _ in rows]
+        self.vectors[self.size:needed] = np.frombuffer(b''.join(blob for _, blob in rows),
+                                                       dtype=DTYPE).reshape(-1, DIMENSIONS)
+        self.size = needed
+
+    def top_k(self, vector, k, min_score=0.0):
+        """Return [(id, score)] of the k rows most similar to vector, best first"""
+        ids, vectors = self.ids[:self.size], self.vectors[:self.size]
+        if not len(ids) or k <= 0:
+            return []
+        # Rows and the query are unit length, so the dot product is the cosine
+        scores = vectors @ vector
+        if len(scores) > k:
+            best = np.argpartition(scores, -k)[-k:]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in best if scores[i] >= min_score]
+
+class SimilarProposals:
+    """Per-process cache of users' proposal matrices"""
+
+    def __init__(self):
+        self.max_users = 256
+        self.min_score = 0.2
+        self._matrices = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'rows_loaded': 0}
+
+    def init_app(self, app):
+        """Configure the cache from the Flask config"""
+        self.max_users = app.config['SIMILAR_CACHE_MAX_USERS']
+        self.min_score = app.config['SIMILAR_MIN_SCORE']
+        self.clear()
+        app.extensions['similar_proposals'] = self
+
+    def clear(self):
+        with self._lock:
+            self._matrices.clear()
+
+    def _matrix(self, user_id):
+        with self._lock:
+            matrix = self._matrices.get(user_id)
+            if matrix is None:
+                matrix = self._matrices[user_id] = UserMatrix()
+                self._stats['misses'] += 1
+            else:
+                self._stats['hits'] += 1
+            self._matrices.move_to_end(user_id)
+            while len(self._matrices) > self.max_users:
+                self._matrices.popitem(last=False)
+            return matrix
+
+    def _refresh(self, matrix, user_id):
+        """Load the user's rows created since the matrix was last brought up to date"""
+        from models import db, Proposal
+        query = db.session.query(Proposal.id, Proposal.created_at, Proposal.embedding).filter(
+            Proposal.user_id == user_id, Proposal.embedding.isnot(None))
+        if matrix.loaded_until is not None:
+            # Seeks through the (user_id, created_at, id) index instead of reading the whole history
+            query = query.filter(Proposal.created_at >= matrix.loaded_until - REFRESH_OVERLAP)
+        rows = query.all()
+        if rows:
+            with self._lock:
+                # Rows in the overlap, or loaded by another request meanwhile, are skipped
+                before = matrix.size
+                matrix.append([row.id for row in rows], [row.embedding for row in rows])
+                latest = max(row.created_at for row in rows)
+                if matrix.loaded_until is None or latest > matrix.loaded_until:
+                    matrix.loaded_until = latest
+                self._stats['rows_loaded'] += matrix.size - before
+
+    def search(self, user_id, job_description, skills='', k=5):
+        """Return [(proposal_id, score)] of the user's proposals most like a job, best first"""
+        vector = vectorize(proposal_text(job_description, skills))
+        if not vector.any():
+            return []
+        matrix = self._matrix(user_id)
+        self._refresh(matrix, user_id)
+        return matrix.top_k(vector, k, self.min_score)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['users'] = len(self._matrices)
+            stats['rows'] = sum(matrix.size for matrix in self._matrices.values())
+        return stats
+
+similar_proposals = SimilarProposals()
+
+def backfill_vectors(connection, proposal_table, batch_size=500):
+    """Store vectors for proposals that have none, in id order, batch_size rows at a time.
+
+    Returns:
+        int: Number of proposals updated.
+    """
+    from sqlalchemy import select, bindparam
+    table = proposal_table
+    last_id = 0
+    updated = 0
+    while True:
+        rows = connection.execute(
+            select(table.c.id, table.c.job_description, table.c.skills)
+            .where(table.c.id > last_id, table.c.embedding.is_(None), _first_draft(table.c.variant_index))
+            .order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        connection.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(embedding=bindparam('vector')),
+            [{'row_id': row.id, 'vector': encode_vector(vectorize(proposal_text(row.job_description, row.skills)))}
+             for row in rows]
+        )
+        updated += len(rows)
+        last_id = rows[-1].id
+
+def _first_draft(variant_index):
+    # Alternative drafts share their job with the first draft; one vector per job is enough
+    return variant_index.is_(None) | (variant_index == 0)
+
+def register(proposal_model):
+    """Keep proposal_model's embedding column in step with its inputs"""
+
+    @event.listens_for(proposal_model, 'before_insert')
+    def embed_new_proposal(mapper, connection, target):
+        if target.embedding is None and target.variant_index in (None, 0):
+            target.embedding = encode_vector(vectorize(proposal_text(target.job_description, target.skills)))
+
+    @event.listens_for(proposal_model, 'before_update')
+    def reembed_proposal(mapper, connection, target):
+        from sqlalchemy import inspect
+        state = inspect(target)
+        if target.variant_index in (None, 0) and any(
+                state.attrs[field].history.has_changes() for field in ('job_description', 'skills')):
+            target.embedding = encode_vector(vectorize(proposal_text(target.job_description, target.skills)))
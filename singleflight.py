@@ -0,0 +1,155 @@
+"""
+Single-flight coalescing of duplicate work for DraftCraft Agent
+
+When several callers ask for the same key at once, only the first (the
+leader) runs the work; the others wait and receive the leader's result.
+Callers in the same process wait on a threading.Event. With a Redis backend,
+leaders also take a Redis lock so callers in other gunicorn workers wait for
+the result the leader publishes.
+"""
+import json
+import time
+import uuid
+import logging
+import threading
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if this leader still owns it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run a function once per key among concurrent callers"""
+
+    def __init__(self):
+        self.redis = None
+        self.lock_ttl = 120
+        self.poll_interval = 0.05
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced_local': 0, 'coalesced_remote': 0}
+
+    def init_app(self, app):
+        """Configure the cross-worker backend from the Flask config"""
+        if app.config['SINGLEFLIGHT_BACKEND'] == 'redis':
+            self.redis = redis.Redis.from_url(app.config['REDIS_URL'], socket_timeout=1, socket_connect_timeout=1)
+        else:
+            self.redis = None
+        self.lock_ttl = app.config['SINGLEFLIGHT_LOCK_TTL']
+        app.extensions['singleflight'] = self
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key, fn):
+        """Run fn for key unless an identical call is already in flight.
+
+        Args:
+            key (str): Identifies duplicate work.
+            fn (callable): Produces the result; it must be JSON serializable
+                when a Redis backend is configured.
+        Returns:
+            tuple: (result, shared) where shared is True if the result came
+            from another caller's run.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            self._count('coalesced_local')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._run_across_workers(key, fn)
+            return call.result, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_across_workers(self, key, fn):
+        if self.redis is None:
+            self._count('leaders')
+            return fn(), False
+
+        lock_key = f'draftcraft:singleflight:lock:{key}'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                if self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                    break
+                # Another worker is the leader: wait for the result it publishes
+                leader_token = self.redis.get(lock_key)
+                if leader_token is None:
+                    continue
+                result_key = f'draftcraft:singleflight:result:{leader_token.decode()}'
+                while time.monotonic() < deadline:
+                    # Read the lock before the result: the leader publishes
+                    # its result before releasing the lock.
+                    released = self.redis.get(lock_key) != leader_token
+                    value = self.redis.get(result_key)
+                    if value is not None:
+                        self._count('coalesced_remote')
+                        return json.loads(value), True
+                    if released:
+                        # Released without a result (the leader failed); try to lead
+                        break
+                    time.sleep(self.poll_interval)
+            else:
+                logger.warning(f"Timed out waiting for single-flight leader of {key}")
+                self._count('leaders')
+                return fn(), False
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight lock unavailable, running without it: {e}")
+            self._count('leaders')
+            return fn(), False
+
+        self._count('leaders')
+        try:
+            result = fn()
+            try:
+                self.redis.set(f'draftcraft:singleflight:result:{token}', json.dumps(result),
+                               ex=max(int(self.lock_ttl), 1))
+            except redis.RedisError as e:
+                # Waiters in other workers see the lock released and run it themselves
+                logger.warning(f"Failed to publish single-flight result for {key}: {e}")
+            return result, False
+        finally:
+            try:
+                self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to release single-flight lock {key}: {e}")
+
+    def stats(self):
+        """Return coalescing counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+generation_flights = SingleFlight()
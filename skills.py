@@ -0,0 +1,133 @@
+"""
+Normalized skill tags for DraftCraft Agent
+
+Proposal.skills stays the free text the user typed. At write time it is
+also parsed into tags (split on commas and the like, case-folded, synonyms
+mapped to one name) stored in proposal_skill, one row per proposal and tag.
+Its (user_id, skill, proposal_id) index is the inverted index behind skill
+filters and facet counts, so neither scans or string-matches skills.
+Changing SYNONYMS only affects new writes until `flask skills reindex`.
+"""
+import re
+import logging
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+
+logger = logging.getLogger(__name__)
+
+MAX_SKILL_LENGTH = 64
+MAX_SKILLS = 20
+
+# Spelling variants mapped to the name they are stored under
+SYNONYMS = {
+    'js': 'javascript', 'es6': 'javascript', 'vanilla js': 'javascript',
+    'ts': 'typescript',
+    'py': 'python', 'python3': 'python', 'python 3': 'python',
+    'golang': 'go',
+    'reactjs': 'react', 'react.js': 'react', 'react js': 'react',
+    'vuejs': 'vue', 'vue.js': 'vue',
+    'angularjs': 'angular',
+    'node': 'node.js', 'nodejs': 'node.js', 'node js': 'node.js',
+    'nextjs': 'next.js', 'next': 'next.js',
+    'postgres': 'postgresql', 'psql': 'postgresql', 'postgre': 'postgresql',
+    'mongo': 'mongodb',
+    'k8s': 'kubernetes',
+    'amazon web services': 'aws', 'google cloud': 'gcp', 'google cloud platform': 'gcp',
+    'ml': 'machine learning', 'ai': 'artificial intelligence',
+    'rest': 'rest api', 'restful api': 'rest api', 'rest apis': 'rest api', 'restful apis': 'rest api',
+    'api integration': 'api integrations',
+    'wp': 'wordpress',
+    'ui/ux': 'ui/ux design', 'ux/ui': 'ui/ux design', 'ui ux': 'ui/ux design',
+    'seo optimization': 'seo',
+    'c sharp': 'c#', 'csharp': 'c#',
+    'cpp': 'c++',
+    'dotnet': '.net', 'asp.net core': 'asp.net',
+}
+
+# Commas, semicolons, pipes, bullets, line breaks and a spelled-out "and"/"&"
+SEPARATORS = re.compile(r'[,;|\n•]+|\s+(?:and|&)\s+', re.IGNORECASE)
+# Keep the symbols that are part of names like c++, c#, .net and node.js
+EDGE_PUNCTUATION = '\'"()[]{}<>:!?*-_ \t'
+
+def normalize_skill(skill):
+    """Canonical form of one skill, or None if nothing usable remains"""
+    # A leading dot belongs to names like .net; a trailing one ends a sentence
+    skill = ' '.join(skill.casefold().split()).rstrip('.').strip(EDGE_PUNCTUATION)
+    skill = SYNONYMS.get(skill, skill)
+    if not skill or len(skill) > MAX_SKILL_LENGTH:
+        return None
+    return skill
+
+def parse_skills(text):
+    """Split free-text skills into unique normalized tags, in the order given"""
+    tags = []
+    for part in SEPARATORS.split(text or ''):
+        skill = normalize_skill(part)
+        if skill and skill not in tags:
+            tags.append(skill)
+    return tags[:MAX_SKILLS]
+
+def _tag_rows(proposal_id, user_id, skills):
+    return [{'proposal_id': proposal_id, 'user_id': user_id, 'skill': skill} for skill in parse_skills(skills)]
+
+def tag_proposal(connection, tag_table, proposal):
+    """Replace a proposal's tags with those parsed from its skills"""
+    connection.execute(tag_table.delete().where(tag_table.c.proposal_id == proposal.id))
+    rows = _tag_rows(proposal.id, proposal.user_id, proposal.skills)
+    if rows:
+        connection.execute(tag_table.insert(), rows)
+
+def backfill_tags(connection, proposal_table, tag_table, batch_size=500):
+    """Re-tag every proposal in id order, batch_size rows per round trip.
+
+    Returns:
+        int: Number of proposals tagged.
+    """
+    last_id = 0
+    tagged = 0
+    while True:
+        rows = connection.execute(
+            select(proposal_table.c.id, proposal_table.c.user_id, proposal_table.c.skills)
+            .where(proposal_table.c.id > last_id).order_by(proposal_table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return tagged
+        ids = [row.id for row in rows]
+        connection.execute(tag_table.delete().where(tag_table.c.proposal_id.in_(ids)))
+        tags = [tag for row in rows for tag in _tag_rows(row.id, row.user_id, row.skills)]
+        if tags:
+            connection.execute(tag_table.insert(), tags)
+        tagged += len(rows)
+        last_id = ids[-1]
+
+def register(proposal_model, tag_model):
+    """Keep tag_model's rows in step with proposal_model's skills"""
+    tag_table = tag_model.__table__
+
+    @event.listens_for(proposal_model, 'after_insert')
+    def tag_new_proposal(mapper, connection, target):
+        rows = _tag_rows(target.id, target.user_id, target.skills)
+        if rows:
+            connection.execute(tag_table.insert(), rows)
+
+    @event.listens_for(proposal_model, 'after_update')
+    def retag_proposal(mapper, connection, target):
+        from sqlalchemy import inspect
+        if inspect(target).attrs.skills.history.has_changes():
+            tag_proposal(connection, tag_table, target)
+
+    @event.listens_for(proposal_model, 'after_delete')
+    def untag_deleted_proposal(mapper, connection, target):
+        connection.execute(tag_table.delete().where(tag_table.c.proposal_id == target.id))
+
+skills_cli = AppGroup('skills', help='Manage normalized proposal skill tags.')
+
+@skills_cli.command('reindex')
+@click.option('--batch-size', default=500)
+def reindex_command(batch_size):
+    """Re-tag every proposal from its skills text (run after changing SYNONYMS)"""
+    from models import db, Proposal, ProposalSkill
+    with db.engine.begin() as connection:
+        tagged = backfill_tags(connection, Proposal.__table__, ProposalSkill.__table__, batch_size)
+    click.echo(f'Re-tagged {tagged} proposals')
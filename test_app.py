@@ -4,8 +4,10 @@ from importlib import reload
 import app as app_module
 reload(app_module)
 from app import create_app
-from models import db, User, Proposal
+from models import db, User, Proposal, GenerationJob
 from config import TestingConfig
+from proposal_cache import cache_key
+from gpt_utils import GenerationResult
 from unittest.mock import patch, MagicMock
 from flask_login import login_user
 from datetime import datetime
@@ -29,6 +31,9 @@ def register_and_login(client, email='test@example.com', password='Password123!'
         sess['_user_id'] = str(user.id)
     return user
 
+def generation(text, model='gpt-3.5-turbo', prompt_tokens=0, completion_tokens=0):
+    return GenerationResult(text, model, prompt_tokens, completion_tokens, latency_ms=5)
+
 def test_form_page_loads(client):
     response = client.get('/')
     assert response.status_code == 200
@@ -48,8 +53,8 @@ def test_form_validation(client):
 
 def test_generate_proposal_success(client):
     user = register_and_login(client)
-    with patch('app.generate_proposal') as mock_generate:
-        mock_generate.return_value = 'Test Proposal'
+    with patch('jobs.generate_proposal') as mock_generate:
+        mock_generate.return_value = generation('Test Proposal')
         response = client.post('/generate', data={
             'client_name': 'Test Client',
             'job_description': 'Test Job',
@@ -58,6 +63,358 @@ def test_generate_proposal_success(client):
         })
         assert b'Test Proposal' in response.data
 
+def test_generate_stream_sends_tokens_and_saves_proposal(client):
+    user = register_and_login(client)
+    stream = iter(['Dear Client, ', 'hire me.', generation('Dear Client, hire me.', prompt_tokens=60, completion_tokens=6)])
+    with patch('app.stream_proposal', return_value=stream):
+        response = client.post('/generate/stream', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter'
+        })
+        body = response.get_data(as_text=True)
+    assert response.mimetype == 'text/event-stream'
+    assert body.startswith('event: start')
+    assert '"delta": "Dear Client, "' in body
+    assert 'event: done' in body
+    proposal = Proposal.query.filter_by(user_id=user.id).one()
+    assert proposal.content == 'Dear Client, hire me.'
+    assert proposal.tokens_used == 66
+    assert db.session.get(User, user.id).proposals_this_month == 1
+
+def test_generate_stream_rejects_invalid_form(client):
+    user = register_and_login(client)
+    response = client.post('/generate/stream', data={
+        'client_name': '',
+        'job_description': '',
+        'skills': '',
+        'tier': 'starter'
+    })
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'All fields are required.'
+
+def test_generate_queues_job_and_reports_status(client):
+    user = register_and_login(client)
+    with patch('jobs.generate_proposal', return_value=generation('Queued Proposal', prompt_tokens=120, completion_tokens=380)):
+        response = client.post('/generate', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter'
+        }, headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    
+    status = client.get(response.get_json()['status_url']).get_json()
+    assert status['id'] == job_id
+    assert status['status'] == 'succeeded'
+    assert status['content'] == 'Queued Proposal'
+    proposal = Proposal.query.filter_by(user_id=user.id).one()
+    assert (proposal.prompt_tokens, proposal.completion_tokens, proposal.tokens_used) == (120, 380, 500)
+    assert float(proposal.cost) == pytest.approx(0.00063)
+    assert proposal.latency_ms == 5
+    assert db.session.get(User, user.id).proposals_this_month == 1
+    
+    usage = client.get('/api/usage').get_json()['usage']
+    assert len(usage) == 1
+    assert usage[0]['model'] == 'gpt-3.5-turbo'
+    assert (usage[0]['proposals'], usage[0]['prompt_tokens'], usage[0]['completion_tokens']) == (1, 120, 380)
+    assert usage[0]['cost'] == pytest.approx(0.00063)
+
+def test_failed_generation_job_does_not_use_quota(client):
+    user = register_and_login(client)
+    with patch('jobs.generate_proposal', side_effect=RuntimeError('OpenAI API error: boom')):
+        response = client.post('/generate', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter'
+        }, headers={'Accept': 'application/json'})
+    status = client.get(response.get_json()['status_url']).get_json()
+    assert status['status'] == 'failed'
+    assert 'boom' not in status['error']
+    assert Proposal.query.filter_by(user_id=user.id).count() == 0
+    assert db.session.get(User, user.id).proposals_this_month == 0
+
+def test_job_that_cannot_be_queued_fails_and_refunds_quota(client):
+    user = register_and_login(client)
+    with patch('jobs.run_generation_job.apply_async', side_effect=ConnectionError('broker down')):
+        response = client.post('/generate', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter'
+        }, headers={'Accept': 'application/json'})
+    assert response.get_json()['status'] == 'failed'
+    assert db.session.get(User, user.id).proposals_this_month == 0
+
+def test_quota_reservation_is_atomic_and_refundable(client):
+    from quota import usage_quota, QuotaExceededError
+    user = register_and_login(client)
+    # Last month's usage does not count against this month
+    user.proposals_this_month = 5
+    user.last_reset = datetime(2000, 1, 15)
+    db.session.commit()
+    
+    reservations = [usage_quota.reserve(user.id, 'starter') for _ in range(5)]
+    with pytest.raises(QuotaExceededError):
+        usage_quota.reserve(user.id, 'starter')
+    db.session.refresh(user)
+    assert user.proposals_this_month == 5
+    assert user.last_reset.year > 2000
+    
+    usage_quota.refund(reservations[0])
+    db.session.refresh(user)
+    assert user.proposals_this_month == 4
+    assert usage_quota.reserve(user.id, 'premium').count == 0
+
+def test_stream_failure_refunds_quota(client):
+    user = register_and_login(client)
+    with patch('app.stream_proposal', side_effect=RuntimeError('OpenAI API error')):
+        body = client.post('/generate/stream', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter'
+        }).get_data(as_text=True)
+    assert 'event: error' in body
+    assert db.session.get(User, user.id).proposals_this_month == 0
+
+def test_resubmitted_form_is_served_from_cache(client):
+    user = register_and_login(client)
+    form = {
+        'client_name': 'Test Client',
+        'job_description': 'Test Job',
+        'skills': 'Python',
+        'tier': 'starter'
+    }
+    with patch('jobs.generate_proposal', return_value=generation('Cached Proposal')) as mock_generate:
+        client.post('/generate', data=form)
+        response = client.post('/generate', data=form)
+        assert b'Cached Proposal' in response.data
+        assert mock_generate.call_count == 1
+        
+        client.post('/generate', data=dict(form, bypass_cache='1'))
+        assert mock_generate.call_count == 2
+
+def test_duplicate_submission_joins_in_flight_job(client):
+    user = register_and_login(client)
+    in_flight = GenerationJob(id='b' * 32, user_id=user.id, client_name='Test Client',
+                              job_description='Test Job', skills='Python', model_used='gpt-3.5-turbo',
+                              tier='starter', status='running',
+                              fingerprint=cache_key('Test Client', 'Test Job', 'Python', 'gpt-3.5-turbo'))
+    db.session.add(in_flight)
+    db.session.commit()
+    with patch('jobs.generate_proposal') as mock_generate:
+        response = client.post('/generate', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test  Job',
+            'skills': 'python',
+            'tier': 'starter'
+        }, headers={'Accept': 'application/json'})
+    assert response.get_json()['id'] == in_flight.id
+    assert mock_generate.call_count == 0
+    assert GenerationJob.query.count() == 1
+
+def test_redelivered_running_job_is_run_again(client):
+    from jobs import run_generation_job
+    user = register_and_login(client)
+    # Left running by a worker that died before acking the task
+    job = GenerationJob(id='c' * 32, user_id=user.id, client_name='Test Client', job_description='Test Job',
+                        skills='Python', model_used='gpt-3.5-turbo', tier='starter', status='running')
+    db.session.add(job)
+    db.session.commit()
+    with patch('jobs.generate_proposal', return_value=generation('Recovered Proposal')):
+        run_generation_job.apply(args=[job.id])
+    db.session.refresh(job)
+    assert job.status == 'succeeded' and job.proposal.content == 'Recovered Proposal'
+
+    with patch('jobs.generate_proposal') as mock_generate:
+        run_generation_job.apply(args=[job.id])
+    assert mock_generate.call_count == 0
+
+def test_variants_are_generated_in_one_call_and_selectable(client):
+    user = register_and_login(client)
+    with patch('jobs.generate_proposal_variants', return_value=[generation('Draft A'), generation('Draft B'), generation('Draft C')]) as mock_variants:
+        response = client.post('/generate', data={
+            'client_name': 'Test Client',
+            'job_description': 'Test Job',
+            'skills': 'Python',
+            'tier': 'starter',
+            'variants': '3'
+        }, follow_redirects=True)
+    assert mock_variants.call_count == 1
+    assert mock_variants.call_args.kwargs['n'] == 3
+    assert b'Draft A' in response.data and b'Draft C' in response.data
+    assert db.session.get(User, user.id).proposals_this_month == 1
+    
+    drafts = Proposal.query.order_by(Proposal.variant_index).all()
+    assert [draft.parent_id for draft in drafts] == [None, drafts[0].id, drafts[0].id]
+    client.post(f'/proposals/{drafts[2].id}/select')
+    drafts = Proposal.query.order_by(Proposal.variant_index).all()
+    assert [draft.parent_id for draft in drafts] == [drafts[2].id, drafts[2].id, None]
+    
+    listed = client.get('/api/proposals').get_json()['proposals']
+    assert [proposal['preview'] for proposal in listed] == ['Draft C']
+
+def test_api_proposals_pages_by_cursor(client):
+    user = register_and_login(client)
+    created = datetime(2024, 1, 1)
+    # Pairs of proposals share a timestamp; the id breaks the tie
+    db.session.add_all([Proposal(user_id=user.id, content=f'Proposal {i}', client_name='Client',
+                                 job_description='Job', skills='Python', model_used='gpt-3.5-turbo',
+                                 tier='starter', created_at=created.replace(minute=i // 2))
+                        for i in range(25)])
+    db.session.commit()
+    
+    seen = []
+    url = '/api/proposals?limit=10&include_total=1'
+    while url:
+        page = client.get(url).get_json()
+        assert page['total'] == 25
+        seen.extend(proposal['preview'] for proposal in page['proposals'])
+        url = f"/api/proposals?limit=10&include_total=1&cursor={page['next_cursor']}" if page['has_more'] else None
+    assert seen == [f'Proposal {i}' for i in reversed(range(25))]
+    
+    assert client.get('/api/proposals?cursor=not-a-cursor').status_code == 400
+    # The first page needs no cursor, and the total is opt-in
+    default = client.get('/api/proposals').get_json()
+    assert 'total' not in default and default['has_more']
+    assert default['proposals'][0]['preview'] == 'Proposal 24'
+    # Deprecated OFFSET paging keeps its envelope but lists summaries too
+    response = client.get('/api/proposals?page=3&per_page=10')
+    legacy = response.get_json()
+    assert response.headers['Deprecation'] == 'true'
+    assert (legacy['total'], legacy['pages'], legacy['current_page'], len(legacy['proposals'])) == (25, 3, 3, 5)
+    assert legacy['proposals'][0]['preview'] == 'Proposal 4' and 'content' not in legacy['proposals'][0]
+
+def test_listings_load_summaries_and_detail_loads_full_text(client):
+    from sqlalchemy import inspect
+    user = register_and_login(client)
+    body = 'Dear Acme, ' + 'I build reliable Flask APIs. ' * 40
+    proposal = Proposal(user_id=user.id, content=body, client_name='Acme', job_description='Job',
+                        skills='Python', model_used='gpt-3.5-turbo', tier='starter')
+    db.session.add(proposal)
+    db.session.commit()
+    assert len(proposal.preview) <= 281 and proposal.preview.endswith('…')
+    preview = proposal.preview
+    
+    db.session.expunge(proposal)
+    summary = Proposal.summaries().filter_by(user_id=user.id).one()
+    assert {'content', 'job_description', 'skills'} <= inspect(summary).unloaded
+    
+    listed = client.get('/api/proposals').get_json()['proposals'][0]
+    assert 'content' not in listed
+    assert listed['preview'] == preview
+    detail = client.get(f"/api/proposals/{listed['id']}").get_json()
+    assert detail['content'] == body
+    
+    dashboard = client.get('/dashboard').get_data(as_text=True)
+    assert 'Dear Acme' in dashboard and body.strip() not in dashboard
+    assert client.get(f"/proposals/{listed['id']}").status_code == 200
+
+def test_search_ranks_and_pages_the_users_proposals(client):
+    user = register_and_login(client)
+    other = User(email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    def add(owner, client_name, content, skills='Python'):
+        proposal = Proposal(user_id=owner.id, content=content, client_name=client_name,
+                            job_description='Build a web app', skills=skills,
+                            model_used='gpt-3.5-turbo', tier='starter')
+        db.session.add(proposal)
+        return proposal
+    body_match = add(user, 'Initech', 'I have shipped Django dashboards for years.')
+    client_match = add(user, 'Django Labs', 'Happy to help with your project.')
+    add(user, 'Globex', 'I write Go services.', skills='Go')
+    add(other, 'Django Labs', 'Another user\'s Django proposal.')
+    db.session.commit()
+
+    results = client.get('/api/proposals/search?q=django').get_json()
+    # A client name match outranks a match in the proposal body
+    assert [item['id'] for item in results['proposals']] == [client_match.id, body_match.id]
+    assert not results['has_more']
+    first = client.get('/api/proposals/search?q=django&limit=1').get_json()
+    second = client.get('/api/proposals/search?q=django&limit=1&page=2').get_json()
+    assert (first['has_more'], second['has_more']) == (True, False)
+    assert second['proposals'][0]['id'] == body_match.id
+    # Prefix on the last word, and query syntax is treated as plain words
+    assert len(client.get('/api/proposals/search?q=dashb').get_json()['proposals']) == 1
+    assert client.get('/api/proposals/search?q="django" OR (NEAR').status_code == 200
+    assert client.get('/api/proposals/search?q=').status_code == 400
+
+    body_match.content = 'I now only build Rails apps.'
+    db.session.delete(client_match)
+    db.session.commit()
+    assert client.get('/api/proposals/search?q=django').get_json()['proposals'] == []
+    assert client.get('/api/proposals/search?q=rails').get_json()['proposals'][0]['id'] == body_match.id
+
+    with patch('app.search_proposal_ids', side_effect=NotImplementedError('Full-text search is not available on mysql')):
+        response = client.get('/api/proposals/search?q=rails')
+    assert response.status_code == 501 and 'error' in response.get_json()
+
+def test_job_status_is_private_to_owner(client):
+    owner = User(email='owner@example.com')
+    owner.set_password('Password123!')
+    db.session.add(owner)
+    db.session.commit()
+    job = GenerationJob(id='a' * 32, user_id=owner.id, client_name='Client', job_description='Job',
+                        skills='Python', model_used='gpt-3.5-turbo', tier='starter')
+    db.session.add(job)
+    db.session.commit()
+    
+    register_and_login(client, email='other@example.com')
+    assert client.get(f'/jobs/{job.id}').status_code == 404
+
+def batch_jobs(count):
+    return [{'client_name': f'Client {i}', 'job_description': f'Job {i}', 'skills': 'Python'}
+            for i in range(count)]
+
+def read_ndjson(response):
+    import json
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_batch_generation_streams_results_and_saves_all(client):
+    user = register_and_login(client)
+    def fake_generate(client_name, job_description, skills, model, tier):
+        return generation(f'Proposal for {client_name}')
+    with patch('app.generate_proposal', side_effect=fake_generate):
+        response = client.post('/api/proposals/batch', json={'jobs': batch_jobs(3)})
+        lines = read_ndjson(response)
+    assert response.mimetype == 'application/x-ndjson'
+    items = sorted(lines[:-1], key=lambda line: line['index'])
+    assert [item['content'] for item in items] == ['Proposal for Client 0', 'Proposal for Client 1',
+                                                   'Proposal for Client 2']
+    assert lines[-1]['status'] == 'complete'
+    assert lines[-1]['succeeded'] == 3
+    assert Proposal.query.filter_by(user_id=user.id).count() == 3
+    assert db.session.get(User, user.id).proposals_this_month == 3
+
+def test_batch_generation_refunds_failed_items(client):
+    user = register_and_login(client)
+    def flaky_generate(client_name, job_description, skills, model, tier):
+        if client_name == 'Client 1':
+            raise RuntimeError('OpenAI API error')
+        return generation(f'Proposal for {client_name}')
+    with patch('app.generate_proposal', side_effect=flaky_generate):
+        lines = read_ndjson(client.post('/api/proposals/batch', json={'jobs': batch_jobs(3)}))
+    failed = [line for line in lines if line.get('status') == 'failed']
+    assert [line['index'] for line in failed] == [1]
+    assert lines[-1]['failed'] == 1
+    assert Proposal.query.filter_by(user_id=user.id).count() == 2
+    assert db.session.get(User, user.id).proposals_this_month == 2
+
+def test_batch_generation_charges_quota_for_whole_batch(client):
+    user = register_and_login(client)
+    user.proposals_this_month = 3
+    db.session.commit()
+    with patch('app.generate_proposal') as mock_generate:
+        response = client.post('/api/proposals/batch', json={'jobs': batch_jobs(3)})
+    assert response.status_code == 403
+    assert mock_generate.call_count == 0
+    assert db.session.get(User, user.id).proposals_this_month == 3
+
 def test_ad_placeholder_dashboard_starter(client):
     user = register_and_login(client)
     response = client.get('/dashboard')
@@ -129,6 +486,41 @@ def test_usage_limit_enforcement(client):
         }, follow_redirects=True)
     assert b'Monthly limit' in response.data
 
+def test_current_user_is_served_from_snapshot_cache(client):
+    from flask import g
+    from user_cache import user_cache
+    def dashboard():
+        # The fixture's app context outlives requests; drop Flask-Login's per-context user
+        g.pop('_login_user', None)
+        return client.get('/dashboard').get_data(as_text=True)
+    user = register_and_login(client)
+    dashboard()
+    with patch('user_cache.UserSnapshot.from_user', side_effect=AssertionError('loaded from the database')):
+        page = dashboard()
+    assert 'test@example.com' in page
+    assert (user_cache.stats()['hits'], user_cache.stats()['misses']) == (1, 1)
+
+    # Changes are visible once the code that made them invalidates the snapshot
+    user.is_premium = True
+    db.session.commit()
+    assert 'ad-placeholder' in dashboard()
+    event = {'type': 'checkout.session.completed',
+             'data': {'object': {'metadata': {'user_id': str(user.id)}, 'customer': 'cus_1', 'subscription': 'sub_1'}}}
+    with patch('stripe.Webhook.construct_event', return_value=event):
+        assert client.post('/stripe/webhook', data=b'{}').status_code == 200
+    assert 'ad-placeholder' not in dashboard()
+    assert user_cache.stats()['invalidations'] == 1
+
+    # Usage reserved for a proposal shows up straight away
+    with patch('jobs.generate_proposal', return_value=generation('Draft')):
+        client.post('/generate', data={'client_name': 'Client', 'job_description': 'Job',
+                                       'skills': 'Python', 'tier': 'starter'})
+    with client.application.test_request_context():
+        snapshot = user_cache.load(user.id)
+    assert snapshot.monthly_usage == 1
+    # Fields outside the snapshot fall back to the User row
+    assert snapshot.stripe_customer_id == 'cus_1'
+
 def test_premium_tier_restriction(client):
     user = register_and_login(client)  # Not premium
     with patch('gpt_utils.generate_proposal', return_value='Test Proposal'):
@@ -147,17 +539,15 @@ def test_mobile_responsive_navigation(client):
 
 def test_database_proposal_storage(client):
     user = register_and_login(client)
-    with patch('gpt_utils.generate_proposal', return_value='Test Proposal'):
-        with patch('models.Proposal') as MockProposal:
-            instance = MockProposal.return_value
-            instance.id = 1
+    with patch('jobs.generate_proposal', return_value=generation('Test Proposal')):
         client.post('/generate', data={
             'client_name': 'Client',
             'job_description': 'Job',
             'skills': 'Python',
             'tier': 'starter'
         })
-            MockProposal.assert_called()
+    proposal = Proposal.query.filter_by(user_id=user.id).one()
+    assert (proposal.content, proposal.client_name, proposal.skills) == ('Test Proposal', 'Client', 'Python')
 
 def test_pricing_page_loads(client):
     response = client.get('/pricing')
@@ -234,6 +624,14 @@ def test_api_rate_limiting(client):
     response = client.get('/api/proposals')
     assert response.status_code == 429 or b'too many requests' in response.data.lower()
 
+def test_metrics_requires_token(client):
+    assert client.get('/metrics').status_code == 404
+    client.application.config['METRICS_TOKEN'] = 'metrics-secret'
+    assert client.get('/metrics', headers={'X-Metrics-Token': 'wrong'}).status_code == 404
+    response = client.get('/metrics', headers={'X-Metrics-Token': 'metrics-secret'})
+    assert response.status_code == 200
+    assert 'connections_reused' in response.get_json()['openai_pool']
+
 def test_production_logging_and_debug():
     app = create_app(TestingConfig)
     app.config['ENV'] = 'production'
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import text
+from app import create_app
+from config import TestingConfig
+from models import db, User, Proposal
+from compression import text_codec, train_dictionary, dictionary_id, backfill, MARKER
+
+JOB = ('We are looking for an experienced Python developer to build a REST API with Flask. '
+       'You will work with PostgreSQL and Redis and write automated tests. ')
+
+@pytest.fixture
+def codec(monkeypatch):
+    monkeypatch.setattr(text_codec, 'enabled', True)
+    monkeypatch.setattr(text_codec, 'min_length', 64)
+    monkeypatch.setattr(text_codec, 'dictionaries', {})
+    monkeypatch.setattr(text_codec, 'dictionary_id', None)
+    return text_codec
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_round_trip_and_plain_fallbacks(codec):
+    long_text = JOB * 10
+    stored = codec.encode(long_text)
+    assert stored.startswith(MARKER) and len(stored) < len(long_text) / 3
+    assert codec.decode(stored) == long_text
+    # Short values and values written while disabled stay readable plain text
+    assert codec.encode('Short proposal') == 'Short proposal'
+    codec.enabled = False
+    assert codec.encode(long_text) == long_text
+    assert codec.decode(long_text) == long_text
+    # Text that looks like an encoded value is always encoded
+    tricky = MARKER + 'not really compressed'
+    assert codec.decode(codec.encode(tricky)) == tricky
+
+def test_shared_dictionary_helps_short_repetitive_text(codec):
+    samples = [f'{JOB}Budget: ${i * 100}. Client {i} prefers weekly updates.' for i in range(50)]
+    data = train_dictionary(samples)
+    assert 0 < len(data) <= 32 * 1024
+    without = codec.encode(samples[0], force=True)
+    codec.dictionaries = {dictionary_id(data): data}
+    codec.dictionary_id = dictionary_id(data)
+    with_dictionary = codec.encode(samples[0], force=True)
+    assert len(with_dictionary) < len(without)
+    assert codec.decode(with_dictionary) == samples[0]
+    # Values written before the dictionary existed still decode
+    assert codec.decode(without) == samples[0]
+
+def test_model_columns_are_compressed_and_backfilled(app, codec):
+    user = User(email='owner@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    codec.enabled = False
+    db.session.add(Proposal(user_id=user.id, content=JOB * 5, client_name='Acme', job_description=JOB * 3,
+                            skills='Python', model_used='gpt-4', tier='premium'))
+    db.session.commit()
+    stored = db.session.execute(text('SELECT content FROM proposal')).scalar()
+    assert stored == JOB * 5
+
+    with db.engine.begin() as connection:
+        report = backfill(connection, Proposal.__table__, ['content', 'job_description'], batch_size=1)
+    assert report['rows'] == 1 and report['bytes_after'] < report['bytes_before']
+    assert db.session.execute(text('SELECT content FROM proposal')).scalar().startswith(MARKER)
+    db.session.expire_all()
+    proposal = Proposal.query.one()
+    assert (proposal.content, proposal.job_description) == (JOB * 5, (JOB * 3).strip())
+
+    with db.engine.begin() as connection:
+        backfill(connection, Proposal.__table__, ['content', 'job_description'], decompress=True)
+    assert db.session.execute(text('SELECT content FROM proposal')).scalar() == JOB * 5
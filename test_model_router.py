@@ -0,0 +1,81 @@
+import time
+import pytest
+from model_router import ModelRouter
+from resilience import openai_resilience
+
+ROUTES = {
+    'starter': {'primary': 'gpt-3.5-turbo'},
+    'premium': {'primary': 'gpt-4', 'fallback': 'gpt-3.5-turbo', 'latency_budget': 0.1}
+}
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(openai_resilience, '_breakers', {})
+    monkeypatch.setattr(openai_resilience, '_counters', {})
+    monkeypatch.setattr(openai_resilience, '_latency', {})
+    router = ModelRouter()
+    router.routes = ROUTES
+    router.min_samples = 5
+    return router
+
+def test_fast_primary_is_not_hedged(router):
+    calls = []
+    def fn(model):
+        calls.append(model)
+        return f'from {model}'
+    assert router.generate('premium', fn) == ('from gpt-4', 'gpt-4')
+    assert calls == ['gpt-4']
+    assert router.stats()['hedged'] == 0
+
+def test_slow_primary_is_hedged_with_fallback(router):
+    def fn(model):
+        if model == 'gpt-4':
+            time.sleep(1)
+        return f'from {model}'
+    started = time.monotonic()
+    assert router.generate('premium', fn) == ('from gpt-3.5-turbo', 'gpt-3.5-turbo')
+    assert time.monotonic() - started < 0.8
+    assert router.stats()['hedged'] == 1
+    assert router.stats()['hedge_wins'] == 1
+
+def test_losing_hedged_call_usage_is_counted(router):
+    from gpt_utils import GenerationResult
+    def fn(model):
+        if model == 'gpt-4':
+            time.sleep(0.3)
+        return GenerationResult(f'from {model}', model, prompt_tokens=100, completion_tokens=400)
+    result, model = router.generate('premium', fn)
+    assert model == 'gpt-3.5-turbo'
+    assert router.stats()['discarded_results'] == 0
+    time.sleep(0.5)
+    stats = router.stats()
+    assert (stats['discarded_results'], stats['discarded_tokens']) == (1, 500)
+    assert stats['discarded_cost'] == pytest.approx(float(GenerationResult('', 'gpt-4', 100, 400).cost))
+
+def test_failed_primary_falls_back(router):
+    def fn(model):
+        if model == 'gpt-4':
+            raise RuntimeError('OpenAI API error: 500')
+        return f'from {model}'
+    assert router.generate('premium', fn) == ('from gpt-3.5-turbo', 'gpt-3.5-turbo')
+    assert router.stats()['fallbacks'] == 1
+
+def test_unhealthy_primary_is_rerouted(router):
+    breaker = openai_resilience.breaker('gpt-4')
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    calls = []
+    assert router.choose('premium') == 'gpt-3.5-turbo'
+    assert router.generate('premium', lambda model: calls.append(model) or model) == ('gpt-3.5-turbo', 'gpt-3.5-turbo')
+    assert calls == ['gpt-3.5-turbo']
+    # Starter has no fallback, so it stays on its primary
+    assert router.choose('starter') == 'gpt-3.5-turbo'
+
+def test_hedge_delay_follows_observed_p95(router):
+    assert router.hedge_delay('gpt-4', 12) == 12
+    openai_resilience.breaker('gpt-4')
+    window = openai_resilience._latency['gpt-4']
+    for latency in (1.0, 1.5, 2.0, 2.5, 3.0):
+        window.record(latency, True)
+    assert router.hedge_delay('gpt-4', 12) == 3.0
+    assert router.hedge_delay('gpt-4', 2) == 2
@@ -0,0 +1,63 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from openai_client import OpenAIClientManager
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    manager = OpenAIClientManager()
+    yield manager
+    manager.close()
+
+def test_client_is_reused_across_calls(manager):
+    assert manager.get_client() is manager.get_client()
+    assert manager.get_client().is_closed() is False
+
+def test_model_settings_share_the_connection_pool(manager):
+    manager.configure(model_settings={'gpt-4': {'timeout': 90.0, 'max_retries': 1}})
+    default_client = manager.get_client('gpt-3.5-turbo')
+    gpt4_client = manager.get_client('gpt-4')
+    assert gpt4_client is manager.get_client('gpt-4')
+    assert gpt4_client.timeout == 90.0
+    assert gpt4_client.max_retries == 1
+    assert gpt4_client._client is default_client._client
+
+def test_pool_stats_count_reused_connections(manager, server_url):
+    http_client = manager.get_http_client()
+    for _ in range(3):
+        assert http_client.get(server_url).status_code == 200
+    stats = manager.stats()
+    assert stats['requests'] == 3
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 2
+
+def test_pool_is_rebuilt_after_fork(manager):
+    client = manager.get_client()
+    manager._pid = os.getpid() + 1  # as if this were a forked child
+    assert manager.get_client() is not client
+    assert manager.stats()['requests'] == 0
@@ -0,0 +1,77 @@
+import threading
+import pytest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash
+from config import TestingConfig
+from models import db, User
+from passwords import password_hasher, canonical_method, PasswordHasherBusyError
+
+class PasswordConfig(TestingConfig):
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:2000'
+    PASSWORD_HASH_WORKERS = 1
+    PASSWORD_HASH_MAX_QUEUE = 0
+
+@pytest.fixture
+def app_config():
+    return PasswordConfig
+
+def test_canonical_method_spells_out_werkzeug_defaults():
+    assert canonical_method('pbkdf2') == 'pbkdf2:sha256:600000'
+    assert canonical_method('pbkdf2:sha512') == 'pbkdf2:sha512:600000'
+    assert canonical_method('scrypt') == 'scrypt:32768:8:1'
+    with pytest.raises(ValueError):
+        canonical_method('md5')
+
+def test_hashes_of_every_method_fit_the_column():
+    for method in ('pbkdf2', 'pbkdf2:sha512', 'scrypt'):
+        assert len(generate_password_hash('Password123!', canonical_method(method))) <= User.password_hash.type.length
+
+def test_login_upgrades_a_hash_made_with_old_parameters(client):
+    user = User(email='old@example.com', password_hash=generate_password_hash('Password123!', 'pbkdf2:sha256:1000'))
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.post('/login', data={'email': 'old@example.com', 'password': 'Password123!'})
+    assert response.status_code == 302
+    stored = db.session.get(User, user.id).password_hash
+    assert stored.startswith('pbkdf2:sha256:2000$')
+    assert password_hasher.verify(stored, 'Password123!')
+    assert not password_hasher.needs_rehash(stored)
+    # A wrong password neither logs in nor rewrites the hash
+    assert not user.check_password('Wrong123!') and user.password_hash == stored
+
+def test_full_hashing_queue_rejects_instead_of_waiting(client):
+    user = User(email='busy@example.com')
+    user.set_password('Password123!')
+    db.session.add(user)
+    db.session.commit()
+
+    release = threading.Event()
+    started = threading.Event()
+    def slow_hash(*args):
+        started.set()
+        release.wait(5)
+    holder = threading.Thread(target=password_hasher._run, args=(slow_hash,))
+    holder.start()
+    try:
+        started.wait(5)
+        with pytest.raises(PasswordHasherBusyError):
+            password_hasher.hash('Password123!')
+        response = client.post('/login', data={'email': 'busy@example.com', 'password': 'Password123!'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+    finally:
+        release.set()
+        holder.join()
+    assert password_hasher.stats()['rejected'] >= 2
+
+def test_oauth_accounts_skip_hashing(client):
+    user = User(email='google@example.com', is_verified=True)
+    with patch('passwords.generate_password_hash') as generate:
+        user.set_unusable_password()
+    generate.assert_not_called()
+    db.session.add(user)
+    db.session.commit()
+    with patch('passwords.check_password_hash') as check:
+        assert not user.check_password('!')
+    check.assert_not_called()
@@ -0,0 +1,76 @@
+import redis
+import pytest
+import proposal_cache as cache_module
+from proposal_cache import ProposalCache, MemoryBackend, cache_key
+from gpt_utils import GenerationResult
+
+@pytest.fixture
+def cache():
+    cache = ProposalCache()
+    cache.backend = MemoryBackend(max_entries=2)
+    cache.ttl = 60
+    return cache
+
+def test_cache_key_ignores_cosmetic_differences():
+    key = cache_key('Acme  Corp', 'Build an API', 'Python, Flask', 'gpt-3.5-turbo')
+    assert key == cache_key(' Acme Corp', 'Build  an\nAPI ', 'flask,python', 'gpt-3.5-turbo')
+    assert key != cache_key('Acme Corp', 'Build an API', 'Python, Flask', 'gpt-4')
+    assert key != cache_key('Acme Corp', 'Build a website', 'Python, Flask', 'gpt-3.5-turbo')
+
+def test_cache_key_changes_with_prompt_version(monkeypatch):
+    key = cache_key('Acme', 'Build an API', 'Python', 'gpt-3.5-turbo')
+    monkeypatch.setattr(cache_module, 'PROMPT_VERSION', cache_module.PROMPT_VERSION + 1)
+    assert cache_key('Acme', 'Build an API', 'Python', 'gpt-3.5-turbo') != key
+
+def test_get_or_generate_counts_hits_and_misses(cache):
+    calls = []
+    def generate(*args):
+        calls.append(args)
+        return GenerationResult('Proposal', 'gpt-3.5-turbo', 100, 400)
+    assert cache.get_or_generate(generate, 'Acme', 'Job', 'Python', 'gpt-3.5-turbo').total_tokens == 500
+    hit = cache.get_or_generate(generate, 'Acme', 'Job', 'python', 'gpt-3.5-turbo')
+    assert (hit.text, hit.cached, hit.total_tokens) == ('Proposal', True, 0)
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+def test_bypass_always_generates(cache):
+    results = iter(['First', 'Second'])
+    generate = lambda *args: GenerationResult(next(results), 'gpt-3.5-turbo')
+    cache.get_or_generate(generate, 'Acme', 'Job', 'Python', 'gpt-3.5-turbo')
+    assert cache.get_or_generate(generate, 'Acme', 'Job', 'Python', 'gpt-3.5-turbo', bypass=True).text == 'Second'
+    assert cache.stats()['bypassed'] == 1
+    # The fresh draft replaces the cached one
+    assert cache.get_or_generate(generate, 'Acme', 'Job', 'Python', 'gpt-3.5-turbo').text == 'Second'
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set('a', '1', 60)
+    backend.set('b', '2', 60)
+    backend.get('a')
+    backend.set('c', '3', 60)
+    assert backend.get('b') is None
+    assert backend.get('a') == '1'
+    assert backend.get('c') == '3'
+
+def test_memory_backend_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    backend = MemoryBackend()
+    backend.set('a', '1', 60)
+    now[0] += 59
+    assert backend.get('a') == '1'
+    now[0] += 2
+    assert backend.get('a') is None
+    assert len(backend) == 0
+
+def test_backend_errors_fall_through_to_generation(cache):
+    class BrokenBackend:
+        def get(self, key):
+            raise redis.ConnectionError('down')
+        def set(self, key, value, ttl):
+            raise redis.ConnectionError('down')
+    cache.backend = BrokenBackend()
+    generate = lambda *args: GenerationResult('Proposal', 'gpt-4')
+    assert cache.get_or_generate(generate, 'Acme', 'Job', 'Python', 'gpt-4').text == 'Proposal'
+    assert cache.stats()['errors'] == 2
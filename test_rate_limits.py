@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import patch
+from flask import g
+from config import TestingConfig
+from gpt_utils import GenerationResult
+from rate_limits import tier_limiter, MemoryBuckets, RedisBuckets
+
+class LimitsConfig(TestingConfig):
+    TIER_RATE_LIMITS = {
+        'generate': {'starter': {'rate': 1, 'period': 60, 'burst': 1}},
+        'api': {
+            'starter': {'rate': 1, 'period': 60, 'burst': 2},
+            'premium': {'rate': 10, 'period': 60, 'burst': 5}
+        },
+        'batch': {'starter': {'rate': 1, 'period': 60, 'burst': 3}}
+    }
+
+@pytest.fixture
+def app_config():
+    return LimitsConfig
+
+def get(client, url):
+    # The fixture's app context outlives requests; start each one fresh
+    for name in ('_login_user', 'rate_limit'):
+        g.pop(name, None)
+    return client.get(url)
+
+def test_api_requests_are_limited_per_user_and_tier(client, login):
+    login('starter@example.com')
+    first, second, third = (get(client, '/api/usage') for _ in range(3))
+    assert first.status_code == second.status_code == 200
+    assert first.headers['X-RateLimit-Limit'] == '2'
+    assert [first.headers['X-RateLimit-Remaining'], second.headers['X-RateLimit-Remaining']] == ['1', '0']
+    assert third.status_code == 429
+    assert 0 < int(third.headers['Retry-After']) <= 60
+    assert int(third.headers['X-RateLimit-Reset']) > int(third.headers['Retry-After'])
+    assert 'Too many requests' in third.get_json()['error']
+
+    # Another user, on the premium tier, has a bucket of their own
+    login('premium@example.com', is_premium=True)
+    response = get(client, '/api/usage')
+    assert response.status_code == 200
+    assert response.headers['X-RateLimit-Limit'] == '5'
+    assert tier_limiter.stats()['rejected'] == 1
+
+def test_limited_form_submission_redirects_with_a_message(client, login):
+    login('form@example.com')
+    data = {'client_name': 'Acme', 'job_description': 'Job', 'skills': 'Python', 'tier': 'starter'}
+    g.pop('_login_user', None)
+    client.post('/generate', data=data)
+    g.pop('_login_user', None)
+    response = client.post('/generate', data=data)
+    assert response.status_code == 302 and response.headers['Location'].endswith('/form')
+    assert response.headers['X-RateLimit-Remaining'] == '0'
+    with client.session_transaction() as sess:
+        assert 'Too many requests' in str(sess['_flashes'])
+
+def test_batch_is_charged_one_request_per_job(client, login):
+    login('batch@example.com')
+    job = {'client_name': 'Acme', 'job_description': 'Job', 'skills': 'Python'}
+    g.pop('_login_user', None)
+    # Rejected before charging: an invalid batch costs nothing
+    assert client.post('/api/proposals/batch', json={'jobs': [job, {}]}).status_code == 400
+    g.pop('_login_user', None)
+    response = client.post('/api/proposals/batch', json={'jobs': [job] * 4})
+    assert response.status_code == 429
+    assert 'counts as 4' in response.get_json()['error']
+    assert response.headers['X-RateLimit-Remaining'] == '3'
+
+def test_batch_larger_than_the_generate_burst_is_allowed(client, login):
+    login('batch@example.com')
+    job = {'client_name': 'Acme', 'job_description': 'Job', 'skills': 'Python'}
+    g.pop('_login_user', None)
+    with patch('app.generate_proposal', return_value=GenerationResult('Proposal', 'gpt-3.5-turbo')):
+        response = client.post('/api/proposals/batch', json={'jobs': [job, job]})
+        response.get_data()
+    assert response.status_code == 200
+    assert response.headers['X-RateLimit-Remaining'] == '1'
+    g.pop('_login_user', None)
+    response = client.post('/api/proposals/batch', json={'jobs': [job, job]})
+    assert response.status_code == 429
+    assert 'Too many requests' in response.get_json()['error']
+
+def test_bucket_refills_at_the_configured_rate():
+    buckets = MemoryBuckets()
+    assert buckets.hit('k', 1, 2, 0.5, now=0).remaining == 1
+    assert buckets.hit('k', 1, 2, 0.5, now=0).allowed
+    rejected = buckets.hit('k', 1, 2, 0.5, now=0)
+    assert not rejected.allowed and rejected.retry_after == 2 and rejected.reset == 4
+    assert buckets.hit('k', 1, 2, 0.5, now=2).allowed
+
+def test_falls_back_to_local_buckets_when_redis_is_down(client):
+    tier_limiter.backend = RedisBuckets('redis://127.0.0.1:1/0')
+    decision = tier_limiter.hit('api', 'starter', 'user:1')
+    assert decision.allowed and decision.remaining == 1
+    assert tier_limiter.stats()['backend_errors'] == 1
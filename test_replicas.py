@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import patch
+from flask import g
+from sqlalchemy import event
+from config import TestingConfig
+from models import db
+from gpt_utils import GenerationResult
+
+@pytest.fixture
+def app_config(tmp_path):
+    path = tmp_path / 'primary.db'
+
+    # A second engine on the same file stands in for a replica with no lag
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_REPLICA_URLS = [f'sqlite:///{path}']
+
+    return ReplicaConfig
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper()))
+    return statements
+
+def get(client, url):
+    # The fixture's app context outlives requests; start each one fresh
+    for name in ('_login_user', 'db_replica', 'db_wrote'):
+        g.pop(name, None)
+    db.session.remove()
+    return client.get(url)
+
+def test_read_only_views_use_the_replica_until_the_user_writes(client, login, add_proposal):
+    add_proposal(login(), client_name='Acme')
+    replica = count_statements(client.application.extensions['replica_engines']['replica_0'])
+    primary = count_statements(db.engines[None])
+
+    response = get(client, '/api/proposals')
+    assert response.get_json()['proposals'][0]['client_name'] == 'Acme'
+    assert replica and set(replica) == {'SELECT'}
+    # Only loading the user for the session happened on the primary
+    primary_reads = len(primary)
+    get(client, '/api/skills')
+    assert len(primary) == primary_reads
+
+    # Views that are not routed never touch the replica
+    replica.clear()
+    get(client, '/form')
+    assert replica == []
+
+    # After this browser session writes, its reads stay on the primary for a while
+    with patch('jobs.generate_proposal', return_value=GenerationResult('Draft', 'gpt-3.5-turbo')):
+        client.post('/generate', data={'client_name': 'Initech', 'job_description': 'Job',
+                                       'skills': 'Python', 'tier': 'starter'})
+    proposals = get(client, '/api/proposals').get_json()['proposals']
+    assert [proposal['client_name'] for proposal in proposals] == ['Initech', 'Acme']
+    assert replica == []
@@ -0,0 +1,62 @@
+import json
+import queue
+import logging
+import pytest
+from app import create_app
+from config import TestingConfig
+from models import db, User
+from request_logging import request_logger, RequestContextQueueHandler
+
+@pytest.fixture
+def app(tmp_path):
+    class LoggingConfig(TestingConfig):
+        LOG_FILE = str(tmp_path / 'logs' / 'app.log')
+        LOG_SAMPLE_RATES = {'index': 0.5}
+
+    app = create_app(LoggingConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def written(app):
+    request_logger.flush()
+    with open(app.config['LOG_FILE']) as log_file:
+        return [json.loads(line) for line in log_file]
+
+def test_requests_are_logged_as_json_with_request_and_user(app):
+    client = app.test_client()
+    user = User(email='logged@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+
+    client.get('/api/usage')
+    client.get('/no-such-page')
+    logging.getLogger('token_budget').warning('Budget low', extra={'model': 'gpt-4'})
+    usage, missing, warning = written(app)
+
+    assert usage['logger'] == 'draftcraft.requests' and usage['endpoint'] == 'api_usage'
+    assert usage['status'] == 200 and usage['user_id'] == user.id
+    assert usage['duration_ms'] >= 0 and len(usage['request_id']) == 16
+    assert missing['status'] == 404 and missing['request_id'] != usage['request_id']
+    assert warning == {**warning, 'level': 'WARNING', 'message': 'Budget low', 'model': 'gpt-4'}
+    assert 'request_id' not in warning
+
+def test_sampled_endpoints_log_a_share_of_successes(app, monkeypatch):
+    client = app.test_client()
+    monkeypatch.setattr(request_logger, 'random', lambda: 0.7)
+    client.get('/')
+    monkeypatch.setattr(request_logger, 'random', lambda: 0.2)
+    client.get('/')
+    assert [(entry['endpoint'], entry['sample_rate']) for entry in written(app)] == [('index', 0.5)]
+    assert request_logger.stats()['sampled_out'] == 1
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = RequestContextQueueHandler(queue.Queue(1))
+    for message in ('kept', 'dropped'):
+        handler.handle(logging.makeLogRecord({'msg': message}))
+    assert handler.queue.get_nowait().msg == 'kept'
+    assert handler.dropped == 1
@@ -0,0 +1,144 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import gpt_utils
+from openai_client import client_manager
+from resilience import openai_resilience, RetryPolicy, CircuitBreaker
+
+def completion(text):
+    return 200, {}, {
+        'id': 'chatcmpl-test',
+        'object': 'chat.completion',
+        'created': 0,
+        'model': 'gpt-3.5-turbo',
+        'choices': [{'index': 0, 'finish_reason': 'stop',
+                     'message': {'role': 'assistant', 'content': text}}],
+        'usage': {'prompt_tokens': 50, 'completion_tokens': 20, 'total_tokens': 70}
+    }
+
+def error(status, headers=None):
+    return status, headers or {}, {'error': {'message': f'HTTP {status}', 'type': 'server_error'}}
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Serves scripted chat completion responses, one per request"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeOpenAIHandler)
+        self.responses = []
+        self.requests = []
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.requests.append(json.loads(self.rfile.read(length)))
+        status, headers, body = self.server.responses.pop(0)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = FakeOpenAIServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    client_manager.close()
+    client_manager.configure(base_url=f'http://127.0.0.1:{server.server_address[1]}/v1', read_timeout=5)
+    delays = []
+    monkeypatch.setattr(openai_resilience, 'policy', RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05))
+    monkeypatch.setattr(openai_resilience, 'sleep', delays.append)
+    monkeypatch.setattr(openai_resilience, 'failure_threshold', 3)
+    monkeypatch.setattr(openai_resilience, '_breakers', {})
+    monkeypatch.setattr(openai_resilience, '_counters', {})
+    server.delays = delays
+    yield server
+    server.shutdown()
+    server.server_close()
+    client_manager.close()
+    client_manager.configure()
+
+def test_rate_limit_is_retried_after_retry_after(fake_openai):
+    fake_openai.responses = [error(429, {'Retry-After-Ms': '40'}), completion('Hello client')]
+    result = gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert result.text == 'Hello client'
+    assert (result.prompt_tokens, result.completion_tokens) == (50, 20)
+    assert len(fake_openai.requests) == 2
+    assert fake_openai.delays[0] >= 0.04
+    stats = openai_resilience.stats()['gpt-3.5-turbo']
+    assert stats['retries'] == 1
+    assert stats['state'] == 'closed'
+
+def test_retry_after_beyond_max_delay_fails_at_once(fake_openai):
+    fake_openai.responses = [error(429, {'Retry-After': '30'})]
+    with pytest.raises(RuntimeError):
+        gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert len(fake_openai.requests) == 1
+    assert fake_openai.delays == []
+
+def test_server_errors_exhaust_retries(fake_openai):
+    fake_openai.responses = [error(500), error(502), error(503)]
+    with pytest.raises(RuntimeError):
+        gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert len(fake_openai.requests) == 3
+    stats = openai_resilience.stats()['gpt-3.5-turbo']
+    assert (stats['retries'], stats['failures']) == (2, 1)
+
+def test_client_errors_are_not_retried(fake_openai):
+    fake_openai.responses = [error(400)]
+    with pytest.raises(RuntimeError):
+        gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert len(fake_openai.requests) == 1
+    assert openai_resilience.stats()['gpt-3.5-turbo']['state'] == 'closed'
+
+def test_open_circuit_fails_fast(fake_openai):
+    fake_openai.responses = [error(500), error(500), error(500)]
+    with pytest.raises(RuntimeError):
+        gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert openai_resilience.stats()['gpt-3.5-turbo']['state'] == 'open'
+
+    with pytest.raises(RuntimeError, match='circuit'):
+        gpt_utils.generate_proposal('Acme', 'Build an API', 'Python')
+    assert len(fake_openai.requests) == 3
+    assert openai_resilience.stats()['gpt-3.5-turbo']['rejected'] == 1
+
+def test_breaker_half_opens_after_recovery_timeout(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('resilience.time.monotonic', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow_request() is False
+    now[0] += 31
+    assert breaker.allow_request() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time
+    assert breaker.allow_request() is False
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] += 31
+    assert breaker.allow_request() is True
+    # A call that fails for its own reasons frees the trial without closing the circuit
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    for _ in range(100):
+        assert 0 <= policy.delay(1) <= 1
+        assert 0 <= policy.delay(5) <= 4
+        assert policy.delay(1, retry_after=3) == 3
+        assert policy.delay(1, retry_after=10) is None
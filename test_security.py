@@ -0,0 +1,51 @@
+import re
+import random
+import bleach
+from werkzeug.datastructures import ImmutableMultiDict
+from security import check_suspicious_activity, sanitize_input, SUSPICIOUS_PATTERNS
+
+# The implementations screening replaced, kept as the reference behaviour
+def legacy_sanitize_input(value):
+    if not value:
+        return value
+    return bleach.clean(value, tags=[], attributes={}, protocols=[], strip=True)
+
+def legacy_check_suspicious_activity(request_data):
+    data_str = str(request_data).lower()
+    for pattern in SUSPICIOUS_PATTERNS:
+        if re.search(pattern, data_str):
+            return True, f"Suspicious pattern detected: {pattern}"
+    return False, None
+
+FRAGMENTS = ['<script', '<SCRIPT', 'javascript:', 'JavaScript:', 'data:text/html', 'vbscript:', 'onload=',
+             'onerror=', '<iframe', '<object', '<embed', '<embedata:text/html', 'ata:text/html', 'java', 'script',
+             ':', '=', '<', '>', '&', '&amp;', '"', "'", '\\', '\n', '\r\n', '\r', '\t', '\x00', '\x1d', '\x0b',
+             '\x7f', '‍', 'İ', 'ſ', 'K', 'Σ', 'Σ ', 'é', '😀', ' ', 'Python', 'Flask, ']
+CORPUS = [
+    '', 'Plain text job description', "Client's budget is $500", 'Use <b>bold</b> & \"quotes\"',
+    'a > b', 'line one\r\nline two', 'tab\tseparated', 'nul\x00byte', '\x1data:text/html',
+    '<ſcript>', 'JAVAſCRIPT:', 'onload =', '<embedata:text/html', 'Σ' * 3, 'x' * 10000,
+]
+
+def random_text(rng):
+    return ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 12)))
+
+def test_screening_matches_the_per_pattern_scan_on_a_differential_corpus():
+    rng = random.Random(2024)
+    texts = CORPUS + [random_text(rng) for _ in range(3000)]
+    for text in texts:
+        assert sanitize_input(text) == legacy_sanitize_input(text), repr(text)
+    for _ in range(3000):
+        fields = [(rng.choice(['client_name', 'job_description', 'skills', random_text(rng)]), rng.choice(texts))
+                  for _ in range(rng.randint(0, 4))]
+        form = ImmutableMultiDict(fields)
+        assert check_suspicious_activity(form) == legacy_check_suspicious_activity(form), repr(form)
+        # Batch items are JSON objects whose values need not be strings
+        item = dict(fields, extra=rng.choice([None, 3, [rng.choice(texts)], {'nested': rng.choice(texts)}]))
+        assert check_suspicious_activity(item) == legacy_check_suspicious_activity(item), repr(item)
+
+def test_first_pattern_in_list_order_is_reported():
+    form = ImmutableMultiDict([('job_description', '<embedata:text/html'), ('skills', '<script')])
+    assert check_suspicious_activity(form) == (True, 'Suspicious pattern detected: <script')
+    assert check_suspicious_activity({'skills': '<EMBEDATA:TEXT/HTML'}) == \
+        (True, 'Suspicious pattern detected: data:text/html')
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from models import db, User, Proposal
+from similar import vectorize, encode_vector, UserMatrix, similar_proposals, DIMENSIONS
+
+FLASK_JOB = 'Build a REST API in Flask with PostgreSQL and automated tests'
+
+def test_vectors_are_unit_length_and_rank_related_jobs_higher():
+    query = vectorize('Flask REST API with PostgreSQL')
+    related = vectorize(FLASK_JOB)
+    unrelated = vectorize('Design a logo and brand guidelines for a bakery')
+    assert query.dtype == np.float32 and query.shape == (DIMENSIONS,)
+    assert np.isclose(np.linalg.norm(query), 1.0)
+    assert query @ related > 0.3 > query @ unrelated
+    assert not vectorize('the and of').any()
+
+def test_matrix_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((1000, DIMENSIONS)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    matrix = UserMatrix()
+    # Appends in uneven chunks exercise the capacity growth
+    for start, stop in [(0, 1), (1, 40), (40, 1000)]:
+        matrix.append(list(range(start + 1, stop + 1)), [encode_vector(vector) for vector in vectors[start:stop]])
+    assert matrix.size == 1000
+    # Rows already held are not added twice
+    matrix.append([5], [encode_vector(vectors[4])])
+    assert matrix.size == 1000
+    query = vectors[123]
+    expected = np.argsort(-(vectors @ query))[:5] + 1
+    assert [row_id for row_id, _ in matrix.top_k(query, 5, min_score=-1)] == list(expected)
+    assert matrix.top_k(query, 5, min_score=0.99) == [(124, pytest.approx(1.0, abs=1e-5))]
+
+def test_similar_api_suggests_own_proposals_and_picks_up_new_ones(client, login, add_proposal):
+    user = login()
+    other = User(email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    flask_job = add_proposal(user, job_description=FLASK_JOB, skills='Python, Flask')
+    add_proposal(user, job_description='Design a logo for a bakery', skills='Illustrator')
+    add_proposal(other, job_description=FLASK_JOB, skills='Python, Flask')
+
+    url = '/api/proposals/similar?job_description=Flask REST API with PostgreSQL&skills=Python'
+    results = client.get(url).get_json()['proposals']
+    assert [item['id'] for item in results] == [flask_job.id]
+    assert results[0]['score'] > 0.3 and results[0]['url'] == f'/proposals/{flask_job.id}'
+
+    # Alternative drafts share the first draft's vector and are not suggested twice
+    first = add_proposal(user, job_description='Flask REST API with PostgreSQL for invoices', variant_index=0)
+    second = add_proposal(user, job_description='Flask REST API with PostgreSQL for invoices', variant_index=1)
+    assert db.session.get(Proposal, second.id).embedding is None
+    ids = [item['id'] for item in client.get(url).get_json()['proposals']]
+    assert ids[0] == first.id and second.id not in ids
+    stats = similar_proposals.stats()
+    assert (stats['hits'], stats['misses'], stats['rows']) == (1, 1, 3)
+    assert client.get('/api/proposals/similar').status_code == 400
@@ -0,0 +1,119 @@
+import threading
+import time
+import redis
+from singleflight import SingleFlight
+
+class FakeRedis:
+    """Just enough of redis.Redis for the single-flight lock protocol"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value.encode() if isinstance(value, str) else value
+            return True
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.data.get(key) == token.encode():
+                del self.data[key]
+                return 1
+            return 0
+
+def run_concurrently(flight, key, fn, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(key, fn))) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    calls = []
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'job-1'
+    results = run_concurrently(flight, 'user:1', work, 4)
+    assert len(calls) == 1
+    assert sorted(results) == [('job-1', False)] + [('job-1', True)] * 3
+    assert flight.stats() == {'leaders': 1, 'coalesced_local': 3, 'coalesced_remote': 0, 'in_flight': 0}
+
+def test_followers_receive_the_leaders_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    def work():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('OpenAI API error')
+    errors = []
+    def call():
+        try:
+            flight.do('user:1', work)
+        except RuntimeError as e:
+            errors.append(e)
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do('user:1', lambda: 'first') == ('first', False)
+    assert flight.do('user:1', lambda: 'second') == ('second', False)
+
+def test_waits_for_leader_in_another_worker():
+    flight = SingleFlight()
+    flight.redis = FakeRedis()
+    flight.poll_interval = 0.01
+    lock_key = 'draftcraft:singleflight:lock:user:1'
+    flight.redis.set(lock_key, 'other-worker')
+    def other_worker_finishes():
+        time.sleep(0.1)
+        flight.redis.set('draftcraft:singleflight:result:other-worker', '"job-7"')
+        flight.redis.delete(lock_key)
+    threading.Thread(target=other_worker_finishes).start()
+    calls = []
+    assert flight.do('user:1', lambda: calls.append(1)) == ('job-7', True)
+    assert calls == []
+    assert flight.stats()['coalesced_remote'] == 1
+
+def test_takes_over_when_remote_leader_fails():
+    flight = SingleFlight()
+    flight.redis = FakeRedis()
+    flight.poll_interval = 0.01
+    lock_key = 'draftcraft:singleflight:lock:user:1'
+    flight.redis.set(lock_key, 'other-worker')
+    threading.Timer(0.1, lambda: flight.redis.delete(lock_key)).start()
+    assert flight.do('user:1', lambda: 'job-8') == ('job-8', False)
+    assert flight.redis.get(lock_key) is None
+
+def test_result_is_returned_when_publishing_it_fails():
+    flight = SingleFlight()
+    flight.redis = FakeRedis()
+    set_key = flight.redis.set
+    def set_or_fail(key, value, **kwargs):
+        if key.startswith('draftcraft:singleflight:result:'):
+            raise redis.ConnectionError('Connection reset by peer')
+        return set_key(key, value, **kwargs)
+    flight.redis.set = set_or_fail
+    assert flight.do('user:1', lambda: 'job-9') == ('job-9', False)
+    assert flight.redis.get('draftcraft:singleflight:lock:user:1') is None
@@ -0,0 +1,49 @@
+from models import db, Proposal, ProposalSkill
+from skills import parse_skills, backfill_tags
+
+def tags_of(proposal):
+    return sorted(tag.skill for tag in ProposalSkill.query.filter_by(proposal_id=proposal.id))
+
+def test_parse_splits_case_folds_and_maps_synonyms():
+    assert parse_skills('Python3, ReactJS; Node and Postgres') == ['python', 'react', 'node.js', 'postgresql']
+    assert parse_skills('C++ | C# | .NET\n• UI/UX') == ['c++', 'c#', '.net', 'ui/ux design']
+    assert parse_skills('Flask, flask,  FLASK , "Docker".') == ['flask', 'docker']
+    assert parse_skills(' , ;') == []
+
+def test_tags_follow_writes_and_drive_filters_and_facets(client, login, add_proposal):
+    user = login()
+    flask_api = add_proposal(user, skills='Python, Flask, PostgreSQL')
+    django_app = add_proposal(user, skills='python3, Django')
+    add_proposal(user, skills='React, Node')
+    # Alternative drafts are tagged but not counted twice in facets
+    add_proposal(user, skills='Python, Flask', parent_id=flask_api.id)
+    assert tags_of(flask_api) == ['flask', 'postgresql', 'python']
+
+    listed = client.get('/api/proposals?skill=Python&skill=flask').get_json()['proposals']
+    assert [item['id'] for item in listed] == [flask_api.id]
+    listed = client.get('/api/proposals?skill=py&include_total=1').get_json()
+    assert listed['total'] == 2
+    facets = client.get('/api/skills').get_json()['skills']
+    assert facets[0] == {'skill': 'python', 'proposals': 2}
+    narrowed = client.get('/api/skills?skill=python').get_json()['skills']
+    assert {facet['skill'] for facet in narrowed} == {'flask', 'postgresql', 'django'}
+
+    django_app.skills = 'Django, Celery'
+    db.session.commit()
+    assert tags_of(django_app) == ['celery', 'django']
+    db.session.delete(django_app)
+    db.session.commit()
+    assert ProposalSkill.query.filter_by(proposal_id=django_app.id).count() == 0
+
+def test_backfill_tags_existing_rows_in_batches(client, login):
+    user = login()
+    db.session.execute(db.insert(Proposal), [{
+        'user_id': user.id, 'content': 'Proposal', 'client_name': 'Client', 'job_description': 'Job',
+        'skills': f'Python, Skill {i}', 'model_used': 'gpt-3.5-turbo', 'tier': 'starter'
+    } for i in range(5)])
+    db.session.commit()
+    assert ProposalSkill.query.count() == 0
+    with db.engine.begin() as connection:
+        tagged = backfill_tags(connection, Proposal.__table__, ProposalSkill.__table__, batch_size=2)
+    assert tagged == 5
+    assert ProposalSkill.facets(user.id, limit=1) == [('python', 5)]
@@ -0,0 +1,64 @@
+import re
+from unittest.mock import patch
+from flask import g
+from models import db, User
+from gpt_utils import GenerationResult
+from timing import stage_timer, span, Histogram
+
+def server_timing(response):
+    return {name: float(duration) for name, duration in re.findall(r'(\w+);dur=([\d.]+)', response.headers['Server-Timing'])}
+
+def test_generate_reports_each_stage_in_server_timing_and_histograms(client, login):
+    login('timed@example.com')
+    with patch('jobs.generate_proposal', return_value=GenerationResult('Draft', 'gpt-3.5-turbo')):
+        response = client.post('/generate', data={'client_name': 'Acme', 'job_description': 'Build an API',
+                                                  'skills': 'Python', 'tier': 'starter'})
+    assert response.status_code == 200
+    stages = server_timing(response)
+    assert {'sanitize', 'quota', 'generate', 'db_commit', 'render', 'total'} <= set(stages)
+    assert stages['total'] >= stages['generate']
+    assert f'desc="{g.request_id}"' in response.headers['Server-Timing']
+
+    histograms = stage_timer.stats()['generate']
+    assert histograms['quota']['count'] == 1 and histograms['total']['p95_ms'] is not None
+
+def test_stages_are_not_carried_into_the_next_request(client):
+    response = client.get('/')
+    assert set(server_timing(response)) <= {'render', 'total'}
+
+def test_spans_outside_a_request_do_nothing_and_quantiles_use_bucket_bounds():
+    with span('sanitize'):
+        pass
+    histogram = Histogram()
+    for ms in (0.5, 3, 3, 40, 70000):
+        histogram.observe(ms)
+    assert histogram.quantile(0.5) == 5
+    assert histogram.quantile(0.8) == 50
+    assert histogram.quantile(0.99) is None
+    assert histogram.snapshot()['count'] == 5
+
+def test_streamed_generation_reaches_the_histograms_when_the_stream_ends(client, login):
+    login('streamed@example.com')
+    stream = iter(['Dear Acme', GenerationResult('Dear Acme', 'gpt-3.5-turbo')])
+    with patch('app.stream_proposal', return_value=stream):
+        response = client.post('/generate/stream', data={'client_name': 'Acme', 'job_description': 'Build an API',
+                                                         'skills': 'Python', 'tier': 'starter'})
+        response.get_data()
+        response.close()
+    # The header went out before the body ran
+    assert 'generate' not in server_timing(response)
+    assert stage_timer.stats()['generate_stream']['generate']['count'] == 1
+
+def test_tasks_outside_a_request_time_their_stages(client):
+    from jobs import run_generation_job
+    from models import GenerationJob
+    user = User(email='worker@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(GenerationJob(id='d' * 32, user_id=user.id, client_name='Acme', job_description='Build an API',
+                                 skills='Python', model_used='gpt-3.5-turbo', tier='starter'))
+    db.session.commit()
+    with patch('jobs.generate_proposal', return_value=GenerationResult('Draft', 'gpt-3.5-turbo')):
+        run_generation_job.apply(args=['d' * 32])
+    stages = stage_timer.stats()['jobs.run_generation_job']
+    assert {'generate', 'db_commit', 'total'} <= set(stages)
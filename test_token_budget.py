@@ -0,0 +1,88 @@
+import pytest
+from token_budget import TokenBudget, MemoryBuckets, RedisBuckets, BudgetExceededError, estimate_tokens
+
+@pytest.fixture
+def budget():
+    budget = TokenBudget()
+    budget.backend = MemoryBuckets()
+    budget.limits = {'gpt-4': {'tpm': 6000, 'rpm': 60}}
+    budget.premium_reserve = 0.5
+    budget.max_wait = 0
+    budget.sleep = lambda seconds: None
+    return budget
+
+def test_estimate_covers_prompt_and_every_choice():
+    messages = [{'role': 'user', 'content': 'x' * 300}]
+    assert estimate_tokens(messages, 500) > 500 + 300 // 4
+    assert estimate_tokens(messages, 500, n=3) - estimate_tokens(messages, 500) == 1000
+
+def test_starter_cannot_spend_the_premium_reserve(budget):
+    budget.acquire('gpt-4', 2000, 'starter')
+    with pytest.raises(BudgetExceededError):
+        budget.acquire('gpt-4', 2000, 'starter')
+    # Premium traffic can still use the reserved half
+    budget.acquire('gpt-4', 2000, 'premium')
+    assert budget.stats()['rejected'] == 1
+    assert budget.stats()['granted'] == 2
+
+def test_requests_queue_until_the_bucket_refills(budget, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('token_budget.time.monotonic', lambda: now[0])
+    budget.max_wait = 30
+    slept = []
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+    budget.sleep = sleep
+    budget.acquire('gpt-4', 6000, 'premium')
+    # 6000 TPM refills at 100 tokens a second
+    budget.acquire('gpt-4', 1000, 'premium')
+    assert slept == [pytest.approx(10)]
+    assert budget.stats()['queued'] == 1
+
+def test_unused_tokens_are_returned(budget):
+    reserved = budget.acquire('gpt-4', 3000, 'starter')
+    budget.settle('gpt-4', reserved, 200)
+    budget.acquire('gpt-4', 2500, 'starter')
+    assert budget.stats()['tokens_returned'] == 2800
+
+def test_oversized_and_unlimited_requests(budget):
+    with pytest.raises(BudgetExceededError):
+        budget.acquire('gpt-4', 7000, 'premium')
+    assert budget.acquire('gpt-3.5-turbo', 10 ** 9) == 0
+
+def test_falls_back_to_local_buckets_when_redis_is_down(budget):
+    budget.backend = RedisBuckets('redis://127.0.0.1:1/0')
+    assert budget.acquire('gpt-4', 1000, 'starter') == 1000
+    assert budget.stats()['backend_errors'] == 1
+
+def test_each_attempt_is_charged_and_failed_attempts_give_it_back(budget, monkeypatch):
+    from types import SimpleNamespace
+    import gpt_utils
+    monkeypatch.setattr(gpt_utils, 'token_budget', budget)
+    responses = [RuntimeError('HTTP 500'), SimpleNamespace(usage=SimpleNamespace(total_tokens=400))]
+    def request():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    attempt = gpt_utils.budgeted('gpt-4', 1000, 'starter', request)
+    with pytest.raises(RuntimeError):
+        attempt()
+    assert attempt().usage.total_tokens == 400
+    stats = budget.stats()
+    assert (stats['granted'], stats['tokens_reserved'], stats['tokens_returned']) == (2, 2000, 1600)
+
+def test_a_stream_closed_early_keeps_its_reservation(budget, monkeypatch):
+    from types import SimpleNamespace
+    import gpt_utils
+    monkeypatch.setattr(gpt_utils, 'token_budget', budget)
+    chunks = [SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+              for word in ('Dear ', 'Acme')]
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: iter(chunks))))
+    monkeypatch.setattr(gpt_utils, 'get_client', lambda model: client)
+    stream = gpt_utils.stream_proposal('Acme', 'Job', 'Python', model='gpt-4')
+    assert next(stream) == 'Dear '
+    stream.close()
+    stats = budget.stats()
+    assert stats['granted'] == 1 and stats['tokens_returned'] == 0
@@ -0,0 +1,211 @@
+"""
+Per-request stage timing for DraftCraft Agent
+
+span('name') times a stage of the current request. The hot paths of
+/generate are instrumented: sanitizing and screening the form, the quota
+reservation, proposal generation (OpenAI or the cache), database commits
+and template rendering. A stage's durations are summed over the request and
+returned in a Server-Timing header, with the total and g.request_id, so
+browser dev tools show where a slow request spent its time. Every stage
+also feeds a histogram per endpoint, reported under /metrics.
+
+Stages may nest (a quota reservation includes its commit). Celery tasks
+run inside task_stages(), which collects their stages the same way, adds
+them to histograms under the task's name and logs them, so generation that
+happens on a worker is measured too. Elsewhere, such as in helper threads,
+spans do nothing. Stages are kept on the request rather than on g because
+eager Celery tasks push an app context, and with it a fresh g, within the
+request.
+
+A streamed response's body runs after the Server-Timing header is sent.
+The header only has the stages that came before it, and the endpoint's
+histograms get the full set of stages when the stream closes.
+"""
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+STAGES_KEY = 'draftcraft.stages'
+# Histogram bucket upper bounds in milliseconds; slower observations go in a last, open bucket
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_task = threading.local()
+
+def _timing():
+    """Whether there is a request or task to record stages for"""
+    return has_request_context() or getattr(_task, 'stages', None) is not None
+
+def record(name, ms):
+    """Add ms to a stage of the current request and task"""
+    targets = []
+    if has_request_context():
+        targets.append(request.environ.setdefault(STAGES_KEY, {}))
+    if getattr(_task, 'stages', None) is not None:
+        targets.append(_task.stages)
+    for stages in targets:
+        stages[name] = stages.get(name, 0.0) + ms
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as a stage of the current request or task"""
+    if not _timing():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
+
+def timed(name):
+    """Time every call of a function as a stage of the current request"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def request_stages():
+    """The stages recorded so far in the current request, in milliseconds"""
+    return request.environ.get(STAGES_KEY, {}) if has_request_context() else {}
+
+@contextmanager
+def task_stages(task):
+    """Collect the stages of a background task, then add them to its histograms and log them"""
+    outer = getattr(_task, 'stages', None)
+    _task.stages = stages = {}
+    started = time.perf_counter()
+    try:
+        yield stages
+    finally:
+        _task.stages = outer
+        stages['total'] = (time.perf_counter() - started) * 1000
+        stage_timer.observe(task, stages)
+        logger.info('task', extra={'task': task,
+                                   'stages_ms': {name: round(ms, 2) for name, ms in stages.items()}})
+
+def instrument_commits(session_class):
+    """Record session commits, flush included, as the db_commit stage"""
+    @event.listens_for(session_class, 'before_commit')
+    def commit_started(session):
+        if _timing():
+            session.info['commit_started'] = time.perf_counter()
+
+    @event.listens_for(session_class, 'after_commit')
+    def commit_finished(session):
+        started = session.info.pop('commit_started', None)
+        if started is not None:
+            record('db_commit', (time.perf_counter() - started) * 1000)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def commit_failed(session):
+        session.info.pop('commit_started', None)
+
+class Histogram:
+    """Counts of observations per BUCKETS_MS bucket"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bound)"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count, 2) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99)
+        }
+
+class StageTimer:
+    """Sends each request's stages as Server-Timing and keeps histograms per endpoint"""
+
+    def __init__(self):
+        self.header = True
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def init_app(self, app):
+        """Hook into requests and template rendering"""
+        self.header = app.config['SERVER_TIMING_HEADER']
+        with self._lock:
+            self._histograms = {}
+        before_render_template.connect(self._render_started, app)
+        template_rendered.connect(self._render_finished, app)
+        app.after_request(self._finish_request)
+        app.extensions['stage_timer'] = self
+
+    def _render_started(self, sender, template, context, **extra):
+        request.environ.setdefault('draftcraft.render_started', []).append(time.perf_counter())
+
+    def _render_finished(self, sender, template, context, **extra):
+        started = request.environ.get('draftcraft.render_started')
+        if started:
+            record('render', (time.perf_counter() - started.pop()) * 1000)
+
+    def _finish_request(self, response):
+        stages = dict(request_stages())
+        started = g.get('request_started')
+        if started is not None:
+            stages['total'] = (time.perf_counter() - started) * 1000
+        if not stages:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        if response.is_streamed:
+            # The body has not run yet; observe its stages once it has been sent
+            environ = request.environ
+            response.call_on_close(lambda: self._finish_stream(endpoint, environ, started))
+        else:
+            self.observe(endpoint, stages)
+        if self.header:
+            metrics = [f'{name};dur={ms:.1f}' for name, ms in stages.items() if name != 'total']
+            if 'total' in stages:
+                metrics.append(f'total;dur={stages["total"]:.1f};desc="{g.get("request_id")}"')
+            response.headers['Server-Timing'] = ', '.join(metrics)
+        return response
+
+    def _finish_stream(self, endpoint, environ, started):
+        stages = dict(environ.get(STAGES_KEY, {}))
+        if started is not None:
+            stages['total'] = (time.perf_counter() - started) * 1000
+        self.observe(endpoint, stages)
+
+    def observe(self, endpoint, stages):
+        """Add one request's (or task's) stage durations to the endpoint's histograms"""
+        with self._lock:
+            histograms = self._histograms.setdefault(endpoint, {})
+            for name, ms in stages.items():
+                histograms.setdefault(name, Histogram()).observe(ms)
+
+    def stats(self):
+        """Per-endpoint, per-stage latency summaries for this process"""
+        with self._lock:
+            return {endpoint: {name: histogram.snapshot() for name, histogram in stages.items()}
+                    for endpoint, stages in self._histograms.items()}
+
+stage_timer = StageTimer()
@@ -0,0 +1,246 @@
+"""
+Shared OpenAI token/request budget for DraftCraft Agent
+
+OpenAI enforces tokens-per-minute (TPM) and requests-per-minute (RPM) limits
+per model for the whole organisation. Every call reserves its estimated cost
+(prompt plus max_tokens) from a token bucket per model before it is sent.
+With the Redis backend the buckets are shared by every gunicorn and Celery
+worker; if Redis is unreachable each process falls back to its own buckets.
+A share of each bucket is held back for premium traffic. Callers that find
+the bucket empty wait up to TOKEN_BUDGET_MAX_WAIT seconds and are then rejected.
+"""
+import math
+import time
+import logging
+import threading
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Refill and take from every bucket only if all of them can cover their cost.
+# KEYS: bucket keys. ARGV[1]: now (ms); then per bucket: cost, capacity,
+# refill rate (per ms), floor (level the caller must leave behind).
+# Returns 0 when taken, otherwise the milliseconds to wait (-1 if never).
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 4
+    local cost = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local rate = tonumber(ARGV[base + 3])
+    local floor = tonumber(ARGV[base + 4])
+    if cost + floor > capacity then
+        return -1
+    end
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    if level < cost + floor then
+        wait = math.max(wait, (cost + floor - level) / rate)
+    end
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 4
+    local cost = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local rate = tonumber(ARGV[base + 3])
+    local level = levels[i] - cost
+    redis.call('HSET', key, 'level', tostring(level), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil((capacity - level) / rate) + 1000)
+end
+return 0
+"""
+
+# Return unused tokens to a bucket, never above its capacity
+GIVE_BACK_SCRIPT = """
+local level = tonumber(redis.call('HGET', KEYS[1], 'level'))
+if level then
+    level = math.min(tonumber(ARGV[2]), level + tonumber(ARGV[1]))
+    redis.call('HSET', KEYS[1], 'level', tostring(level))
+end
+return 0
+"""
+
+class BudgetExceededError(RuntimeError):
+    """Raised when the OpenAI budget for a model cannot cover a request in time"""
+
+def estimate_tokens(messages, max_tokens, n=1):
+    """Estimate the tokens a chat completion counts against TPM.
+
+    Roughly three characters per token plus per-message overhead, which errs
+    high for English; the completion is charged at max_tokens per choice.
+    """
+    prompt = sum(len(message['content']) // 3 + 4 for message in messages) + 3
+    return prompt + max_tokens * n
+
+class MemoryBuckets:
+    """Token buckets for this process only"""
+
+    def __init__(self):
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        """Take cost from every bucket or none; return seconds to wait (0 if taken)"""
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, cost, capacity, rate, floor in buckets:
+                if cost + floor > capacity:
+                    return math.inf
+                level, ts = self._levels.get(key, (capacity, now))
+                level = min(capacity, level + max(0.0, now - ts) * rate)
+                levels.append(level)
+                if level < cost + floor:
+                    wait = max(wait, (cost + floor - level) / rate)
+            if wait > 0:
+                return wait
+            for (key, cost, _, _, _), level in zip(buckets, levels):
+                self._levels[key] = (level - cost, now)
+            return 0.0
+
+    def give_back(self, key, amount, capacity):
+        with self._lock:
+            if key in self._levels:
+                level, ts = self._levels[key]
+                self._levels[key] = (min(capacity, level + amount), ts)
+
+class RedisBuckets:
+    """Token buckets in Redis, shared by every worker"""
+
+    def __init__(self, url, prefix='draftcraft:budget:'):
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._take = self.client.register_script(TAKE_SCRIPT)
+        self._give_back = self.client.register_script(GIVE_BACK_SCRIPT)
+
+    def take(self, buckets, now):
+        args = [int(now * 1000)]
+        for _, cost, capacity, rate, floor in buckets:
+            args.extend([cost, capacity, rate / 1000, floor])
+        wait_ms = self._take(keys=[self.prefix + key for key, *_ in buckets], args=args)
+        return math.inf if wait_ms < 0 else wait_ms / 1000
+
+    def give_back(self, key, amount, capacity):
+        self._give_back(keys=[self.prefix + key], args=[amount, capacity])
+
+class TokenBudget:
+    """Governs OpenAI calls against per-model TPM/RPM limits"""
+
+    def __init__(self):
+        self.backend = None
+        self.fallback = MemoryBuckets()
+        self.limits = {}
+        self.premium_reserve = 0.2
+        self.max_wait = 5.0
+        self.sleep = time.sleep
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Configure limits and the backend from the Flask config"""
+        backend = app.config['TOKEN_BUDGET_BACKEND']
+        if backend == 'redis':
+            self.backend = RedisBuckets(app.config['REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBuckets()
+        else:
+            self.backend = None
+        self.fallback = MemoryBuckets()
+        self.limits = app.config['OPENAI_RATE_LIMITS']
+        self.premium_reserve = app.config['TOKEN_BUDGET_PREMIUM_RESERVE']
+        self.max_wait = app.config['TOKEN_BUDGET_MAX_WAIT']
+        self._reset_stats()
+        app.extensions['token_budget'] = self
+
+    def _reset_stats(self):
+        self._stats = {'granted': 0, 'queued': 0, 'rejected': 0, 'backend_errors': 0,
+                       'wait_seconds': 0.0, 'tokens_reserved': 0, 'tokens_returned': 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _buckets(self, model, tokens, tier):
+        limits = self.limits[model]
+        # Non-premium callers must leave the premium reserve in the bucket
+        reserve = 0 if tier == 'premium' else self.premium_reserve
+        return [
+            (f'{model}:tpm', tokens, limits['tpm'], limits['tpm'] / 60, limits['tpm'] * reserve),
+            (f'{model}:rpm', 1, limits['rpm'], limits['rpm'] / 60, limits['rpm'] * reserve)
+        ]
+
+    def _take(self, buckets):
+        if isinstance(self.backend, RedisBuckets):
+            try:
+                return self.backend.take(buckets, time.time())
+            except redis.RedisError as e:
+                logger.warning(f"Token budget unavailable, using per-process buckets: {e}")
+                self._count('backend_errors')
+                return self.fallback.take(buckets, time.monotonic())
+        return self.backend.take(buckets, time.monotonic())
+
+    def acquire(self, model, tokens, tier='starter'):
+        """Reserve tokens (and one request) for a call to model, waiting if needed.
+
+        Args:
+            model (str): OpenAI model the call is for.
+            tokens (int): Estimated cost from estimate_tokens.
+            tier (str): 'premium' calls may use the reserved share.
+        Returns:
+            int: Tokens reserved; pass to settle once the real usage is known.
+        Raises:
+            BudgetExceededError: If the budget cannot cover the call within max_wait.
+        """
+        if self.backend is None or model not in self.limits:
+            return 0
+        buckets = self._buckets(model, tokens, tier)
+        deadline = time.monotonic() + self.max_wait
+        waited = 0.0
+        while True:
+            wait = self._take(buckets)
+            if wait == 0:
+                break
+            if time.monotonic() + wait > deadline:
+                self._count('rejected')
+                logger.warning(f"OpenAI budget for {model} exhausted; rejecting {tokens}-token {tier} request")
+                raise BudgetExceededError(f"OpenAI budget for {model} is exhausted; try again shortly")
+            if not waited:
+                self._count('queued')
+            self.sleep(wait)
+            waited += wait
+        self._count('granted')
+        self._count('wait_seconds', waited)
+        self._count('tokens_reserved', tokens)
+        return tokens
+
+    def settle(self, model, reserved, used):
+        """Return the part of a reservation the call did not use"""
+        unused = reserved - (used or 0)
+        if not reserved or unused <= 0:
+            return
+        key, _, capacity, _, _ = self._buckets(model, unused, 'premium')[0]
+        try:
+            self.backend.give_back(key, unused, capacity)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to return unused OpenAI budget: {e}")
+            self._count('backend_errors')
+            return
+        self._count('tokens_returned', unused)
+
+    def stats(self):
+        """Return budget counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        stats['backend'] = type(self.backend).__name__ if self.backend else None
+        return stats
+
+token_budget = TokenBudget()
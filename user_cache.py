@@ -0,0 +1,183 @@
+"""
+Cached current_user loading for DraftCraft Agent
+
+Flask-Login calls the user loader on every authenticated request. Instead
+of a User row, the loader returns a UserSnapshot of the fields requests
+read (id, email, plan, active flag and monthly usage), kept in a
+process-local LRU with a short TTL or in Redis. Code that changes those
+fields calls user_cache.invalidate() after committing; the TTL bounds how
+long other workers can serve a stale snapshot with the memory backend.
+Quota is still enforced against the database, so a stale usage count only
+affects what is displayed.
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+import redis
+from proposal_cache import MemoryBackend, RedisBackend
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = ('id', 'email', 'is_premium', 'is_active', 'proposals_this_month')
+
+class UserSnapshot:
+    """Read-only stand-in for User as current_user.
+
+    Attributes outside the snapshot are read from the User row, loaded on
+    first use, so rarely used fields keep working at the old cost.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, data):
+        self._data = data
+        self._user = None
+
+    @classmethod
+    def from_user(cls, user):
+        data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        data['last_reset'] = user.last_reset.isoformat() if user.last_reset else None
+        return cls(data)
+
+    def to_json(self):
+        return json.dumps(self._data)
+
+    @property
+    def id(self):
+        return self._data['id']
+
+    @property
+    def email(self):
+        return self._data['email']
+
+    @property
+    def is_premium(self):
+        return bool(self._data['is_premium'])
+
+    @property
+    def is_active(self):
+        return self._data['is_active'] is not False
+
+    @property
+    def proposals_this_month(self):
+        return self._data['proposals_this_month'] or 0
+
+    @property
+    def last_reset(self):
+        last_reset = self._data['last_reset']
+        return datetime.fromisoformat(last_reset) if last_reset else None
+
+    @property
+    def monthly_usage(self):
+        """Proposals counted this month; a counter from an earlier month reads as 0"""
+        now = datetime.utcnow()
+        last_reset = self.last_reset
+        if last_reset is None or (last_reset.year, last_reset.month) != (now.year, now.month):
+            return 0
+        return self.proposals_this_month
+
+    def get_id(self):
+        return str(self.id)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._user is None:
+            from models import db, User
+            self._user = db.session.get(User, self.id)
+        return getattr(self._user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id and getattr(other, 'is_authenticated', False)
+
+    def __hash__(self):
+        return hash(self.id)
+
+class UserCache:
+    """Snapshot cache behind Flask-Login's user loader, with hit/miss counters"""
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 60
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def init_app(self, app):
+        """Configure the backend from the Flask config"""
+        backend = app.config['USER_CACHE_BACKEND']
+        self.ttl = app.config['USER_CACHE_TTL']
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['REDIS_URL'], prefix='draftcraft:user:')
+        elif backend == 'memory':
+            self.backend = MemoryBackend(app.config['USER_CACHE_MAX_ENTRIES'])
+        else:
+            self.backend = None
+        self._reset_stats()
+        app.extensions['user_cache'] = self
+
+    def _reset_stats(self):
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def load(self, user_id):
+        """Return the user's snapshot, reading the database only on a miss.
+
+        Returns:
+            UserSnapshot: Or None when the user does not exist.
+        """
+        from models import db, User
+        key = str(user_id)
+        if self.backend is not None:
+            try:
+                cached = self.backend.get(key)
+            except redis.RedisError as e:
+                logger.warning(f"User cache read failed: {e}")
+                self._count('errors')
+                cached = None
+            if cached is not None:
+                self._count('hits')
+                return UserSnapshot(json.loads(cached))
+            self._count('misses')
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, snapshot.to_json(), self.ttl)
+            except redis.RedisError as e:
+                logger.warning(f"User cache write failed: {e}")
+                self._count('errors')
+        return snapshot
+
+    def invalidate(self, user_id):
+        """Drop a user's snapshot; call after committing a change to its fields"""
+        if self.backend is None or user_id is None:
+            return
+        try:
+            self.backend.delete(str(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"User cache invalidation failed for user {user_id}: {e}")
+            self._count('errors')
+            return
+        self._count('invalidations')
+
+    def stats(self):
+        """Return cache counters for this process"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__ if self.backend else None
+        stats['ttl'] = self.ttl
+        if isinstance(self.backend, MemoryBackend):
+            stats['entries'] = len(self.backend)
+        return stats
+
+user_cache = UserCache()
@@ -0,0 +1,9 @@
+"""
+Celery worker entry point for DraftCraft Agent
+
+    celery -A worker.celery worker --loglevel=info
+"""
+# Importing the app runs create_app, which configures Celery and binds the
+# Flask app that tasks run under.
+from app import app  # noqa: F401
+from jobs import celery  # noqa: F401